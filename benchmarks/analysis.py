@@ -0,0 +1,123 @@
+"""This script benchmarks `perform_analysis` on a scaled catalog.
+
+The downloaded metadata and inventory are replicated `--scale` times,
+with each copy of a companion, furnishing and set renamed,
+so the shape of the catalog is kept while its size grows.
+
+```bash
+python benchmarks/analysis.py --scale 100
+```
+"""
+
+
+import timeit
+
+
+import click
+
+
+from tubby.analyze import perform_analysis
+from tubby.file import load_inventory, load_metadata
+from tubby.reset import create_inventory_schema, update_inventory
+from tubby.utils import bold, color
+
+
+def scale_catalog(metadata: dict, inventory: dict, scale: int):
+    """Replicates `metadata` and `inventory` `scale` times
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        scale (int): number of copies
+
+    Returns:
+        Tuple[dict, dict]: scaled metadata and inventory
+    """
+
+    def rename(name: str, copy: int) -> str:
+        return name if copy == 0 else f"{name} #{copy}"
+
+    scaled_metadata = dict(
+        materials=list(metadata["materials"]),
+        companions={},
+        furnishings={},
+        sets={},
+    )
+    scaled_inventory = dict(
+        companions={}, materials=dict(inventory["materials"]), furnishings={}, sets={}
+    )
+
+    for copy in range(scale):
+        for c_name, c_md in metadata["companions"].items():
+            scaled_metadata["companions"][rename(c_name, copy)] = dict(
+                sets=[rename(s_name, copy) for s_name in c_md["sets"]]
+            )
+            scaled_inventory["companions"][rename(c_name, copy)] = inventory[
+                "companions"
+            ][c_name]
+
+        for f_name, f_md in metadata["furnishings"].items():
+            scaled_metadata["furnishings"][rename(f_name, copy)] = f_md
+            scaled_inventory["furnishings"][rename(f_name, copy)] = inventory[
+                "furnishings"
+            ][f_name]
+
+        for s_name, s_md in metadata["sets"].items():
+            scaled_metadata["sets"][rename(s_name, copy)] = {
+                **s_md,
+                "furnishings": {
+                    rename(f_name, copy): amount
+                    for f_name, amount in s_md["furnishings"].items()
+                },
+                **(
+                    {"companions": [rename(c, copy) for c in s_md["companions"]]}
+                    if "companions" in s_md
+                    else {}
+                ),
+            }
+            hset = inventory["sets"][s_name]
+            scaled_inventory["sets"][rename(s_name, copy)] = {
+                **hset,
+                **(
+                    {
+                        "companions": {
+                            rename(c, copy): gifted
+                            for c, gifted in hset["companions"].items()
+                        }
+                    }
+                    if "companions" in hset
+                    else {}
+                ),
+            }
+
+    return scaled_metadata, scaled_inventory
+
+
+@click.command()
+@click.option("--scale", type=click.INT, default=100, help="Number of catalog copies")
+@click.option("--number", type=click.INT, default=10, help="Number of runs")
+def main(scale: int, number: int):
+    """Benchmarks `perform_analysis`"""
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if (inventory := load_inventory()) is None:
+        inventory = create_inventory_schema()
+
+    update_inventory(metadata, inventory, persist=False)
+
+    metadata, inventory = scale_catalog(metadata, inventory, scale)
+
+    seconds = timeit.timeit(
+        lambda: perform_analysis(metadata, inventory), number=number
+    )
+
+    print(
+        f"perform_analysis: {len(metadata['furnishings'])} furnishings, "
+        f"{len(metadata['sets'])} sets, {seconds / number * 1000:.2f} ms per run"
+    )
+
+
+if __name__ == "__main__":
+    main()
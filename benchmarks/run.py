@@ -0,0 +1,284 @@
+"""This script benchmarks hot functions on synthetic catalogs of several scales.
+
+Each function is timed over `--number` runs and its peak memory is traced in one more run.
+Results are appended to a JSON history, and compared against the latest previous result
+of the same function and scale, so regressions are visible.
+
+```bash
+python benchmarks/run.py --scale 1 --scale 10 --scale 100
+```
+"""
+
+
+import datetime
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+import click
+
+
+from synthetic import generate_scaled_catalog
+from tubby.analyze import perform_analysis
+from tubby.file import compute_fingerprint
+from tubby.index import load_index
+from tubby.manage import (
+    format_furnishing,
+    format_set,
+    furnishing_order,
+    set_order,
+)
+from tubby.meta import VERSION
+from tubby.models import load_housing
+from tubby.plan import plan_completions
+from tubby.query import get_cost_of_items, get_materials_for_furnishings
+from tubby.reset import create_inventory_schema, update_inventory
+from tubby.utils import bold, color
+from tubby.view import load_view
+
+
+HISTORY_FILE: str = os.path.join(os.path.dirname(__file__), "history.json")
+"""File for benchmark history"""
+
+
+def create_cases(metadata: dict, inventory: dict) -> Dict[str, Callable[[], None]]:
+    """Creates benchmark cases of hot functions over `metadata` and `inventory`
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+
+    Returns:
+        Dict[str, Callable[[], None]]: mapping of function names to benchmark cases
+    """
+    furnishings = {
+        f_name: 1
+        for f_name, f_md in metadata["furnishings"].items()
+        if f_md.get("materials") is not None
+    }
+    items = {
+        **{f_name: 1 for f_name in metadata["furnishings"]},
+        **{s_name: 1 for s_name in metadata["sets"]},
+    }
+
+    def furnishings_view(stamp: Optional[Tuple[str, int]]):
+        housing = load_housing(metadata)
+
+        return load_view(
+            "manage-furnishings",
+            stamp,
+            metadata["furnishings"],
+            lambda f_name: furnishing_order(housing, inventory, f_name),
+            lambda f_name: format_furnishing(housing, inventory, f_name),
+        )
+
+    def sets_view(stamp: Optional[Tuple[str, int]]):
+        housing = load_housing(metadata)
+
+        return load_view(
+            "manage-sets",
+            stamp,
+            metadata["sets"],
+            lambda s_name: set_order(housing, inventory, s_name),
+            lambda s_name: format_set(housing, inventory, s_name),
+        )
+
+    # Menus are entered without a stamp so they are built each time,
+    # while edits refresh a view built for the previous inventory version
+    view = furnishings_view((metadata["fingerprint"], 0))
+    edited = next(iter(metadata["furnishings"]))
+
+    def edit_furnishing():
+        view.refresh((view.stamp[0], view.stamp[1] + 1), edited)
+
+    return {
+        "perform_analysis": lambda: perform_analysis(metadata, inventory),
+        "get_materials_for_furnishings": lambda: get_materials_for_furnishings(
+            metadata, furnishings
+        ),
+        "get_cost_of_items": lambda: get_cost_of_items(metadata, inventory, items),
+        "update_inventory": lambda: update_inventory(
+            metadata, create_inventory_schema(), persist=False
+        ),
+        "manage_furnishings_menu": lambda: furnishings_view(None),
+        "manage_sets_menu": lambda: sets_view(None),
+        "manage_furnishings_edit": edit_furnishing,
+        "plan_completions": lambda: plan_completions(metadata, inventory, 5000, 50000),
+    }
+
+
+def measure(case: Callable[[], None], number: int) -> Tuple[float, float, int]:
+    """Measures run time and peak memory of `case`
+
+    Args:
+        case (Callable[[], None]): benchmark case
+        number (int): number of timed runs
+
+    Returns:
+        Tuple[float, float, int]: best and mean seconds per run, and peak bytes
+    """
+    times = []
+    for _ in range(number):
+        start = time.perf_counter()
+        case()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    case()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), sum(times) / number, peak
+
+
+def load_history(path: str) -> List[dict]:
+    """Loads benchmark history from `path`
+
+    Args:
+        path (str): history file
+
+    Returns:
+        List[dict]: benchmark results, oldest first
+    """
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "r") as file_pointer:
+        return json.load(file_pointer)
+
+
+def find_previous(history: List[dict], function: str, scale: int) -> Optional[dict]:
+    """Finds the latest result of `function` at `scale` in `history`
+
+    Args:
+        history (List[dict]): benchmark results, oldest first
+        function (str): function name
+        scale (int): catalog scale
+
+    Returns:
+        Optional[dict]: benchmark result
+    """
+    return next(
+        (
+            result
+            for result in reversed(history)
+            if result["function"] == function and result["scale"] == scale
+        ),
+        None,
+    )
+
+
+def format_change(seconds: float, previous: Optional[dict]) -> str:
+    """Formats change of `seconds` against `previous` result
+
+    Args:
+        seconds (float): best seconds per run
+        previous (Optional[dict]): previous benchmark result
+
+    Returns:
+        str: relative change, colored red for regressions over 10%
+    """
+    if previous is None or previous["best"] == 0:
+        return ""
+
+    change = seconds / previous["best"] - 1
+    text = f"{change:+.0%}"
+
+    if change > 0.1:
+        return color(text, "red")
+    if change < -0.1:
+        return color(text, "green")
+
+    return text
+
+
+@click.command()
+@click.option(
+    "--scale",
+    "scales",
+    type=click.INT,
+    multiple=True,
+    default=[1, 10, 100],
+    help="Multiple of the downloaded catalog. Can be repeated",
+)
+@click.option("--seed", type=click.INT, default=0, help="Random seed")
+@click.option("--number", type=click.INT, default=5, help="Number of timed runs")
+@click.option(
+    "--history",
+    "history_path",
+    type=click.Path(dir_okay=False),
+    default=HISTORY_FILE,
+    help="JSON file to append results to",
+)
+@click.option(
+    "--function",
+    "functions",
+    multiple=True,
+    help="Only benchmark <function>. Can be repeated",
+)
+def main(
+    scales: List[int],
+    seed: int,
+    number: int,
+    history_path: str,
+    functions: List[str],
+):
+    """Benchmarks hot functions on synthetic catalogs"""
+    history = load_history(history_path)
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+    results = []
+
+    for scale in scales:
+        metadata, inventory = generate_scaled_catalog(seed, scale)
+
+        # Indexes are built once per fingerprint, as when loaded from configuration
+        metadata["fingerprint"] = compute_fingerprint(metadata)
+        load_index(metadata)
+
+        print(
+            "\n"
+            + bold(
+                f"{scale}×: {len(metadata['furnishings'])} furnishings, "
+                f"{len(metadata['sets'])} sets"
+            )
+            + "\n"
+        )
+
+        for function, case in create_cases(metadata, inventory).items():
+            if len(functions) > 0 and function not in functions:
+                continue
+
+            best, mean, peak = measure(case, number)
+            previous = find_previous(history, function, scale)
+
+            print(
+                f"  {function:32s} {best * 1000:10.2f} ms  {mean * 1000:10.2f} ms  "
+                f"{peak / 2**20:8.2f} MiB  {format_change(best, previous)}"
+            )
+
+            results.append(
+                dict(
+                    time=timestamp,
+                    version=VERSION,
+                    python=platform.python_version(),
+                    seed=seed,
+                    scale=scale,
+                    function=function,
+                    best=best,
+                    mean=mean,
+                    peak=peak,
+                )
+            )
+
+    with open(history_path, "w") as file_pointer:
+        json.dump(history + results, file_pointer, indent=2)
+
+    print(f"\nResults appended to {history_path}")
+
+
+if __name__ == "__main__":
+    main()
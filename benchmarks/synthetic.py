@@ -0,0 +1,151 @@
+"""This module generates seeded synthetic catalogs for benchmarks.
+
+Furnishings are drawn for sets with a skewed popularity,
+so that a few furnishings are shared by many sets as in the downloaded catalog,
+and companions gift for several sets each.
+Catalogs are sized in sets, or as multiples of the downloaded catalog with `SCALE`.
+"""
+
+
+import itertools
+import random
+from typing import Optional, Tuple
+
+
+from tubby.reset import create_inventory_schema, update_inventory
+
+
+MATERIAL_KINDS = ["Wood", "Ore", "Fabric", "Dye", "Gem"]
+"""Last words of material names"""
+
+
+SCALE = dict(sets=45, furnishings=340, companions=60, materials=40)
+"""Size of the downloaded catalog"""
+
+
+def generate_catalog(
+    seed: int,
+    num_sets: int,
+    num_furnishings: Optional[int] = None,
+    num_companions: Optional[int] = None,
+    num_materials: Optional[int] = None,
+) -> Tuple[dict, dict]:
+    """Generates metadata with `num_sets` sets and a matching inventory
+
+    Args:
+        seed (int): random seed
+        num_sets (int): number of sets
+        num_furnishings (Optional[int], optional): number of furnishings. Defaults to 4 per set.
+        num_companions (Optional[int], optional): number of companions. Defaults to 1 per 2 sets.
+        num_materials (Optional[int], optional): number of materials. Defaults to 1 per 10 sets.
+
+    Returns:
+        Tuple[dict, dict]: housing metadata and user inventory
+    """
+    rng = random.Random(seed)
+
+    num_furnishings = num_furnishings or num_sets * 4
+    num_companions = num_companions or max(1, num_sets // 2)
+    num_materials = num_materials or max(5, num_sets // 10)
+
+    materials = [
+        f"Material {i} {MATERIAL_KINDS[i % len(MATERIAL_KINDS)]}"
+        for i in range(num_materials)
+    ]
+
+    metadata = dict(
+        materials=materials,
+        companions={f"Companion {i}": dict(sets=[]) for i in range(num_companions)},
+        furnishings={},
+        sets={},
+    )
+
+    for i in range(num_furnishings):
+        furnishing = {}
+        kind = rng.random()
+
+        if kind < 0.7:
+            furnishing["materials"] = {
+                m_name: rng.randint(1, 20)
+                for m_name in rng.sample(materials, rng.randint(1, 4))
+            }
+            if rng.random() < 0.5:
+                furnishing["currency"] = rng.randint(10, 500)
+        elif kind < 0.85:
+            furnishing["currency"] = rng.randint(10, 500)
+        elif kind < 0.95:
+            furnishing["mora"] = rng.randint(100, 5000)
+
+        metadata["furnishings"][f"Furnishing {i}"] = furnishing
+
+    f_names = list(metadata["furnishings"])
+    popularity = list(
+        itertools.accumulate(1 / (rank + 1) for rank in range(num_furnishings))
+    )
+    c_names = list(metadata["companions"])
+
+    for i in range(num_sets):
+        s_name = f"Set {i}"
+        hset = dict(currency=rng.randint(100, 1500))
+
+        hset["furnishings"] = {
+            f_name: rng.randint(1, 4)
+            for f_name in dict.fromkeys(
+                rng.choices(f_names, cum_weights=popularity, k=rng.randint(4, 12))
+            )
+        }
+
+        if rng.random() < 0.6:
+            hset["companions"] = rng.sample(
+                c_names, min(len(c_names), rng.randint(2, 5))
+            )
+
+            for c_name in hset["companions"]:
+                metadata["companions"][c_name]["sets"].append(s_name)
+
+        metadata["sets"][s_name] = hset
+
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+
+    for c_name in inventory["companions"]:
+        inventory["companions"][c_name] = rng.random() < 0.8
+
+    for m_name in materials:
+        inventory["materials"][m_name] = rng.randint(0, 500)
+
+    for f_name, entry in inventory["furnishings"].items():
+        entry["owned"] = rng.choice([0, 0, 1, 2, 4])
+
+        if "blueprint" in entry:
+            entry["blueprint"] = rng.random() < 0.6
+            entry["crafted"] = entry["blueprint"] and rng.random() < 0.5
+
+    for s_name, hset in inventory["sets"].items():
+        hset["owned"] = rng.random() < 0.5
+
+        for c_name in hset.get("companions", {}):
+            hset["companions"][c_name] = (
+                hset["owned"] and inventory["companions"][c_name] and rng.random() < 0.3
+            )
+
+    return metadata, inventory
+
+
+def generate_scaled_catalog(seed: int, scale: int) -> Tuple[dict, dict]:
+    """Generates metadata `scale` times the size of the downloaded catalog
+
+    Args:
+        seed (int): random seed
+        scale (int): multiple of the downloaded catalog
+
+    Returns:
+        Tuple[dict, dict]: housing metadata and user inventory
+    """
+    return generate_catalog(
+        seed,
+        SCALE["sets"] * scale,
+        SCALE["furnishings"] * scale,
+        SCALE["companions"] * scale,
+        SCALE["materials"] * scale,
+    )
@@ -38,7 +38,7 @@ setup(
         "click",
         "bs4",
         "httpx",
-        "simple-term-menu",
+        "simple-term-menu==1.6.6",
         "sty",
         "tqdm",
     ],
@@ -14,11 +14,18 @@ import click
 
 from .analyze import analyze
 from .backup import backup
+from .batch import analyze_batch
 from .download import download
+from .forecast import forecast
+from .history import history
 from .info import info
 from .manage import manage
 from .meta import DESCRIPTION
+from .plan import plan
 from .reset import reset
+from .schedule import schedule
+from .simulate import simulate
+from .update import update
 
 
 @click.group(
@@ -33,7 +40,14 @@ def main():
 
 main.add_command(download)
 main.add_command(manage)
+main.add_command(update)
 main.add_command(analyze)
+main.add_command(analyze_batch)
+main.add_command(plan)
+main.add_command(schedule)
+main.add_command(simulate)
+main.add_command(forecast)
+main.add_command(history)
 main.add_command(backup)
 main.add_command(reset)
 main.add_command(info)
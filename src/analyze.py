@@ -1,10 +1,33 @@
 """This module defines functions for analysing inventory"""
 
 
+import csv
+import hashlib
+import json
+from collections.abc import Mapping
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+
 import click
 
 
-from .file import load_inventory, load_metadata
+from .engine import (
+    analyze_columns,
+    compile_catalog,
+    compile_inventory,
+    explain_contributions,
+    summarize_section,
+)
+from .file import (
+    compute_fingerprint,
+    load_cached_analysis,
+    load_inventory,
+    load_metadata,
+    save_cached_analysis,
+)
+from .index import load_index, order_materials
+from .meta import VERSION
+from .models import Inventory, load_housing
 from .query import (
     get_crafting_recipe,
     get_cost_of_items,
@@ -18,10 +41,190 @@ from .utils import (
     color,
     emoji,
     emoji_boolean,
-    multiply_values,
+    italic,
     terminal_menu,
-    update_greater,
 )
+from .view import inventory_stamp, load_view
+
+
+MILESTONES: dict = {
+    "materials": {
+        "milestones": [
+            "🪑📘🟢🔨🔴",
+            "🪑🔨🔴    ",
+            "🎁👤🟢📘🟢",
+            "🎁👤🟢    ",
+            "🏡📘🟢    ",
+            "🏡        ",
+            "🫖        ",
+        ],
+        "legend": [
+            "for one of each furnishing whose blueprint is owned and hasn't been crafted yet",
+            "for one of each furnishing that hasn't been crafted yet",
+            "for largest count of each missing furnishing for all gift sets with at least one gifting companion and whose blueprints are owned",
+            "for largest count of each missing furnishing for all gift sets with at least one gifting companion",
+            "for largest count of each missing furnishing for all sets whose blueprints are owned",
+            "for largest count of each missing furnishing for all sets",
+            "for larger of largest count of each missing furnishing for all sets and one of each furnishing that hasn't been crafted yet",
+        ],
+    },
+    "currency": {
+        "milestones": [
+            "🪑📘🔴        ",
+            "🎁👤🟢📘🔴    ",
+            "🎁👤🟢📘🟢🪑🔴",
+            "🎁👤🟢🪑🔴    ",
+            "🏡📘🔴        ",
+            "🏡🪑🔴        ",
+            "🫖            ",
+        ],
+        "legend": [
+            "all missing blueprints for furnishings",
+            "all missing blueprints for gift sets with at least one gifting companion",
+            "all missing furnishings (including blueprints) for  for all gift sets with at least one gifting companion and whose blueprints are owned",
+            "all missing furnishings (including blueprints) for  for all gift sets with at least one gifting companion",
+            "all missing blueprints for sets",
+            "all missing furnishings (including blueprints) for all sets",
+            "all missing blueprints for furnishings and sets, all missing furnishings for all sets and one of all other furnishings",
+        ],
+    },
+}
+"""Milestone symbols and legends of materials and currency"""
+
+
+ANALYSIS_SECTIONS: List[str] = ["materials", "currency", "furnishings", "sets"]
+"""Sections of an analysis"""
+
+
+class LazyAnalysis(Mapping):
+    """Analysis of an inventory whose sections are computed on first access
+
+    Milestone columns are computed once for all sections,
+    while materials and currency are only reduced when first viewed.
+    Milestone columns hold the furnishings and sets counted in each milestone,
+    so totals are broken down from them without reducing them again.
+    With a cache key, each section is read from the cache on first access,
+    or saved to it as soon as it is computed.
+    """
+
+    def __init__(
+        self,
+        metadata: dict,
+        inventory: dict,
+        sections: Optional[dict] = None,
+        key: Optional[str] = None,
+    ):
+        """Prepares analysis of `inventory`
+
+        Args:
+            metadata (dict): housing metadata
+            inventory (dict): user inventory
+            sections (Optional[dict], optional): sections already computed. Defaults to None.
+            key (Optional[str], optional): cache key of the analysis. Defaults to None.
+        """
+        self.metadata = metadata
+        self.inventory = inventory
+        self.sections = dict(sections or {})
+        self.key = key
+
+        self.catalog = None
+        self.columns = None
+        self.milestones = None
+
+    def compute_milestones(self):
+        """Computes milestone columns shared by all sections"""
+        if self.milestones is None:
+            self.catalog = compile_catalog(self.metadata)
+            self.columns = compile_inventory(self.catalog, self.inventory)
+            self.milestones = analyze_columns(self.catalog, self.columns)
+
+    def load_cached(self, section: str) -> bool:
+        """Loads `section` from the cache, unless it was already computed
+
+        Args:
+            section (str): section name
+
+        Returns:
+            bool: whether section is computed
+        """
+        if section not in self.sections and self.key is not None:
+            if (results := load_cached_analysis(self.key, section)) is not None:
+                self.sections[section] = results
+
+        return section in self.sections
+
+    def __getitem__(self, section: str):
+        if section not in ANALYSIS_SECTIONS:
+            raise KeyError(section)
+
+        if not self.load_cached(section):
+            self.compute_milestones()
+            results = summarize_section(
+                self.catalog, self.columns, self.milestones, section
+            )
+
+            if section in MILESTONES:
+                results = {
+                    **{key: list(values) for key, values in MILESTONES[section].items()},
+                    "results": results,
+                }
+
+            self.sections[section] = results
+
+            if self.key is not None:
+                save_cached_analysis(self.key, section, results)
+
+        return self.sections[section]
+
+    def breakdown(self, section: str, name: str) -> List[List[Tuple[str, int]]]:
+        """Breaks down the total of `name` in each milestone of `section`
+
+        Args:
+            section (str): one of `materials` or `currency`
+            name (str): material name, or type of cost
+
+        Returns:
+            List[List[Tuple[str, int]]]: pairs of furnishing or set names and amounts,
+                largest first, per milestone
+        """
+        self.compute_milestones()
+
+        return explain_contributions(
+            self.catalog, self.columns, self.milestones, section, name
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ANALYSIS_SECTIONS)
+
+    def __len__(self) -> int:
+        return len(ANALYSIS_SECTIONS)
+
+    def has_results(self, section: str) -> bool:
+        """Checks whether `section` has any results, without reducing milestones
+
+        Args:
+            section (str): section name
+
+        Returns:
+            bool: whether section is not empty
+        """
+        if self.load_cached(section):
+            return len(self.sections[section]) != 0
+
+        if section in MILESTONES:
+            return True
+
+        self.compute_milestones()
+
+        if section == "furnishings":
+            return any(count > 0 for count in self.milestones["furnishings"])
+
+        return any(
+            len(row) > 0 or not set_owned
+            for row, set_owned in zip(
+                self.milestones["missing"], self.columns["set_owned"]
+            )
+        )
 
 
 def perform_analysis(metadata: dict, inventory: dict) -> dict:
@@ -34,228 +237,205 @@ def perform_analysis(metadata: dict, inventory: dict) -> dict:
     Returns:
         dict: analysis
     """
-    furnishings = inventory["furnishings"]
-    sets = inventory["sets"]
-
-    analysis = {
-        "materials": {
-            "milestones": [
-                "🪑📘🟢🔨🔴",
-                "🪑🔨🔴    ",
-                "🎁👤🟢📘🟢",
-                "🎁👤🟢    ",
-                "🏡📘🟢    ",
-                "🏡        ",
-                "🫖        ",
-            ],
-            "legend": [
-                "for one of each furnishing whose blueprint is owned and hasn't been crafted yet",
-                "for one of each furnishing that hasn't been crafted yet",
-                "for largest count of each missing furnishing for all gift sets with at least one gifting companion and whose blueprints are owned",
-                "for largest count of each missing furnishing for all gift sets with at least one gifting companion",
-                "for largest count of each missing furnishing for all sets whose blueprints are owned",
-                "for largest count of each missing furnishing for all sets",
-                "for larger of largest count of each missing furnishing for all sets and one of each furnishing that hasn't been crafted yet",
-            ],
-        },
-        "currency": {
-            "milestones": [
-                "🪑📘🔴        ",
-                "🎁👤🟢📘🔴    ",
-                "🎁👤🟢📘🟢🪑🔴",
-                "🎁👤🟢🪑🔴    ",
-                "🏡📘🔴        ",
-                "🏡🪑🔴        ",
-                "🫖            ",
-            ],
-            "legend": [
-                "all missing blueprints for furnishings",
-                "all missing blueprints for gift sets with at least one gifting companion",
-                "all missing furnishings (including blueprints) for  for all gift sets with at least one gifting companion and whose blueprints are owned",
-                "all missing furnishings (including blueprints) for  for all gift sets with at least one gifting companion",
-                "all missing blueprints for sets",
-                "all missing furnishings (including blueprints) for all sets",
-                "all missing blueprints for furnishings and sets, all missing furnishings for all sets and one of all other furnishings",
-            ],
-        },
-        "furnishings": {},
-        "sets": {},
-    }
-
-    materials_anal = analysis["materials"]
-    materials_anal["results"] = [{} for _ in materials_anal["legend"]]
-
-    currency_anal = analysis["currency"]
-    currency_anal["results"] = [{} for _ in currency_anal["legend"]]
-
-    furnishings_anal = analysis["furnishings"]
-    sets_anal = analysis["sets"]
-
-    for f_name, furnishing in furnishings.items():
-        if (
-            furnishing_blueprint := furnishing.get("blueprint")
-        ) is not None and not furnishing.get("crafted"):
-            materials_anal["results"][1][f_name] = 1
-            materials_anal["results"][6][f_name] = 1
-
-            if furnishing_blueprint:
-                materials_anal["results"][0][f_name] = 1
-            else:
-                currency_anal["results"][0][f_name] = 1
-                currency_anal["results"][6][f_name] = 1
-
-            furnishings_anal[f_name] = 1
-
-        elif furnishing_blueprint is None and furnishing["owned"] == 0:
-            currency_anal["results"][6][f_name] = 1
-            furnishings_anal[f_name] = 1
-
-    for s_name, hset in sets.items():
-        set_blueprint = hset["owned"]
-        has_gifting_companions = "companions" in hset and not all(
-            gifted
-            for c_name, gifted in hset["companions"].items()
-            if inventory["companions"][c_name]
-        )
-        missing_items = {}
-
-        if not set_blueprint:
-            currency_anal["results"][4][s_name] = 1
-            currency_anal["results"][6][s_name] = 1
+    return dict(LazyAnalysis(metadata, inventory))
 
-            missing_items[s_name] = 1
 
-            if has_gifting_companions:
-                currency_anal["results"][1][s_name] = 1
+def compute_analysis_key(metadata: dict, inventory: dict) -> str:
+    """Computes cache key of the analysis of `inventory`
 
-        for f_name, num_required in metadata["sets"][s_name]["furnishings"].items():
-            if (num_owned := furnishings[f_name]["owned"]) < num_required:
-                num_missing = num_required - num_owned
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
 
-                update_greater(materials_anal["results"][5], f_name, num_missing)
-                update_greater(materials_anal["results"][6], f_name, num_missing)
+    Returns:
+        str: hash of metadata, inventory contents and package version
+    """
+    return hashlib.sha256(
+        json.dumps(
+            dict(
+                version=VERSION,
+                metadata=metadata.get("fingerprint") or compute_fingerprint(metadata),
+                inventory={
+                    key: value
+                    for key, value in inventory.items()
+                    if key not in ["version", "fingerprint"]
+                },
+            ),
+            sort_keys=True,
+            separators=(",", ":"),
+        ).encode()
+    ).hexdigest()
+
+
+def load_analysis(metadata: dict, inventory: dict) -> LazyAnalysis:
+    """Prepares analysis of `inventory`, whose sections are read from the cache
+    or performed lazily
 
-                update_greater(furnishings_anal, f_name, num_missing)
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
 
-                update_greater(missing_items, f_name, num_missing)
+    Returns:
+        LazyAnalysis: analysis
+    """
+    key = compute_analysis_key(metadata, inventory)
 
-                if (
-                    furnishing_blueprint := furnishings[f_name].get("blueprint")
-                ) is None:
-                    update_greater(currency_anal["results"][5], f_name, num_missing)
-                    update_greater(currency_anal["results"][6], f_name, num_missing)
-                elif not furnishing_blueprint:
-                    currency_anal["results"][5][f_name] = 1
-
-                if has_gifting_companions:
-                    update_greater(materials_anal["results"][3], f_name, num_missing)
-
-                    if set_blueprint:
-                        update_greater(
-                            materials_anal["results"][2], f_name, num_missing
-                        )
+    return LazyAnalysis(metadata, inventory, key=key)
 
-                        if furnishing_blueprint is None:
-                            update_greater(
-                                currency_anal["results"][2], f_name, num_missing
-                            )
-                        elif not furnishing_blueprint:
-                            currency_anal["results"][2][f_name] = 1
 
-                    if furnishing_blueprint is None:
-                        update_greater(currency_anal["results"][3], f_name, num_missing)
-                    elif not furnishing_blueprint:
-                        currency_anal["results"][3][f_name] = 1
+def show_breakdown(
+    name: str,
+    milestones: List[str],
+    totals: List[int],
+    breakdowns: List[List[Tuple[str, int]]],
+):
+    """Shows furnishings and sets contributing to `name` in each milestone
 
-                if set_blueprint:
-                    update_greater(materials_anal["results"][4], f_name, num_missing)
+    Args:
+        name (str): material name, or type of cost
+        milestones (List[str]): milestone symbols
+        totals (List[int]): total of `name` per milestone
+        breakdowns (List[List[Tuple[str, int]]]): pairs of item names and amounts, per milestone
+    """
+    clear_screen()
 
-        if len(missing_items) > 0:
-            sets_anal[s_name] = missing_items
+    print(f"{emoji(name)} {name}:\n")
 
-    materials_anal["results"] = list(
-        map(
-            lambda furnishings: get_materials_for_furnishings(metadata, furnishings),
-            materials_anal["results"],
-        )
-    )
+    if all(len(breakdown) == 0 for breakdown in breakdowns):
+        print(italic("  Not required for any milestone"))
 
-    currency_anal["results"] = list(
-        map(
-            lambda items: get_cost_of_items(metadata, inventory, items),
-            currency_anal["results"],
-        )
-    )
+    for milestone, total, breakdown in zip(milestones, totals, breakdowns):
+        if len(breakdown) > 0:
+            print(f" {milestone}  {total:10d}\n")
+            print(
+                "\n".join(f"  {amount:10d}×  {item}" for item, amount in breakdown)
+                + "\n"
+            )
 
-    return analysis
+    input()
 
 
-def summarize_materials(metadata: dict, inventory: dict, analysis: dict):
+def summarize_materials(metadata: dict, inventory: dict, analysis: LazyAnalysis):
     """Summarizes `analysis` of materials
 
     Args:
         metadata (dict): housing metadata
         inventory (dict): user inventory
-        analysis (dict): useful statistics
+        analysis (LazyAnalysis): useful statistics
     """
     materials_anal = analysis["materials"]
 
     results = materials_anal["results"]
-
-    clear_screen()
+    names = order_materials(metadata["materials"])
 
     legend = "\n".join(
         f"""    {materials_anal["milestones"][i]} = {materials_anal["legend"][i]}"""
         for i in range(len(results))
     )
 
-    print(f"Materials:\n\n  Legend:\n\n    💼         = in inventory\n{legend}")
+    title = f"""Materials:\n\n  Legend:\n\n    💼         = in inventory\n{legend}\n\n  Break down the following:\n\n  │ {"Item":24} │ {"💼        "} │ {" │ ".join(f"{m}" for m in materials_anal["milestones"])} │\n  ┼{'─' * 26}┼{"┼".join(f"{'─' * 12}" for i in range(len(results) + 1))}┼"""
 
-    print(
-        f"""\n │ {"Item":24} │ {"💼        "} │ {" │ ".join(f"{m}" for m in materials_anal["milestones"])} │\n ┼{'─' * 26}┼{"┼".join(f"{'─' * 12}" for i in range(len(results) + 1))}┼"""
+    menu = terminal_menu(
+        [
+            f"""│ {emoji(name)}  {name:20} │ {(amount := inventory["materials"][name]):10d} │ {" │ ".join(color(f"{(required := r.get(name, 0)):10d}", "green" if amount >= required else "red") for r in results)} │"""
+            for name in names
+        ],
+        title=title,
     )
 
-    print(
-        "\n".join(
-            f""" │ {emoji(name)}  {name:20} │ {(amount := inventory["materials"][name]):10d} │ {" │ ".join(color(f"{(required := r.get(name, 0)):10d}", "green" if amount >= required else "red") for r in results)} │"""
-            for name in sorted(metadata["materials"], key=lambda m: m.split()[-1])
-        )
-    )
+    while True:
+        clear_screen()
 
-    input()
+        if (choice := menu.show()) is not None:
+            show_breakdown(
+                (m_name := names[choice]),
+                materials_anal["milestones"],
+                [r.get(m_name, 0) for r in results],
+                analysis.breakdown("materials", m_name),
+            )
+        else:
+            break
 
 
-def summarize_currency(analysis: dict):
+def summarize_currency(analysis: LazyAnalysis):
     """Summarizes `analysis` for currency
 
     Args:
-        analysis (dict): useful statistics
+        analysis (LazyAnalysis): useful statistics
     """
     currency_anal = analysis["currency"]
 
     results = currency_anal["results"]
-
-    clear_screen()
+    names = ["currency", "mora"]
 
     legend = "\n".join(
         f"""    {currency_anal["milestones"][i]} = {currency_anal["legend"][i]}"""
         for i in range(len(results))
     )
 
-    print(f"Currency:\n\n  Legend:\n\n{legend}")
+    title = f"""Currency:\n\n  Legend:\n\n{legend}\n\n  Break down the following:\n\n  │ {"Type":14} │ {" │ ".join(f"{m}" for m in currency_anal["milestones"])} │\n  ┼{'─' * 16}┼{"┼".join(f"{'─' * 16}" for i in range(len(results)))}┼"""
 
-    print(
-        f"""\n │ {"Type":14} │ {" │ ".join(f"{m}" for m in currency_anal["milestones"])} │\n ┼{'─' * 16}┼{"┼".join(f"{'─' * 16}" for i in range(len(results)))}┼"""
+    menu = terminal_menu(
+        [
+            f"""│ {emoji(name)}  {name:10} │ {" │ ".join(f"{(required := r.get(name, 0)):14d}" for r in results)} │"""
+            for name in names
+        ],
+        title=title,
+        show_search_hint=False,
     )
 
-    print(
-        "\n".join(
-            f""" │ {emoji(name)}  {name:10} │ {" │ ".join(f"{(required := r.get(name, 0)):14d}" for r in results)} │"""
-            for name in ["currency", "mora"]
-        )
+    while True:
+        clear_screen()
+
+        if (choice := menu.show()) is not None:
+            show_breakdown(
+                (cost_type := names[choice]),
+                currency_anal["milestones"],
+                [r.get(cost_type, 0) for r in results],
+                analysis.breakdown("currency", cost_type),
+            )
+        else:
+            break
+
+
+def missing_furnishing_order(model: Inventory, missing: dict, f_name: str) -> tuple:
+    """Returns sort key of missing `f_name` furnishing in menu order
+
+    Args:
+        model (Inventory): inventory model
+        missing (dict): mapping of furnishing names to number missing
+        f_name (str): furnishing name
+
+    Returns:
+        tuple: sort key, ending with the furnishing name
+    """
+    entry = model.entry(f_name)
+
+    return (
+        entry.blueprint is None,
+        entry.crafted is True,
+        entry.blueprint is not True,
+        not model.housing.furnishings[entry.id].purchasable,
+        -(x := entry.owned) / (missing[f_name] + x),
+        f_name,
     )
 
-    input()
+
+def format_missing_furnishing(model: Inventory, missing: dict, f_name: str) -> str:
+    """Formats menu entry of missing `f_name` furnishing
+
+    Args:
+        model (Inventory): inventory model
+        missing (dict): mapping of furnishing names to number missing
+        f_name (str): furnishing name
+
+    Returns:
+        str: menu entry
+    """
+    entry = model.entry(f_name)
+    f = model.housing.furnishings[entry.id]
+
+    return f"""{"💰" if f.purchasable else "🫖"} {f"📘{emoji_boolean(entry.blueprint)}🔨{emoji_boolean(entry.crafted)}" if f.craftable else " " * 8}  ({entry.owned:2d}/{missing[f_name] + entry.owned:2d})  {f_name}"""
 
 
 def summarize_furnishings(metadata: dict, inventory: dict, analysis: dict):
@@ -266,35 +446,27 @@ def summarize_furnishings(metadata: dict, inventory: dict, analysis: dict):
         inventory (dict): user inventory
         analysis (dict): useful statistics
     """
-    furnishings_md = metadata["furnishings"]
-    furnishings = inventory["furnishings"]
+    index = load_index(metadata)
+    model = Inventory(load_housing(metadata), inventory)
     furnishings_anal = analysis["furnishings"]
 
-    names = sorted(
-        furnishings_anal.keys(),
-        key=lambda name: (
-            furnishings[name].get("blueprint") is None,
-            furnishings[name].get("crafted", False),
-            not furnishings[name].get("blueprint", False),
-            not any(map(lambda k: k in ["currency", "mora"], furnishings_md[name])),
-            -(x := furnishings[name]["owned"]) / (furnishings_anal[name] + x),
-            name,
-        ),
+    view = load_view(
+        "analyze-furnishings",
+        inventory_stamp(metadata, inventory),
+        furnishings_anal,
+        lambda f_name: missing_furnishing_order(model, furnishings_anal, f_name),
+        lambda f_name: format_missing_furnishing(model, furnishings_anal, f_name),
+    )
+    names = view.names
+
+    menu = terminal_menu(
+        view.rows,
+        title="Furnishings\n\n  Legend:\n\n    🫖 = rewarded for trust rank / adeptal mirror quests / events\n    💰 = can be bought from realm depot / traveling salesman/ teyvat NPC\n    📘 = blueprint owned\n    🔨 = crafted at least once\n\n  Track the following:\n",
     )
 
-    choice = 0
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            [
-                f"""{"💰" if any(map(lambda k: k in ["currency", "mora"],furnishings_md[name])) else "🫖"} {f"📘{emoji_boolean(furnishings[name]['blueprint'])}🔨{emoji_boolean(furnishings[name]['crafted'])}" if furnishings_md[name].get("materials") is not None else " " * 8}  ({(owned := furnishings[name]["owned"]):2d}/{furnishings_anal[name] + owned:2d})  {name}"""
-                for name in names
-            ],
-            title="Furnishings\n\n  Legend:\n\n    🫖 = rewarded for trust rank / adeptal mirror quests / events\n    💰 = can be bought from realm depot / traveling salesman/ teyvat NPC\n    📘 = blueprint owned\n    🔨 = crafted at least once\n\n  Track the following:\n",
-            cursor_index=choice,
-        )
-
         if (choice := menu.show()) is not None:
             clear_screen()
 
@@ -302,9 +474,13 @@ def summarize_furnishings(metadata: dict, inventory: dict, analysis: dict):
                 "\n".join(map(lambda x: f"  {x}", recipe))
                 if (
                     recipe := get_crafting_recipe(
-                        multiply_values(
-                            furnishings_md[(f_name := names[choice])].get("materials"),
-                            (num_missing := furnishings_anal[f_name]),
+                        get_materials_for_furnishings(
+                            metadata,
+                            {
+                                (f_name := names[choice]): (
+                                    num_missing := furnishings_anal[f_name]
+                                )
+                            },
                         )
                     )
                 )
@@ -314,7 +490,7 @@ def summarize_furnishings(metadata: dict, inventory: dict, analysis: dict):
 
             recipe = (
                 f"\n Materials:\n\n{recipe}\n"
-                if furnishings[f_name].get("blueprint") is not None
+                if model.entry(f_name).blueprint is not None
                 else ""
             )
 
@@ -328,7 +504,16 @@ def summarize_furnishings(metadata: dict, inventory: dict, analysis: dict):
             )
             cost = f"""\n Cost:\n\n{cost}""" if len(cost) > 0 else ""
 
-            print(f"{f_name}:\n\n {num_missing:4d}×  missing\n{recipe}{cost}")
+            hsets = "\n".join(
+                f"  {analysis['sets'][s_name][f_name]:4d}×  {s_name}"
+                for s_name in index.sets_using(f_name)
+                if f_name in analysis["sets"].get(s_name, {})
+            )
+            hsets = f"\n Missing in sets:\n\n{hsets}\n" if len(hsets) > 0 else ""
+
+            print(
+                f"{f_name}:\n\n {num_missing:4d}×  missing\n{hsets}{recipe}{cost}"
+            )
 
             input()
         else:
@@ -343,32 +528,27 @@ def summarize_sets(metadata: dict, inventory: dict, analysis: dict):
         inventory (dict): user inventory
         analysis (dict): useful statistics
     """
-    sets_md = metadata["sets"]
+    index = load_index(metadata)
     sets = inventory["sets"]
     sets_anal = analysis["sets"]
 
-    names = sorted(
-        sets_anal.keys(),
-        key=lambda name: (
-            sets_md[name].get("companions") is None,
-            sets[name]["owned"],
-            name,
-        ),
+    view = load_view(
+        "analyze-sets",
+        inventory_stamp(metadata, inventory),
+        sets_anal,
+        lambda name: (not index.is_gift_set(name), sets[name]["owned"], name),
+        lambda name: f"""{"🎁" if index.is_gift_set(name) else "🏡"}{emoji_boolean(sets[name]["owned"])}  {name}""",
+    )
+    names = view.names
+
+    menu = terminal_menu(
+        view.rows,
+        title="Sets\n\n  Legend:\n\n    🎁 = gift set\n    🏡 = furniture set\n\n  Track the following:\n",
     )
 
-    choice = 0
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            [
-                f"""{"🎁" if sets_md[name].get("companions") is not None else "🏡"}{emoji_boolean(sets[name]["owned"])}  {name}"""
-                for name in names
-            ],
-            title="Sets\n\n  Legend:\n\n    🎁 = gift set\n    🏡 = furniture set\n\n  Track the following:\n",
-            cursor_index=choice,
-        )
-
         if (choice := menu.show()) is not None:
             clear_screen()
 
@@ -412,7 +592,7 @@ def summarize_sets(metadata: dict, inventory: dict, analysis: dict):
                                     get_materials_for_furnishings(
                                         metadata, furnishings
                                     ).items(),
-                                    key=lambda item: item[0].split()[-1],
+                                    key=lambda item: index.material_rank(item[0]),
                                 )
                             )
                         )
@@ -434,34 +614,198 @@ def summarize_sets(metadata: dict, inventory: dict, analysis: dict):
             break
 
 
+EXPORT_FIELDS: List[str] = [
+    "inventory",
+    "table",
+    "milestone",
+    "name",
+    "amount",
+    "owned",
+]
+"""Fields of rows of exported analyses"""
+
+
+def iterate_rows(name: str, inventory: dict, analysis: dict) -> Iterator[dict]:
+    """Yields rows of `analysis` of `name` inventory, table by table
+
+    Args:
+        name (str): inventory name
+        inventory (dict): user inventory
+        analysis (dict): useful statistics
+
+    Yields:
+        Iterator[dict]: mapping of export fields to values
+    """
+
+    def row(table, milestone=None, item=None, amount=None, owned=None):
+        return dict(
+            inventory=name,
+            table=table,
+            milestone=milestone,
+            name=item,
+            amount=amount,
+            owned=owned,
+        )
+
+    for table in ["materials", "currency"]:
+        for milestone, legend in zip(
+            analysis[table]["milestones"], analysis[table]["legend"]
+        ):
+            yield row(f"{table} milestones", milestone.strip(), legend)
+
+    for milestone, result in zip(
+        analysis["materials"]["milestones"], analysis["materials"]["results"]
+    ):
+        for m_name, amount in result.items():
+            yield row(
+                "materials",
+                milestone.strip(),
+                m_name,
+                amount,
+                inventory["materials"].get(m_name),
+            )
+
+    for milestone, result in zip(
+        analysis["currency"]["milestones"], analysis["currency"]["results"]
+    ):
+        for cost_type, amount in result.items():
+            yield row("currency", milestone.strip(), cost_type, amount)
+
+    for f_name, num_missing in analysis["furnishings"].items():
+        yield row(
+            "furnishings",
+            None,
+            f_name,
+            num_missing,
+            inventory["furnishings"][f_name]["owned"],
+        )
+
+    for s_name, items in analysis["sets"].items():
+        for item, num_missing in items.items():
+            yield row("sets", s_name, item, num_missing)
+
+
+def export_analyses(
+    metadata: dict,
+    inventories: Iterator[Tuple[str, dict]],
+    output_format: str,
+    file_pointer: TextIO,
+):
+    """Analyses each of `inventories` and writes it to `file_pointer` as it goes
+
+    Analyses are read from and saved to the analysis cache,
+    so exporting inventories which did not change since the previous export
+    does not analyse them again.
+
+    Args:
+        metadata (dict): housing metadata
+        inventories (Iterator[Tuple[str, dict]]): pairs of inventory names and inventories
+        output_format (str): one of `json`, `csv` or `ndjson`
+        file_pointer (TextIO): output file
+    """
+    if output_format == "csv":
+        writer = csv.DictWriter(file_pointer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+    elif output_format == "json":
+        file_pointer.write("[")
+
+    for i, (name, inventory) in enumerate(inventories):
+        update_inventory(metadata, inventory, persist=False)
+        analysis = dict(load_analysis(metadata, inventory))
+
+        if output_format == "json":
+            if i > 0:
+                file_pointer.write(",")
+            json.dump(
+                dict(inventory=name, analysis=analysis),
+                file_pointer,
+                ensure_ascii=False,
+            )
+        elif output_format == "csv":
+            writer.writerows(iterate_rows(name, inventory, analysis))
+        else:
+            for row in iterate_rows(name, inventory, analysis):
+                file_pointer.write(f"{json.dumps(row, ensure_ascii=False)}\n")
+
+    if output_format == "json":
+        file_pointer.write("]\n")
+
+
+def read_inventories(paths: List[str]) -> Iterator[Tuple[str, dict]]:
+    """Yields inventories loaded from `paths` one at a time
+
+    Args:
+        paths (List[str]): inventory files
+
+    Yields:
+        Iterator[Tuple[str, dict]]: pairs of paths and inventories
+    """
+    for path in paths:
+        with open(path, "r") as file_pointer:
+            yield path, json.load(file_pointer)
+
+
 @click.command(options_metavar="[options]")
-def analyze():
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(["json", "csv", "ndjson"]),
+    help="Write analysis in <format> instead of showing menus",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    metavar="<path>",
+    help="Write analysis to <path>. Defaults to standard output",
+)
+@click.option(
+    "-i",
+    "--inventory",
+    "paths",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    metavar="<path>",
+    help="Analyze inventory in <path> instead of saved inventory. Can be repeated",
+)
+def analyze(output_format: Optional[str], output: TextIO, paths: Tuple[str]):
     """Performs analysis on inventory"""
 
     if (metadata := load_metadata()) is None:
         print(bold(color("Housing data not found!", "red")))
         exit(1)
 
+    if output_format is not None or len(paths) > 0:
+        if len(paths) > 0:
+            inventories = read_inventories(paths)
+        else:
+            inventories = [
+                ("inventory", load_inventory() or create_inventory_schema())
+            ]
+
+        export_analyses(metadata, inventories, output_format or "json", output)
+        return
+
     if (inventory := load_inventory()) is None:
         inventory = create_inventory_schema()
 
     update_inventory(metadata, inventory)
 
-    analysis = perform_analysis(metadata, inventory)
+    analysis = load_analysis(metadata, inventory)
 
-    options = list(k for k, v in analysis.items() if len(v) != 0)
+    options = list(k for k in analysis if analysis.has_results(k))
+
+    menu = terminal_menu(
+        [f"{emoji(o)} {o}" for o in options],
+        title="Analyze:\n",
+        show_search_hint=False,
+    )
 
-    choice = 0
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            [f"{emoji(o)} {o}" for o in options],
-            title="Analyze:\n",
-            cursor_index=choice,
-            show_search_hint=False,
-        )
-
         if (choice := menu.show()) is not None:
             dict(
                 materials=lambda a: summarize_materials(metadata, inventory, a),
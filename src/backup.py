@@ -1,15 +1,416 @@
 """This module defines functions for creating backups"""
 
-
+from datetime import datetime
+import glob
+import hashlib
 import os
 import json
+from typing import List, Optional
+import zlib
 
 
 import click
 
 
-from .file import load_inventory, save_inventory
-from .utils import bold, color, prompt_confirm
+from .file import (
+    load_inventory,
+    load_metadata,
+    lock_file,
+    save_inventory,
+    write_json,
+)
+from .utils import bold, color, italic, prompt_confirm
+from .validate import compile_validator, repair_inventory
+
+CHUNK_SIZE: int = 32
+"""Average number of entries of an inventory section stored per chunk"""
+
+
+def is_chunk_boundary(name: str) -> bool:
+    """Checks whether a chunk ends at entry `name`
+
+    Boundaries depend only on the name of the entry,
+    so that adding or removing an entry does not move those of other chunks.
+
+    Args:
+        name (str): entry name
+
+    Returns:
+        bool: whether the chunk ends after this entry
+    """
+    return zlib.crc32(name.encode()) % CHUNK_SIZE == 0
+
+
+def chunk_inventory(inventory: dict) -> List[bytes]:
+    """Splits `inventory` into chunks of canonical JSON
+
+    Entries of each section are grouped in key order,
+    with boundaries defined by their names,
+    so that editing, adding or removing one entry changes only the chunk it belongs to.
+
+    Args:
+        inventory (dict): user inventory
+
+    Returns:
+        List[bytes]: chunks
+    """
+    chunks = []
+
+    for section, entries in inventory.items():
+        if isinstance(entries, dict):
+            chunk = {}
+
+            for name in sorted(entries.keys()):
+                chunk[name] = entries[name]
+
+                if is_chunk_boundary(name):
+                    chunks.append({"section": section, "entries": chunk})
+                    chunk = {}
+
+            if len(chunk) != 0 or len(entries) == 0:
+                chunks.append({"section": section, "entries": chunk})
+        else:
+            chunks.append({"section": section, "value": entries})
+
+    return [
+        json.dumps(chunk, sort_keys=True, separators=(",", ":")).encode()
+        for chunk in chunks
+    ]
+
+
+def lock_repository(repository: str):
+    """Holds an exclusive lock on `repository` for the duration of the context
+
+    Snapshots are created and pruned under this lock,
+    so that pruning never deletes chunks a snapshot being created refers to.
+
+    Args:
+        repository (str): repository folder
+    """
+    os.makedirs(repository, exist_ok=True)
+
+    return lock_file(os.path.join(repository, "repository"))
+
+
+def write_object(repository: str, data: bytes) -> str:
+    """Stores compressed `data` in `repository`, addressed by its content
+
+    Args:
+        repository (str): repository folder
+        data (bytes): subject data
+
+    Returns:
+        str: content hash
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.join(repository, "objects", digest[:2], digest)
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(f"{path}.tmp", "wb") as file_pointer:
+            file_pointer.write(zlib.compress(data, 9))
+
+        os.replace(f"{path}.tmp", path)
+
+    return digest
+
+
+def read_object(repository: str, digest: str) -> bytes:
+    """Loads data addressed by `digest` from `repository`
+
+    Args:
+        repository (str): repository folder
+        digest (str): content hash
+
+    Returns:
+        bytes: subject data
+    """
+    with open(os.path.join(repository, "objects", digest[:2], digest), "rb") as fp:
+        return zlib.decompress(fp.read())
+
+
+def list_snapshots(repository: str, profile: Optional[str] = None) -> List[dict]:
+    """Lists snapshots in `repository`, oldest first
+
+    Args:
+        repository (str): repository folder
+        profile (Optional[str], optional): only list snapshots of profile. Defaults to None.
+
+    Returns:
+        List[dict]: snapshot manifests
+    """
+    folder = os.path.join(repository, "snapshots")
+
+    if not os.path.isdir(folder):
+        return []
+
+    snapshots = []
+
+    for name in os.listdir(folder):
+        if name.endswith(".json"):
+            with open(os.path.join(folder, name), "r") as file_pointer:
+                snapshot = json.load(file_pointer)
+
+            if profile is None or snapshot["profile"] == profile:
+                snapshots.append(snapshot)
+
+    return sorted(snapshots, key=lambda s: datetime.fromisoformat(s["time"]))
+
+
+def create_snapshot(repository: str, profile: str, inventory: dict) -> Optional[str]:
+    """Stores a snapshot of `inventory` in `repository`
+
+    Only chunks not already stored in the repository are written.
+
+    Args:
+        repository (str): repository folder
+        profile (str): inventory profile
+        inventory (dict): user inventory
+
+    Returns:
+        Optional[str]: snapshot id, or `None` if unchanged since the latest snapshot
+    """
+    with lock_repository(repository):
+        chunks = [
+            write_object(repository, chunk) for chunk in chunk_inventory(inventory)
+        ]
+
+        if len(snapshots := list_snapshots(repository, profile)) > 0 and (
+            snapshots[-1]["chunks"] == chunks
+        ):
+            return None
+
+        time = datetime.now().astimezone()
+        digest = hashlib.sha256("".join([profile, *chunks]).encode()).hexdigest()
+        snapshot_id = f"{time:%Y%m%dT%H%M%S}-{digest[:8]}"
+
+        os.makedirs(os.path.join(repository, "snapshots"), exist_ok=True)
+        write_json(
+            os.path.join(repository, "snapshots", f"{snapshot_id}.json"),
+            dict(id=snapshot_id, profile=profile, time=time.isoformat(), chunks=chunks),
+        )
+
+    return snapshot_id
+
+
+def find_snapshot(repository: str, profile: str, reference: str) -> Optional[dict]:
+    """Finds snapshot of `profile` by id, or the latest one taken at or before a time
+
+    Args:
+        repository (str): repository folder
+        profile (str): inventory profile
+        reference (str): snapshot id or ISO 8601 time
+
+    Returns:
+        Optional[dict]: snapshot manifest
+    """
+    snapshots = list_snapshots(repository, profile)
+
+    for snapshot in snapshots:
+        if snapshot["id"] == reference:
+            return snapshot
+
+    try:
+        time = datetime.fromisoformat(reference).astimezone()
+    except ValueError:
+        return None
+
+    return next(
+        (s for s in reversed(snapshots) if datetime.fromisoformat(s["time"]) <= time),
+        None,
+    )
+
+
+def restore_snapshot(repository: str, snapshot: dict) -> dict:
+    """Reassembles inventory from the chunks of `snapshot`
+
+    Args:
+        repository (str): repository folder
+        snapshot (dict): snapshot manifest
+
+    Returns:
+        dict: user inventory
+    """
+    inventory = {}
+
+    for digest in snapshot["chunks"]:
+        chunk = json.loads(read_object(repository, digest))
+
+        if "value" in chunk:
+            inventory[chunk["section"]] = chunk["value"]
+        else:
+            inventory.setdefault(chunk["section"], {}).update(chunk["entries"])
+
+    return inventory
+
+
+def prune_snapshots(
+    repository: str,
+    profile: str,
+    keep_last: Optional[int] = None,
+    keep_daily: Optional[int] = None,
+) -> int:
+    """Deletes snapshots of `profile` outside the retention policy,
+    along with chunks no longer referenced by any snapshot
+
+    Args:
+        repository (str): repository folder
+        profile (str): inventory profile
+        keep_last (Optional[int], optional): number of latest snapshots to keep. Defaults to None.
+        keep_daily (Optional[int], optional): number of latest days to keep the last snapshot of. Defaults to None.
+
+    Returns:
+        int: number of deleted snapshots
+    """
+    with lock_repository(repository):
+        snapshots = list(reversed(list_snapshots(repository, profile)))
+
+        keep = set(s["id"] for s in snapshots[: keep_last or 0])
+
+        days = {}
+        for snapshot in snapshots:
+            days.setdefault(snapshot["time"][:10], snapshot["id"])
+
+        keep.update(list(days.values())[: keep_daily or 0])
+
+        deleted = 0
+        for snapshot in snapshots:
+            if snapshot["id"] not in keep:
+                os.remove(
+                    os.path.join(repository, "snapshots", f"{snapshot['id']}.json")
+                )
+                deleted += 1
+
+        referenced = set(
+            digest for s in list_snapshots(repository) for digest in s["chunks"]
+        )
+
+        for folder, _, names in os.walk(os.path.join(repository, "objects")):
+            for name in names:
+                if name not in referenced and not name.endswith(".tmp"):
+                    os.remove(os.path.join(folder, name))
+
+    return deleted
+
+
+def manage_repository(
+    repository: str,
+    profile: str,
+    snapshot: bool,
+    show: bool,
+    restore: Optional[str],
+    keep_last: Optional[int],
+    keep_daily: Optional[int],
+):
+    """Manages snapshots of `profile` in backup `repository`
+
+    Args:
+        repository (str): repository folder
+        profile (str): inventory profile
+        snapshot (bool): add snapshot of inventory
+        show (bool): list snapshots
+        restore (Optional[str]): snapshot id or time to restore inventory from
+        keep_last (Optional[int]): number of latest snapshots to keep
+        keep_daily (Optional[int]): number of latest days to keep the last snapshot of
+    """
+    if snapshot:
+        if (inventory := load_inventory()) is None:
+            print(bold(color("Could not load inventory!", "red")))
+            exit(1)
+
+        if (snapshot_id := create_snapshot(repository, profile, inventory)) is None:
+            print(italic("Inventory unchanged since latest snapshot."))
+        else:
+            print(bold(color(f"Created snapshot '{snapshot_id}'!", "green")))
+
+    if keep_last is not None or keep_daily is not None:
+        deleted = prune_snapshots(repository, profile, keep_last, keep_daily)
+        print(bold(color(f"Pruned {deleted} snapshots!", "green")))
+
+    if show:
+        for s in list_snapshots(repository, profile):
+            print(f"{s['id']}  {s['time']}")
+
+    if restore is not None:
+        if (found := find_snapshot(repository, profile, restore)) is None:
+            print(bold(color(f"Could not find snapshot '{restore}'", "red")))
+            exit(1)
+
+        if prompt_confirm(
+            f"Are you sure you want to restore inventory from snapshot '{found['id']}'?"
+        ):
+            save_inventory(restore_snapshot(repository, found), merge=False)
+
+            print(bold(color("Restored snapshot!", "green")))
+
+
+def check_backups(pattern: str):
+    """Validates every backup matching `pattern` against metadata
+
+    Args:
+        pattern (str): backup file, folder of backups or glob pattern
+    """
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    validate = compile_validator(metadata)
+
+    paths = sorted(
+        glob.glob(os.path.join(pattern, "*.json"))
+        if os.path.isdir(pattern)
+        else glob.glob(pattern)
+    )
+
+    num_invalid = 0
+    for path in paths:
+        try:
+            with open(path, "r") as file_pointer:
+                problems = validate(json.load(file_pointer))
+        except ValueError as error:
+            problems = [("", f"invalid JSON ({error})")]
+
+        if len(problems) > 0:
+            num_invalid += 1
+            print(bold(color(path, "red")))
+            print("\n".join(f"  {p or '/'}: {message}" for p, message in problems))
+
+    print(
+        bold(
+            color(
+                f"{len(paths) - num_invalid}/{len(paths)} backups are valid!",
+                "green" if num_invalid == 0 else "red",
+            )
+        )
+    )
+
+
+def validate_backup(inventory: dict) -> Optional[dict]:
+    """Validates imported `inventory` against metadata, offering to repair it
+
+    Args:
+        inventory (dict): imported inventory
+
+    Returns:
+        Optional[dict]: inventory to import, or `None` to abort
+    """
+    if (metadata := load_metadata()) is None:
+        return inventory
+
+    if len(problems := compile_validator(metadata)(inventory)) == 0:
+        return inventory
+
+    print(
+        "\n".join(
+            bold(color(f"{p or '/'}: {message}", "red")) for p, message in problems
+        )
+    )
+
+    if prompt_confirm(f"Repair {len(problems)} problems in backup?"):
+        return repair_inventory(metadata, inventory)
+
+    return None
 
 
 @click.command(options_metavar="[options]")
@@ -20,17 +421,83 @@ from .utils import bold, color, prompt_confirm
 @click.option(
     "-e", "--export", "export", flag_value=True, help="Export inventory to <path>"
 )
-def backup(path: str, export: bool):
+@click.option(
+    "-c",
+    "--check",
+    is_flag=True,
+    help="Validate backups matching <path> without importing",
+)
+@click.option(
+    "-s",
+    "--snapshot",
+    is_flag=True,
+    help="Add inventory snapshot to repository at <path>",
+)
+@click.option(
+    "-l", "--list", "show", is_flag=True, help="List snapshots in repository at <path>"
+)
+@click.option(
+    "-r",
+    "--restore",
+    metavar="<id|time>",
+    help="Restore inventory from snapshot <id> or latest snapshot at <time>",
+)
+@click.option(
+    "-p",
+    "--profile",
+    default="default",
+    metavar="<name>",
+    help="Profile of snapshots in repository",
+)
+@click.option(
+    "--keep-last",
+    type=click.INT,
+    metavar="<n>",
+    help="Prune all but the <n> latest snapshots",
+)
+@click.option(
+    "--keep-daily",
+    type=click.INT,
+    metavar="<n>",
+    help="Prune all but the last snapshot of the <n> latest days",
+)
+def backup(
+    path: str,
+    export: bool,
+    check: bool,
+    snapshot: bool,
+    show: bool,
+    restore: Optional[str],
+    profile: str,
+    keep_last: Optional[int],
+    keep_daily: Optional[int],
+):
     """Creates or loads inventory backup"""
 
-    if export or os.path.isfile(path):
+    if check:
+        check_backups(path)
+    elif (
+        snapshot
+        or show
+        or restore is not None
+        or keep_last is not None
+        or keep_daily is not None
+    ):
+        manage_repository(path, profile, snapshot, show, restore, keep_last, keep_daily)
+    elif export or os.path.isfile(path):
         if prompt_confirm(
             f"Are you sure you want to {'import inventory from' if not export else 'export inventory to'} '{path}'?"
         ):
             if not export:
-                with open(path, "r") as file_pointer:
-                    inventory = json.load(file_pointer)
-                    save_inventory(inventory)
+                try:
+                    with open(path, "r") as file_pointer:
+                        inventory = json.load(file_pointer)
+                except (json.JSONDecodeError, OSError) as error:
+                    print(bold(color(f"Could not read backup: {error}", "red")))
+                    exit(1)
+
+                if (inventory := validate_backup(inventory)) is not None:
+                    save_inventory(inventory, merge=False)
 
                     print(bold(color("Imported backup!", "green")))
             else:
@@ -0,0 +1,210 @@
+"""This module defines functions for analysing many inventories in parallel"""
+
+
+import glob
+import json
+import multiprocessing
+import os
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+
+import click
+
+
+from .analyze import LazyAnalysis
+from .engine import compile_catalog
+from .file import load_metadata
+from .reset import update_inventory
+from .utils import bold, color
+
+
+def find_inventories(pattern: str) -> List[str]:
+    """Finds inventory files in folder or matching glob `pattern`
+
+    Args:
+        pattern (str): folder of JSON files, or glob pattern
+
+    Returns:
+        List[str]: sorted inventory files
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.json")
+
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def analyze_inventory(metadata: dict, path: str) -> dict:
+    """Analyses inventory in `path`
+
+    Args:
+        metadata (dict): housing metadata
+        path (str): inventory file
+
+    Returns:
+        dict: materials and currency per milestone, missing furnishings and sets,
+            or error message
+    """
+    try:
+        with open(path, "r") as file_pointer:
+            inventory = json.load(file_pointer)
+
+        update_inventory(metadata, inventory, persist=False)
+        analysis = LazyAnalysis(metadata, inventory)
+
+        return dict(
+            inventory=path,
+            materials=analysis["materials"]["results"],
+            currency=analysis["currency"]["results"],
+            furnishings=analysis["furnishings"],
+            sets=analysis["sets"],
+        )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+        return dict(inventory=path, error=f"{type(error).__name__}: {error}")
+
+
+METADATA: Optional[dict] = None
+"""Housing metadata of a worker process"""
+
+
+def start_worker(metadata: dict):
+    """Keeps housing metadata in a worker process
+
+    Args:
+        metadata (dict): housing metadata
+    """
+    global METADATA
+
+    METADATA = metadata
+    compile_catalog(metadata)
+
+
+def analyze_in_worker(path: str) -> dict:
+    """Analyses inventory in `path` with the metadata of the worker process
+
+    Args:
+        path (str): inventory file
+
+    Returns:
+        dict: materials and currency per milestone, missing furnishings and sets,
+            or error message
+    """
+    return analyze_inventory(METADATA, path)
+
+
+def analyze_inventories(
+    metadata: dict, paths: List[str], processes: int = 1, chunksize: int = 0
+) -> Iterator[dict]:
+    """Yields analysis of each inventory in `paths`, in order
+
+    The catalog is compiled before workers start,
+    so forked workers share it and the metadata with this process.
+
+    Args:
+        metadata (dict): housing metadata
+        paths (List[str]): inventory files
+        processes (int, optional): number of worker processes. Defaults to 1.
+        chunksize (int, optional): inventories sent to a worker at a time.
+            Defaults to 0, for about four chunks per worker.
+
+    Yields:
+        Iterator[dict]: analysis of each inventory
+    """
+    metadata = dict(metadata)
+    compile_catalog(metadata)
+
+    if processes <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield analyze_inventory(metadata, path)
+
+        return
+
+    chunksize = chunksize or max(1, len(paths) // (processes * 4))
+
+    with multiprocessing.Pool(
+        processes, initializer=start_worker, initargs=(metadata,)
+    ) as pool:
+        yield from pool.imap(analyze_in_worker, paths, chunksize=chunksize)
+
+
+def aggregate_analyses(results: Iterable[dict]) -> Iterator[dict]:
+    """Yields each of `results`, then their aggregate
+
+    Materials and currency are summed per milestone,
+    while furnishings and sets count the inventories missing them.
+
+    Args:
+        results (Iterable[dict]): analysis of each inventory
+
+    Yields:
+        Iterator[dict]: analysis of each inventory, then aggregate
+    """
+    aggregate = dict(
+        inventories=0, failed=0, materials=[], currency=[], furnishings={}, sets={}
+    )
+
+    for result in results:
+        yield result
+
+        aggregate["inventories"] += 1
+
+        if "error" in result:
+            aggregate["failed"] += 1
+            continue
+
+        for table in ["materials", "currency"]:
+            totals = aggregate[table]
+            totals.extend({} for _ in range(len(result[table]) - len(totals)))
+
+            for total, needed in zip(totals, result[table]):
+                for name, amount in needed.items():
+                    total[name] = total.get(name, 0) + amount
+
+        for table in ["furnishings", "sets"]:
+            counts = aggregate[table]
+
+            for name in result[table]:
+                counts[name] = counts.get(name, 0) + 1
+
+    yield dict(aggregate=aggregate)
+
+
+@click.command("analyze-batch", options_metavar="[options]")
+@click.argument("pattern", metavar="<dir|glob>")
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    metavar="<path>",
+    help="Write results to <path>. Defaults to standard output",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    metavar="<n>",
+    help="Analyze inventories in <n> processes. Defaults to the number of CPUs",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    metavar="<n>",
+    help="Send <n> inventories to a process at a time",
+)
+def analyze_batch(pattern: str, output: TextIO, jobs: int, chunk_size: Optional[int]):
+    """Analyzes many exported inventories"""
+
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if len(paths := find_inventories(pattern)) == 0:
+        print(bold(color(f"Could not find inventories in '{pattern}'", "red")))
+        exit(1)
+
+    for result in aggregate_analyses(
+        analyze_inventories(metadata, paths, jobs, chunk_size or 0)
+    ):
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
@@ -0,0 +1,171 @@
+"""This module defines the cost model of furnishings and sets.
+
+Prices are compiled once per metadata fingerprint into vectors of Realm Currency and mora
+aligned with furnishing and set ids: the price of a blueprint, paid once unless owned,
+and the price of an item, paid for each item.
+The cost of any mapping of items to counts is then a single accumulation
+of these vectors, weighted by counts and by a mask of owned blueprints.
+"""
+
+
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+
+from .models import Housing, load_housing
+
+
+COST_TYPES: List[str] = ["currency", "mora"]
+"""Types of cost, in the order of the components of cost vectors"""
+
+
+class CostModel:
+    """Cost vectors of furnishings and sets"""
+
+    __slots__ = (
+        "fingerprint",
+        "types",
+        "blueprints",
+        "items",
+        "set_types",
+        "sets",
+    )
+
+    def __init__(self, housing: Housing):
+        """Compiles cost vectors of `housing`
+
+        Args:
+            housing (Housing): housing models
+        """
+        self.fingerprint: Optional[str] = housing.fingerprint
+
+        self.types: List[int] = [
+            COST_TYPES.index(f.cost_type) for f in housing.furnishings
+        ]
+        self.blueprints: List[Tuple[int, int]] = [
+            price(t, f.cost if f.craftable else 0)
+            for t, f in zip(self.types, housing.furnishings)
+        ]
+        self.items: List[Tuple[int, int]] = [
+            price(t, f.cost if not f.craftable else 0)
+            for t, f in zip(self.types, housing.furnishings)
+        ]
+
+        self.set_types: List[int] = [COST_TYPES.index(s.cost_type) for s in housing.sets]
+        self.sets: List[Tuple[int, int]] = [
+            price(t, s.cost) for t, s in zip(self.set_types, housing.sets)
+        ]
+
+
+def price(cost_type: int, amount: int) -> Tuple[int, int]:
+    """Returns cost vector of `amount` of `cost_type`
+
+    Args:
+        cost_type (int): index in `COST_TYPES`
+        amount (int): amount
+
+    Returns:
+        Tuple[int, int]: Realm Currency and mora
+    """
+    return (amount, 0) if cost_type == 0 else (0, amount)
+
+
+def compile_cost_model(housing: Housing) -> CostModel:
+    """Returns cost model of `housing`, compiling it on first use
+
+    Args:
+        housing (Housing): housing models
+
+    Returns:
+        CostModel: cost model
+    """
+    if housing.cost_model is None:
+        housing.cost_model = CostModel(housing)
+
+    return housing.cost_model
+
+
+def load_cost_model(metadata: dict) -> CostModel:
+    """Returns cost model of `metadata`, kept with its housing models
+
+    Args:
+        metadata (dict): housing metadata
+
+    Returns:
+        CostModel: cost model
+    """
+    return compile_cost_model(load_housing(metadata))
+
+
+def furnishing_cost(
+    model: CostModel, f_id: int, count: int, blueprint: Optional[bool]
+) -> Tuple[int, int]:
+    """Returns cost vector of `count` of `f_id` furnishing
+
+    Args:
+        model (CostModel): cost model
+        f_id (int): furnishing id
+        count (int): furnishing count
+        blueprint (Optional[bool]): blueprint ownership
+
+    Returns:
+        Tuple[int, int]: Realm Currency and mora
+    """
+    unpaid = not blueprint
+    blueprint_currency, blueprint_mora = model.blueprints[f_id]
+    item_currency, item_mora = model.items[f_id]
+
+    return (
+        blueprint_currency * unpaid + item_currency * count,
+        blueprint_mora * unpaid + item_mora * count,
+    )
+
+
+def accumulate_costs(
+    model: CostModel,
+    furnishings: Iterable[Tuple[int, int]],
+    sets: Iterable[int],
+    blueprint: Union[Sequence[Optional[bool]], Mapping[int, Optional[bool]]],
+) -> dict:
+    """Returns cost of `furnishings` and `sets`
+
+    Only types of cost of the given items are included, in order of appearance,
+    even if their total is zero.
+
+    Args:
+        model (CostModel): cost model
+        furnishings (Iterable[Tuple[int, int]]): pairs of furnishing ids and counts
+        sets (Iterable[int]): ids of sets to buy
+        blueprint (Union[Sequence[Optional[bool]], Mapping[int, Optional[bool]]]):
+            blueprint ownership by furnishing id
+
+    Returns:
+        dict: mapping of types of cost to total
+    """
+    totals = [0, 0]
+    present = []
+
+    blueprints = model.blueprints
+    items = model.items
+    types = model.types
+
+    for f_id, count in furnishings:
+        unpaid = not blueprint[f_id]
+        blueprint_currency, blueprint_mora = blueprints[f_id]
+        item_currency, item_mora = items[f_id]
+
+        totals[0] += blueprint_currency * unpaid + item_currency * count
+        totals[1] += blueprint_mora * unpaid + item_mora * count
+
+        if types[f_id] not in present:
+            present.append(types[f_id])
+
+    for s_id in sets:
+        set_currency, set_mora = model.sets[s_id]
+
+        totals[0] += set_currency
+        totals[1] += set_mora
+
+        if model.set_types[s_id] not in present:
+            present.append(model.set_types[s_id])
+
+    return {COST_TYPES[t]: totals[t] for t in present}
@@ -6,6 +6,7 @@ This metadata is gathered by scraping the Genshin Impact Wiki.
 
 import asyncio
 from collections.abc import Callable
+import copy
 import locale
 import re
 from typing import List, Dict
@@ -18,8 +19,8 @@ import tqdm
 import tqdm.asyncio
 
 
-from .file import load_metadata, save_metadata
-from .reset import create_metadata_schema
+from .file import compute_fingerprint, load_metadata, save_metadata
+from .reset import create_metadata_schema, diff_metadata
 from .utils import bold, clean_dict, color, gather_dict, italic
 
 
@@ -376,6 +377,8 @@ def download():
     if (metadata := load_metadata()) is None:
         metadata = create_metadata_schema()
 
+    previous = copy.deepcopy(dict(metadata))
+
     print(italic("Refreshing sources..."))
     sources = asyncio.run(fetch_sources())
 
@@ -388,4 +391,11 @@ def download():
     print(f"\nGathering {bold(len(sets_urls))} Sets...")
     asyncio.run(scrape_urls(sets_urls, metadata, sources, parse_set))
 
+    if (fingerprint := compute_fingerprint(metadata)) != previous.get("fingerprint"):
+        metadata["changes"] = dict(
+            base=previous.get("fingerprint"), **diff_metadata(previous, metadata)
+        )
+        metadata["fingerprint"] = fingerprint
+        save_metadata(metadata)
+
     print(bold(color("\nHousing metadata updated!", "green")))
@@ -0,0 +1,712 @@
+"""This module defines the compiled engine for analysing inventory.
+
+Housing models are compiled once into rows indexed by the ids of the metadata index:
+set requirements and crafting recipes are sparse rows over furnishing and material ids,
+and costs are the vectors of the cost model, aligned with the same ids.
+Inventory is compiled into columns aligned with the same ids.
+Milestones are then computed as element-wise maxima over rows of missing furnishings,
+and reduced to materials and costs with one pass over the selected rows.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+
+from .cost import (
+    COST_TYPES,
+    CostModel,
+    accumulate_costs,
+    compile_cost_model,
+    furnishing_cost,
+)
+from .index import MetadataIndex, load_index
+from .models import Housing, load_housing
+
+
+class Catalog:
+    """Housing metadata compiled into integer indexed rows and columns"""
+
+    def __init__(self, housing: Housing, index: MetadataIndex):
+        """Compiles `housing` models
+
+        Args:
+            housing (Housing): housing models
+            index (MetadataIndex): ids of names in metadata
+        """
+        self.index = index
+
+        self.materials: List[str] = index.materials
+        self.furnishings: List[str] = index.furnishings
+        self.furnishing_ids: Dict[str, int] = housing.furnishing_ids
+        self.craftable: List[bool] = index.craftable
+
+        self.recipes: List[Tuple[Tuple[int, int], ...]] = [
+            f.recipe or () for f in housing.furnishings
+        ]
+
+        self.sets: List[str] = index.sets
+        self.set_ids: Dict[str, int] = housing.set_ids
+
+        self.requirements: List[Tuple[Tuple[int, int], ...]] = [
+            s.requirements for s in housing.sets
+        ]
+
+        self.usages: List[List[Tuple[int, int]]] = [[] for _ in self.furnishings]
+        for s_id, requirement in enumerate(self.requirements):
+            for f_id, num_required in requirement:
+                self.usages[f_id].append((s_id, num_required))
+
+        self.costs: CostModel = compile_cost_model(housing)
+
+
+def compile_catalog(metadata: dict) -> Catalog:
+    """Returns compiled catalog of `metadata`, kept with its housing models
+
+    Args:
+        metadata (dict): housing metadata
+
+    Returns:
+        Catalog: compiled catalog
+    """
+    if (housing := load_housing(metadata)).catalog is None:
+        housing.catalog = Catalog(housing, load_index(metadata))
+
+    return housing.catalog
+
+
+def is_gifting(hset: dict, companions: dict) -> bool:
+    """Checks whether `hset` has an owned companion which hasn't gifted yet
+
+    Args:
+        hset (dict): set inventory
+        companions (dict): companions inventory
+
+    Returns:
+        bool: whether set has gifting companions
+    """
+    return "companions" in hset and not all(
+        gifted for c_name, gifted in hset["companions"].items() if companions[c_name]
+    )
+
+
+def compile_inventory(catalog: Catalog, inventory: dict) -> dict:
+    """Compiles `inventory` into columns aligned with `catalog`
+
+    Args:
+        catalog (Catalog): compiled catalog
+        inventory (dict): user inventory
+
+    Returns:
+        dict: mapping of column names to columns
+    """
+    furnishings = inventory["furnishings"]
+    sets = inventory["sets"]
+    companions = inventory["companions"]
+
+    entries = [furnishings[f_name] for f_name in catalog.furnishings]
+    set_entries = [sets[s_name] for s_name in catalog.sets]
+
+    return dict(
+        owned=[f["owned"] for f in entries],
+        blueprint=[f.get("blueprint") for f in entries],
+        crafted=[bool(f.get("crafted")) for f in entries],
+        set_owned=[hset["owned"] for hset in set_entries],
+        gifting=[is_gifting(hset, companions) for hset in set_entries],
+    )
+
+
+def accumulate_max(column: List[int], row: List[Tuple[int, int]]):
+    """Raises each entry of `column` to the amount in sparse `row`
+
+    Args:
+        column (List[int]): subject column
+        row (List[Tuple[int, int]]): pairs of ids and amounts
+    """
+    for i, amount in row:
+        if column[i] < amount:
+            column[i] = amount
+
+
+def reduce_materials(catalog: Catalog, counts: List[int]) -> dict:
+    """Returns materials required to craft `counts` of furnishings
+
+    Args:
+        catalog (Catalog): compiled catalog
+        counts (List[int]): column of furnishing counts
+
+    Returns:
+        dict: mapping of materials to amount
+    """
+    totals = [0] * len(catalog.materials)
+    present = [False] * len(catalog.materials)
+
+    for f_id, count in enumerate(counts):
+        if count > 0:
+            for m_id, amount in catalog.recipes[f_id]:
+                totals[m_id] += amount * count
+                present[m_id] = True
+
+    return {
+        catalog.materials[m_id]: total
+        for m_id, total in enumerate(totals)
+        if present[m_id]
+    }
+
+
+def reduce_costs(
+    catalog: Catalog,
+    blueprint: List[Optional[bool]],
+    counts: List[int],
+    set_flags: List[bool],
+) -> dict:
+    """Returns cost of `counts` of furnishings and flagged sets
+
+    Args:
+        catalog (Catalog): compiled catalog
+        blueprint (List[Optional[bool]]): column of blueprint ownership
+        counts (List[int]): column of furnishing counts
+        set_flags (List[bool]): column of sets to buy
+
+    Returns:
+        dict: mapping of types of cost to total
+    """
+    return accumulate_costs(
+        catalog.costs,
+        ((f_id, count) for f_id, count in enumerate(counts) if count > 0),
+        (s_id for s_id, flag in enumerate(set_flags) if flag),
+        blueprint,
+    )
+
+
+def analyze_columns(catalog: Catalog, columns: dict) -> dict:
+    """Computes milestones from compiled inventory `columns`
+
+    Args:
+        catalog (Catalog): compiled catalog
+        columns (dict): compiled inventory
+
+    Returns:
+        dict: mapping of milestone columns and per-set missing furnishings
+    """
+    num_furnishings = len(catalog.furnishings)
+    num_sets = len(catalog.sets)
+
+    owned = columns["owned"]
+    blueprint = columns["blueprint"]
+    crafted = columns["crafted"]
+    set_owned = columns["set_owned"]
+    gifting = columns["gifting"]
+
+    materials = [[0] * num_furnishings for _ in range(7)]
+    currency = [[0] * num_furnishings for _ in range(7)]
+    currency_sets = [[False] * num_sets for _ in range(7)]
+    furnishings = [0] * num_furnishings
+
+    for f_id in range(num_furnishings):
+        if blueprint[f_id] is not None and not crafted[f_id]:
+            materials[1][f_id] = materials[6][f_id] = 1
+
+            if blueprint[f_id]:
+                materials[0][f_id] = 1
+            else:
+                currency[0][f_id] = currency[6][f_id] = 1
+
+            furnishings[f_id] = 1
+
+        elif blueprint[f_id] is None and owned[f_id] == 0:
+            currency[6][f_id] = 1
+            furnishings[f_id] = 1
+
+    missing = []
+
+    for s_id, requirement in enumerate(catalog.requirements):
+        row = [
+            (f_id, num_required - owned[f_id])
+            for f_id, num_required in requirement
+            if owned[f_id] < num_required
+        ]
+        missing.append(row)
+
+        if not set_owned[s_id]:
+            currency_sets[4][s_id] = currency_sets[6][s_id] = True
+
+            if gifting[s_id]:
+                currency_sets[1][s_id] = True
+
+        bought = [(f_id, n) for f_id, n in row if blueprint[f_id] is None]
+        unlocked = [(f_id, 1) for f_id, _ in row if blueprint[f_id] is False]
+
+        accumulate_max(materials[5], row)
+        accumulate_max(materials[6], row)
+        accumulate_max(furnishings, row)
+        accumulate_max(currency[5], bought)
+        accumulate_max(currency[5], unlocked)
+        accumulate_max(currency[6], bought)
+
+        if gifting[s_id]:
+            accumulate_max(materials[3], row)
+            accumulate_max(currency[3], bought)
+            accumulate_max(currency[3], unlocked)
+
+            if set_owned[s_id]:
+                accumulate_max(materials[2], row)
+                accumulate_max(currency[2], bought)
+                accumulate_max(currency[2], unlocked)
+
+        if set_owned[s_id]:
+            accumulate_max(materials[4], row)
+
+    return dict(
+        materials=materials,
+        currency=currency,
+        currency_sets=currency_sets,
+        furnishings=furnishings,
+        missing=missing,
+    )
+
+
+def summarize_section(
+    catalog: Catalog, columns: dict, milestones: dict, section: str
+) -> Union[list, dict]:
+    """Reduces `milestones` to the results of `section` of an analysis
+
+    Args:
+        catalog (Catalog): compiled catalog
+        columns (dict): compiled inventory
+        milestones (dict): milestone columns
+        section (str): one of `materials`, `currency`, `furnishings` or `sets`
+
+    Returns:
+        Union[list, dict]: materials or currency results per milestone,
+            or missing furnishings or sets
+    """
+    if section == "materials":
+        return [reduce_materials(catalog, counts) for counts in milestones["materials"]]
+
+    if section == "currency":
+        return [
+            reduce_costs(catalog, columns["blueprint"], counts, set_flags)
+            for counts, set_flags in zip(
+                milestones["currency"], milestones["currency_sets"]
+            )
+        ]
+
+    if section == "furnishings":
+        return {
+            catalog.furnishings[f_id]: count
+            for f_id, count in enumerate(milestones["furnishings"])
+            if count > 0
+        }
+
+    return {
+        s_name: {
+            **({s_name: 1} if not columns["set_owned"][s_id] else {}),
+            **{catalog.furnishings[f_id]: n for f_id, n in row},
+        }
+        for s_id, (s_name, row) in enumerate(zip(catalog.sets, milestones["missing"]))
+        if len(row) > 0 or not columns["set_owned"][s_id]
+    }
+
+
+def explain_contributions(
+    catalog: Catalog, columns: dict, milestones: dict, section: str, name: str
+) -> List[List[Tuple[str, int]]]:
+    """Breaks down the total of `name` in each milestone into furnishings and sets
+
+    Milestone columns are the sparse contributions of each furnishing and set,
+    so a material only looks up the furnishings crafted with it,
+    and a type of cost the furnishings and sets counted in each milestone.
+
+    Args:
+        catalog (Catalog): compiled catalog
+        columns (dict): compiled inventory
+        milestones (dict): milestone columns
+        section (str): one of `materials` or `currency`
+        name (str): material name, or type of cost
+
+    Returns:
+        List[List[Tuple[str, int]]]: pairs of furnishing or set names and amounts,
+            largest first, per milestone
+    """
+    breakdowns = []
+
+    if section == "materials":
+        m_id = catalog.index.housing.material_ids[name]
+        users = [
+            (f_id, amount)
+            for f_id in catalog.index.material_furnishings[m_id]
+            for material, amount in catalog.recipes[f_id]
+            if material == m_id
+        ]
+
+        for counts in milestones["materials"]:
+            breakdowns.append(
+                [
+                    (catalog.furnishings[f_id], amount * counts[f_id])
+                    for f_id, amount in users
+                    if counts[f_id] > 0
+                ]
+            )
+    else:
+        costs = catalog.costs
+        cost_type = COST_TYPES.index(name)
+        f_ids = [f_id for f_id, t in enumerate(costs.types) if t == cost_type]
+        s_ids = [s_id for s_id, t in enumerate(costs.set_types) if t == cost_type]
+
+        for counts, set_flags in zip(
+            milestones["currency"], milestones["currency_sets"]
+        ):
+            breakdown = [
+                (
+                    catalog.furnishings[f_id],
+                    furnishing_cost(
+                        costs, f_id, counts[f_id], columns["blueprint"][f_id]
+                    )[cost_type],
+                )
+                for f_id in f_ids
+                if counts[f_id] > 0
+            ]
+            breakdown.extend(
+                (catalog.sets[s_id], costs.sets[s_id][cost_type])
+                for s_id in s_ids
+                if set_flags[s_id]
+            )
+            breakdowns.append([item for item in breakdown if item[1] > 0])
+
+    return [
+        sorted(breakdown, key=lambda item: (-item[1], item[0]))
+        for breakdown in breakdowns
+    ]
+
+
+def summarize_columns(catalog: Catalog, columns: dict, milestones: dict) -> dict:
+    """Reduces `milestones` to the results of an analysis
+
+    Args:
+        catalog (Catalog): compiled catalog
+        columns (dict): compiled inventory
+        milestones (dict): milestone columns
+
+    Returns:
+        dict: mapping of materials and currency results, missing furnishings and sets
+    """
+    return {
+        section: summarize_section(catalog, columns, milestones, section)
+        for section in ["materials", "currency", "furnishings", "sets"]
+    }
+
+
+class IncrementalAnalysis:
+    """Analysis of an inventory which is updated in place by inventory deltas
+
+    The missing furnishings of each set, the milestone columns
+    and their reductions to materials and costs are kept,
+    so that a delta only recomputes the sets and furnishings it affects.
+    """
+
+    def __init__(self, catalog: Catalog, inventory: dict):
+        """Analyses `inventory`
+
+        Args:
+            catalog (Catalog): compiled catalog
+            inventory (dict): user inventory, which deltas are applied to
+        """
+        self.catalog = catalog
+        self.inventory = inventory
+        self.columns = compile_inventory(catalog, inventory)
+        self.milestones = analyze_columns(catalog, self.columns)
+
+        self.material_totals = [[0] * len(catalog.materials) for _ in range(7)]
+        self.material_counts = [[0] * len(catalog.materials) for _ in range(7)]
+        self.cost_totals = [{} for _ in range(7)]
+        self.cost_counts = [{} for _ in range(7)]
+
+        blueprint = self.columns["blueprint"]
+
+        for k in range(7):
+            for f_id, count in enumerate(self.milestones["materials"][k]):
+                self.contribute_materials(k, f_id, count, 1)
+
+            for f_id, count in enumerate(self.milestones["currency"][k]):
+                self.contribute_cost(k, f_id, count, blueprint[f_id], 1)
+
+            for s_id, flag in enumerate(self.milestones["currency_sets"][k]):
+                if flag:
+                    self.contribute_set_cost(k, s_id, 1)
+
+        self.furnishings = {
+            catalog.furnishings[f_id]: count
+            for f_id, count in enumerate(self.milestones["furnishings"])
+            if count > 0
+        }
+        self.sets = {}
+        for s_id in range(len(catalog.sets)):
+            self.update_set(s_id)
+
+    def contribute_materials(self, k: int, f_id: int, count: int, sign: int):
+        """Adds (or removes) materials for `count` of `f_id` furnishing to milestone `k`
+
+        Args:
+            k (int): materials milestone
+            f_id (int): furnishing id
+            count (int): furnishing count
+            sign (int): 1 to add, -1 to remove
+        """
+        if count > 0:
+            for m_id, amount in self.catalog.recipes[f_id]:
+                self.material_totals[k][m_id] += sign * amount * count
+                self.material_counts[k][m_id] += sign
+
+    def contribute_cost(
+        self, k: int, f_id: int, count: int, blueprint: Optional[bool], sign: int
+    ):
+        """Adds (or removes) cost of `count` of `f_id` furnishing to milestone `k`
+
+        Args:
+            k (int): currency milestone
+            f_id (int): furnishing id
+            count (int): furnishing count
+            blueprint (Optional[bool]): blueprint ownership
+            sign (int): 1 to add, -1 to remove
+        """
+        if count > 0:
+            cost_type = COST_TYPES[self.catalog.costs.types[f_id]]
+            amount = sum(furnishing_cost(self.catalog.costs, f_id, count, blueprint))
+
+            self.cost_totals[k][cost_type] = (
+                self.cost_totals[k].get(cost_type, 0) + sign * amount
+            )
+            self.cost_counts[k][cost_type] = (
+                self.cost_counts[k].get(cost_type, 0) + sign
+            )
+
+    def contribute_set_cost(self, k: int, s_id: int, sign: int):
+        """Adds (or removes) cost of `s_id` set to milestone `k`
+
+        Args:
+            k (int): currency milestone
+            s_id (int): set id
+            sign (int): 1 to add, -1 to remove
+        """
+        cost_type = COST_TYPES[self.catalog.costs.set_types[s_id]]
+        amount = sum(self.catalog.costs.sets[s_id])
+
+        self.cost_totals[k][cost_type] = (
+            self.cost_totals[k].get(cost_type, 0) + sign * amount
+        )
+        self.cost_counts[k][cost_type] = self.cost_counts[k].get(cost_type, 0) + sign
+
+    def furnishing_milestones(self, f_id: int) -> Tuple[List[int], List[int], int]:
+        """Computes milestone entries of `f_id` furnishing from the sets using it
+
+        Args:
+            f_id (int): furnishing id
+
+        Returns:
+            Tuple[List[int], List[int], int]: materials and currency entries, and missing count
+        """
+        owned = self.columns["owned"][f_id]
+        blueprint = self.columns["blueprint"][f_id]
+        set_owned = self.columns["set_owned"]
+        gifting = self.columns["gifting"]
+
+        materials = [0] * 7
+        currency = [0] * 7
+        furnishings = 0
+
+        if blueprint is not None and not self.columns["crafted"][f_id]:
+            materials[1] = materials[6] = furnishings = 1
+
+            if blueprint:
+                materials[0] = 1
+            else:
+                currency[0] = currency[6] = 1
+        elif blueprint is None and owned == 0:
+            currency[6] = furnishings = 1
+
+        for s_id, num_required in self.catalog.usages[f_id]:
+            if owned < num_required:
+                num_missing = num_required - owned
+                bought = num_missing if blueprint is None else (0 if blueprint else 1)
+
+                materials[5] = max(materials[5], num_missing)
+                materials[6] = max(materials[6], num_missing)
+                furnishings = max(furnishings, num_missing)
+                currency[5] = max(currency[5], bought)
+
+                if blueprint is None:
+                    currency[6] = max(currency[6], num_missing)
+
+                if gifting[s_id]:
+                    materials[3] = max(materials[3], num_missing)
+                    currency[3] = max(currency[3], bought)
+
+                    if set_owned[s_id]:
+                        materials[2] = max(materials[2], num_missing)
+                        currency[2] = max(currency[2], bought)
+
+                if set_owned[s_id]:
+                    materials[4] = max(materials[4], num_missing)
+
+        return materials, currency, furnishings
+
+    def update_furnishing(self, f_id: int, previous_blueprint: Optional[bool]):
+        """Recomputes milestone entries of `f_id` furnishing
+
+        Args:
+            f_id (int): furnishing id
+            previous_blueprint (Optional[bool]): blueprint ownership before the delta
+        """
+        materials, currency, furnishings = self.furnishing_milestones(f_id)
+        blueprint = self.columns["blueprint"][f_id]
+
+        for k in range(7):
+            column = self.milestones["materials"][k]
+            if column[f_id] != materials[k]:
+                self.contribute_materials(k, f_id, column[f_id], -1)
+                self.contribute_materials(k, f_id, materials[k], 1)
+                column[f_id] = materials[k]
+
+            column = self.milestones["currency"][k]
+            if column[f_id] != currency[k] or previous_blueprint != blueprint:
+                self.contribute_cost(k, f_id, column[f_id], previous_blueprint, -1)
+                self.contribute_cost(k, f_id, currency[k], blueprint, 1)
+                column[f_id] = currency[k]
+
+        self.milestones["furnishings"][f_id] = furnishings
+
+        if furnishings > 0:
+            self.furnishings[self.catalog.furnishings[f_id]] = furnishings
+        else:
+            self.furnishings.pop(self.catalog.furnishings[f_id], None)
+
+    def update_set(self, s_id: int):
+        """Recomputes missing furnishings of `s_id` set
+
+        Args:
+            s_id (int): set id
+        """
+        owned = self.columns["owned"]
+        s_name = self.catalog.sets[s_id]
+
+        row = [
+            (f_id, num_required - owned[f_id])
+            for f_id, num_required in self.catalog.requirements[s_id]
+            if owned[f_id] < num_required
+        ]
+        self.milestones["missing"][s_id] = row
+
+        if len(row) > 0 or not self.columns["set_owned"][s_id]:
+            self.sets[s_name] = {
+                **({s_name: 1} if not self.columns["set_owned"][s_id] else {}),
+                **{self.catalog.furnishings[f_id]: n for f_id, n in row},
+            }
+        else:
+            self.sets.pop(s_name, None)
+
+    def apply(self, delta: dict):
+        """Applies `delta` to inventory and updates the analysis
+
+        Args:
+            delta (dict): partial inventory of changed values
+        """
+        catalog = self.catalog
+        index = catalog.index
+        columns = self.columns
+        inventory = self.inventory
+
+        changed_furnishings = {}
+        changed_sets = set()
+        flagged_sets = set()
+
+        inventory["materials"].update(delta.get("materials", {}))
+
+        for c_name, owned in delta.get("companions", {}).items():
+            inventory["companions"][c_name] = owned
+            flagged_sets.update(
+                index.companion_sets[index.housing.companion_ids[c_name]]
+            )
+
+        for f_name, fields in delta.get("furnishings", {}).items():
+            (furnishing := inventory["furnishings"][f_name]).update(fields)
+            f_id = catalog.furnishing_ids[f_name]
+
+            changed_furnishings.setdefault(f_id, columns["blueprint"][f_id])
+            columns["owned"][f_id] = furnishing["owned"]
+            columns["blueprint"][f_id] = furnishing.get("blueprint")
+            columns["crafted"][f_id] = bool(furnishing.get("crafted"))
+
+            changed_sets.update(s_id for s_id, _ in catalog.usages[f_id])
+
+        for s_name, fields in delta.get("sets", {}).items():
+            hset = inventory["sets"][s_name]
+
+            for key, value in fields.items():
+                if key == "companions":
+                    hset["companions"].update(value)
+                else:
+                    hset[key] = value
+
+            flagged_sets.add(catalog.set_ids[s_name])
+
+        for s_id in flagged_sets:
+            hset = inventory["sets"][catalog.sets[s_id]]
+            set_owned = hset["owned"]
+            gifting = is_gifting(hset, inventory["companions"])
+
+            if (set_owned, gifting) == (
+                columns["set_owned"][s_id],
+                columns["gifting"][s_id],
+            ):
+                continue
+
+            columns["set_owned"][s_id] = set_owned
+            columns["gifting"][s_id] = gifting
+
+            for k, flag in [
+                (1, not set_owned and gifting),
+                (4, not set_owned),
+                (6, not set_owned),
+            ]:
+                if (set_flags := self.milestones["currency_sets"][k])[s_id] != flag:
+                    self.contribute_set_cost(k, s_id, 1 if flag else -1)
+                    set_flags[s_id] = flag
+
+            for f_id, _ in catalog.requirements[s_id]:
+                changed_furnishings.setdefault(f_id, columns["blueprint"][f_id])
+
+            changed_sets.add(s_id)
+
+        for f_id, previous_blueprint in changed_furnishings.items():
+            self.update_furnishing(f_id, previous_blueprint)
+
+        for s_id in changed_sets:
+            self.update_set(s_id)
+
+    def results(self) -> dict:
+        """Returns the current results of the analysis
+
+        Returns:
+            dict: mapping of materials and currency results, missing furnishings and sets
+        """
+        materials = self.catalog.materials
+
+        return dict(
+            materials=[
+                {
+                    materials[m_id]: total
+                    for m_id, total in enumerate(totals)
+                    if counts[m_id] > 0
+                }
+                for totals, counts in zip(self.material_totals, self.material_counts)
+            ],
+            currency=[
+                {
+                    cost_type: total
+                    for cost_type, total in totals.items()
+                    if counts[cost_type] > 0
+                }
+                for totals, counts in zip(self.cost_totals, self.cost_counts)
+            ],
+            furnishings=dict(self.furnishings),
+            sets=dict(self.sets),
+        )
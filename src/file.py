@@ -1,14 +1,19 @@
 """This module defines variables and functions for file handling"""
 
-
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+import copy
+from datetime import datetime, timezone
+import fcntl
+import hashlib
 import json
 import os
-from typing import Optional
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
 from .utils import bold, color, prompt_confirm
 
-
 CONFIG_DIR: str = os.path.join(os.path.dirname(__file__), "config")
 """Folder for configuration"""
 
@@ -17,58 +22,404 @@ if not os.path.exists(CONFIG_DIR):
     os.makedirs(CONFIG_DIR)
 
 
+@contextmanager
+def lock_file(path: str, exclusive: bool = True) -> Iterator[None]:
+    """Holds an advisory lock on `path` for the duration of the context
+
+    The lock is taken on a sibling `.lock` file,
+    so that the subject file can be atomically replaced while locked.
+
+    Args:
+        path (str): subject file
+        exclusive (bool, optional): take an exclusive (write) lock. Defaults to True.
+    """
+    with open(f"{path}.lock", "a") as lock_pointer:
+        fcntl.flock(lock_pointer, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_pointer, fcntl.LOCK_UN)
+
+
+def write_json(path: str, data: Any):
+    """Atomically writes `data` as JSON to `path`
+
+    The data is written to a temporary file in the same folder,
+    which then replaces `path`, so readers never see a partial write.
+
+    Args:
+        path (str): subject file
+        data (Any): JSON serializable data
+    """
+    folder, name = os.path.split(path)
+    file_descriptor, temp_path = tempfile.mkstemp(
+        prefix=f".{name}.", suffix=".tmp", dir=folder
+    )
+
+    try:
+        with os.fdopen(file_descriptor, "w") as file_pointer:
+            json.dump(data, file_pointer)
+            file_pointer.flush()
+            os.fsync(file_pointer.fileno())
+
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
 METADATA_FILE: str = os.path.join(CONFIG_DIR, "metadata.json")
-"""File for metadata information"""
+"""File for metadata information, before it was sharded"""
+
+
+METADATA_DIR: str = os.path.join(CONFIG_DIR, "metadata")
+"""Folder for metadata shards"""
+
+
+METADATA_MANIFEST: str = os.path.join(METADATA_DIR, "manifest.json")
+"""File listing metadata shards and fields"""
+
 
+METADATA_SECTIONS: List[str] = ["materials", "companions", "furnishings", "sets"]
+"""Sections of metadata, each stored in its own shard"""
 
-def load_metadata() -> Optional[dict]:
-    """Loads metadata from file
+
+def digest_section(value: Any) -> str:
+    """Computes digest of the contents of one metadata section
+
+    Args:
+        value (Any): section contents
 
     Returns:
-        Optional[dict]: subject metadata
+        str: content hash
     """
-    if os.path.exists(METADATA_FILE):
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def digest_sections(metadata: dict) -> Dict[str, str]:
+    """Computes digests of the sections of `metadata`
+
+    Shards which were not loaded keep the digest they were saved with,
+    so that only loaded sections are hashed.
+
+    Args:
+        metadata (dict): housing metadata
+
+    Returns:
+        Dict[str, str]: mapping of sections to content hash
+    """
+    digests = {}
+
+    for section in METADATA_SECTIONS:
+        if (
+            isinstance(metadata, Metadata)
+            and section not in metadata.sections
+            and section in metadata.digests
+        ):
+            digests[section] = metadata.digests[section]
+        else:
+            digests[section] = digest_section(metadata[section])
+
+    return digests
+
+
+def combine_digests(digests: Dict[str, str]) -> str:
+    """Computes fingerprint from the `digests` of metadata sections
+
+    Args:
+        digests (Dict[str, str]): mapping of sections to content hash
+
+    Returns:
+        str: content hash
+    """
+    return hashlib.sha256(
+        "".join(
+            f"{section}:{digests[section]}\n" for section in METADATA_SECTIONS
+        ).encode()
+    ).hexdigest()
+
+
+def compute_fingerprint(metadata: dict) -> str:
+    """Computes fingerprint of the contents of `metadata`
+
+    The fingerprint is a hash of the digests of its sections.
+
+    Args:
+        metadata (dict): housing metadata
+
+    Returns:
+        str: content hash
+    """
+    return combine_digests(digest_sections(metadata))
+
+
+class Metadata(MutableMapping):
+    """Housing metadata whose sections are loaded from shards on first access"""
+
+    def __init__(
+        self,
+        fields: dict,
+        shards: List[str],
+        digests: Optional[Dict[str, str]] = None,
+    ):
+        """Creates metadata
+
+        Args:
+            fields (dict): mapping of small fields stored in the manifest
+            shards (List[str]): names of sections stored as shards
+            digests (Optional[Dict[str, str]]): content hash of each saved shard.
+                Defaults to None.
+        """
+        self.fields = fields
+        self.shards = list(shards)
+        self.digests = dict(digests or {})
+        self.sections = {}
+
+    def __getitem__(self, key: str):
+        if key in self.sections:
+            return self.sections[key]
+
+        if key in self.shards:
+            with open(os.path.join(METADATA_DIR, f"{key}.json"), "r") as fp:
+                self.sections[key] = json.load(fp)
+
+            return self.sections[key]
+
+        return self.fields[key]
+
+    def __setitem__(self, key: str, value):
+        if key in METADATA_SECTIONS:
+            self.sections[key] = value
+
+            if key not in self.shards:
+                self.shards.append(key)
+        else:
+            self.fields[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self.shards:
+            self.shards.remove(key)
+            self.sections.pop(key, None)
+            self.digests.pop(key, None)
+        else:
+            del self.fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.shards
+        yield from self.fields
+
+    def __len__(self) -> int:
+        return len(self.shards) + len(self.fields)
+
+
+def load_metadata() -> Optional[Metadata]:
+    """Loads metadata manifest from file
+
+    Sections are loaded from their shards when first accessed.
+    Metadata saved before it was sharded is migrated to shards,
+    with the fingerprint that caches of its contents are keyed by.
+
+    Returns:
+        Optional[Metadata]: subject metadata
+    """
+    if os.path.exists(METADATA_MANIFEST):
+        with open(METADATA_MANIFEST, "r") as file_pointer:
+            manifest = json.load(file_pointer)
+
+        return Metadata(manifest["fields"], manifest["shards"], manifest.get("digests"))
+    elif os.path.exists(METADATA_FILE):
         with open(METADATA_FILE, "r") as file_pointer:
-            return json.load(file_pointer)
+            legacy = json.load(file_pointer)
+
+        metadata = Metadata({}, [])
+        metadata.update(legacy)
+        save_metadata(metadata)
+
+        return metadata
     else:
         return None
 
 
-def save_metadata(metadata: dict):
+def save_metadata(metadata: MutableMapping):
     """Saves `metadata` to file
 
+    The fingerprint is computed again on every save from the digests of its sections,
+    so that it always matches the saved sections,
+    and changes recorded against an older fingerprint are dropped.
+    Only loaded sections are hashed, and only those whose digest changed
+    are written to their shards.
+
     Args:
-        metadata (dict): subject metadata
+        metadata (MutableMapping): subject metadata
     """
-    with open(METADATA_FILE, "w") as file_pointer:
-        json.dump(metadata, file_pointer)
+    digests = digest_sections(metadata)
+
+    if (fingerprint := combine_digests(digests)) != metadata.get("fingerprint"):
+        metadata.pop("changes", None)
+        metadata["fingerprint"] = fingerprint
+
+    if not isinstance(metadata, Metadata):
+        sharded = Metadata({}, [])
+        sharded.update(metadata)
+        metadata = sharded
+
+    os.makedirs(METADATA_DIR, exist_ok=True)
+
+    for section, value in metadata.sections.items():
+        if digests[section] != metadata.digests.get(section):
+            write_json(os.path.join(METADATA_DIR, f"{section}.json"), value)
+
+    metadata.digests = digests
+
+    write_json(
+        METADATA_MANIFEST,
+        dict(fields=metadata.fields, shards=metadata.shards, digests=digests),
+    )
+
+    if os.path.exists(METADATA_FILE):
+        os.remove(METADATA_FILE)
 
 
 INVENTORY_FILE = os.path.join(CONFIG_DIR, "inventory.json")
 """File for inventory information"""
 
 
+INVENTORY_BASES: Dict[Tuple[str, int], dict] = {}
+"""Inventories as read from or written to file by this process, by path and version,
+used as the common ancestor when merging with changes saved by another process"""
+
+
+INVENTORY_BASES_SIZE: int = 8
+"""Number of inventory versions kept as merge bases"""
+
+
+def keep_inventory_base(path: str, inventory: dict):
+    """Keeps `inventory` as read from or written to `path` as a merge base
+
+    Args:
+        path (str): inventory file
+        inventory (dict): subject inventory
+    """
+    INVENTORY_BASES[(path, inventory.get("version", 0))] = copy.deepcopy(inventory)
+
+    while len(INVENTORY_BASES) > INVENTORY_BASES_SIZE:
+        del INVENTORY_BASES[next(iter(INVENTORY_BASES))]
+
+
+MISSING = object()
+"""Placeholder for a field absent from one version of a dictionary"""
+
+
+def merge_changes(base: Any, ours: Any, theirs: Any) -> Any:
+    """Merges field-level changes made to `base` in `ours` and `theirs`
+
+    Nested dictionaries are merged key by key.
+    Where both sides changed the same field differently, `ours` is kept.
+
+    Args:
+        base (Any): common ancestor
+        ours (Any): version changed by this process
+        theirs (Any): version changed by another process
+
+    Returns:
+        Any: merged version
+    """
+    if ours == theirs or theirs == base:
+        return ours
+
+    if ours == base:
+        return theirs
+
+    if not all(isinstance(x, dict) for x in (base, ours, theirs)):
+        return ours
+
+    merged = {}
+
+    for key in {**ours, **theirs}:
+        if (
+            value := merge_changes(
+                base.get(key, MISSING), ours.get(key, MISSING), theirs.get(key, MISSING)
+            )
+        ) is not MISSING:
+            merged[key] = value
+
+    return merged
+
+
 def load_inventory() -> Optional[dict]:
     """Loads inventory from file
 
     Returns:
         Optional[dict]: subject inventory
     """
-    if os.path.exists(INVENTORY_FILE):
-        with open(INVENTORY_FILE, "r") as file_pointer:
-            return json.load(file_pointer)
-    else:
-        return None
+    with lock_file(INVENTORY_FILE, exclusive=False):
+        if os.path.exists(INVENTORY_FILE):
+            with open(INVENTORY_FILE, "r") as file_pointer:
+                inventory = json.load(file_pointer)
+        else:
+            inventory = None
+
+    if inventory is not None:
+        keep_inventory_base(INVENTORY_FILE, inventory)
 
+    return inventory
 
-def save_inventory(inventory: dict):
+
+def save_inventory(inventory: dict, merge: bool = True):
     """Saves `inventory` to file
 
+    The inventory carries a `version` counter.
+    If the file was saved by another process since `inventory` was loaded,
+    non-conflicting changes from both processes are merged,
+    and `inventory` is updated in place with the result.
+    Changed and deleted values are appended to the inventory history,
+    whose log is compacted once the inventory is unlocked.
+
     Args:
         inventory (dict): subject inventory
+        merge (bool, optional): merge with changes on file. Defaults to True.
     """
-    with open(INVENTORY_FILE, "w") as file_pointer:
-        json.dump(inventory, file_pointer)
+    with lock_file(INVENTORY_FILE):
+        theirs = None
+
+        if os.path.exists(INVENTORY_FILE):
+            with open(INVENTORY_FILE, "r") as file_pointer:
+                theirs = json.load(file_pointer)
+
+        version = theirs.get("version", 0) if theirs is not None else 0
+
+        if merge and theirs is not None and version != inventory.get("version", 0):
+            merged = merge_changes(
+                INVENTORY_BASES.get(
+                    (INVENTORY_FILE, inventory.get("version", 0)), theirs
+                ),
+                inventory,
+                theirs,
+            )
+
+            if merged is not inventory:
+                inventory.clear()
+                inventory.update(merged)
+
+        inventory["version"] = version + 1
+
+        write_json(INVENTORY_FILE, inventory)
+
+        try:
+            shard_path = record_history(inventory, previous=theirs)
+        except (OSError, ValueError) as error:
+            shard_path = None
+            print(bold(color(f"Could not record history: {error}", "red")))
+
+    keep_inventory_base(INVENTORY_FILE, inventory)
+
+    if shard_path is not None:
+        try:
+            compact_history(shard_path)
+        except (OSError, ValueError) as error:
+            print(bold(color(f"Could not compact history: {error}", "red")))
 
 
 def delete_inventory() -> bool:
@@ -79,9 +430,274 @@ def delete_inventory() -> bool:
     """
     if os.path.exists(INVENTORY_FILE):
         if prompt_confirm("Are you sure you want to delete your inventory?"):
-            os.remove(INVENTORY_FILE)
+            with lock_file(INVENTORY_FILE):
+                os.remove(INVENTORY_FILE)
+
+            for key in [key for key in INVENTORY_BASES if key[0] == INVENTORY_FILE]:
+                del INVENTORY_BASES[key]
+
             print(bold(color("Deleted inventory!", "green")))
             return True
     else:
         print(bold(color("Could not find inventory!", "red")))
     return False
+
+
+ANALYSIS_CACHE_DIR: str = os.path.join(CONFIG_DIR, "cache", "analysis")
+"""Folder for cached analyses"""
+
+
+ANALYSIS_CACHE_SIZE: int = 256
+"""Maximum number of cached analysis sections, across profiles"""
+
+
+def load_cached_analysis(key: str, section: str) -> Optional[Any]:
+    """Loads `section` of the analysis cached under `key`, marking it as recently used
+
+    Args:
+        key (str): content hash
+        section (str): analysis section
+
+    Returns:
+        Optional[Any]: cached section results
+    """
+    path = os.path.join(ANALYSIS_CACHE_DIR, f"{key}.{section}.json")
+
+    try:
+        with open(path, "r") as file_pointer:
+            results = json.load(file_pointer)
+    except (OSError, ValueError):
+        return None
+
+    os.utime(path)
+
+    return results
+
+
+def save_cached_analysis(key: str, section: str, results: Any):
+    """Caches `section` of the analysis under `key`,
+    evicting the least recently used sections
+
+    Args:
+        key (str): content hash
+        section (str): analysis section
+        results (Any): section results
+    """
+    os.makedirs(ANALYSIS_CACHE_DIR, exist_ok=True)
+
+    write_json(os.path.join(ANALYSIS_CACHE_DIR, f"{key}.{section}.json"), results)
+
+    paths = sorted(
+        (
+            os.path.join(ANALYSIS_CACHE_DIR, name)
+            for name in os.listdir(ANALYSIS_CACHE_DIR)
+            if name.endswith(".json")
+        ),
+        key=os.path.getmtime,
+    )
+
+    for path in paths[: max(len(paths) - ANALYSIS_CACHE_SIZE, 0)]:
+        os.remove(path)
+
+
+HISTORY_DIR: str = os.path.join(CONFIG_DIR, "history")
+"""Folder for inventory history, with one shard per month"""
+
+
+def flatten_inventory(inventory: dict) -> Dict[Tuple[str, ...], Any]:
+    """Flattens `inventory` to the paths of its values
+
+    Args:
+        inventory (dict): user inventory
+
+    Returns:
+        Dict[Tuple[str, ...], Any]: mapping of paths to values
+    """
+    values = {}
+
+    def visit(path: Tuple[str, ...], value: Any):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                visit(path + (key,), item)
+        else:
+            values[path] = value
+
+    for section, entries in inventory.items():
+        if isinstance(entries, dict):
+            visit((section,), entries)
+
+    return values
+
+
+HISTORY_LOG_SIZE: int = 256
+"""Number of records appended to the log of a history shard before it is compacted"""
+
+
+def history_log_path(path: str) -> str:
+    """Returns the log of records appended to history shard `path`
+
+    Args:
+        path (str): shard file
+
+    Returns:
+        str: log file
+    """
+    return f"{os.path.splitext(path)[0]}.log"
+
+
+def apply_history_record(
+    shard: dict, timestamp: int, changes: Dict[Tuple[str, ...], Any]
+):
+    """Appends record of `changes` at `timestamp` to `shard`
+
+    Args:
+        shard (dict): times and mapping of paths to columns of record indices and values
+        timestamp (int): seconds since epoch
+        changes (Dict[Tuple[str, ...], Any]): mapping of paths to values,
+            or `None` for deleted values
+    """
+    times = shard["times"]
+    series = shard["series"]
+
+    changes = {
+        key: value
+        for key, value in changes.items()
+        if (series[key][1][-1] != value if key in series else value is not None)
+    }
+
+    if len(changes) == 0:
+        return
+
+    for key, value in changes.items():
+        indices, values = series.setdefault(key, ([], []))
+        indices.append(len(times))
+        values.append(value)
+
+    times.append(max(timestamp, times[-1] if len(times) > 0 else 0))
+
+
+def load_history_shard(path: str) -> dict:
+    """Loads history shard from `path`, along with the records appended to its log
+
+    A shard holds the times of its records,
+    and for each path of the inventory, the columns of record indices
+    at which its value changed and of the values it changed to,
+    with `None` for values deleted from the inventory.
+    The first record of a shard holds every value.
+
+    Args:
+        path (str): shard file
+
+    Returns:
+        dict: times and mapping of paths to columns of record indices and values
+    """
+    shard = dict(times=[], series={})
+
+    if os.path.exists(path):
+        with open(path, "r") as file_pointer:
+            data = json.load(file_pointer)
+
+        shard["times"] = data["times"]
+        shard["series"] = {
+            tuple(key): (indices, values) for key, indices, values in data["series"]
+        }
+
+    if os.path.exists(log_path := history_log_path(path)):
+        with open(log_path, "r") as file_pointer:
+            for line in file_pointer:
+                try:
+                    timestamp, changes = json.loads(line)
+                except ValueError:
+                    # Skip a record cut short by an interrupted append
+                    continue
+
+                apply_history_record(
+                    shard, timestamp, {tuple(key): value for key, value in changes}
+                )
+
+    return shard
+
+
+def compact_history(path: str):
+    """Folds the records appended to the log of history shard `path` into the shard
+
+    Args:
+        path (str): shard file
+    """
+    with lock_file(path):
+        if not os.path.exists(log_path := history_log_path(path)):
+            return
+
+        shard = load_history_shard(path)
+
+        write_json(
+            path,
+            dict(
+                times=shard["times"],
+                series=[
+                    [list(key), indices, values]
+                    for key, (indices, values) in shard["series"].items()
+                ],
+            ),
+        )
+        os.remove(log_path)
+
+
+def record_history(
+    inventory: dict,
+    time: Optional[datetime] = None,
+    previous: Optional[dict] = None,
+) -> Optional[str]:
+    """Records values of `inventory` which changed since `previous`
+
+    The record is appended to the log of the shard of its month,
+    and values missing from `inventory` are recorded as deleted.
+    The first record of a month holds every value.
+
+    Args:
+        inventory (dict): subject inventory
+        time (Optional[datetime], optional): time of record. Defaults to now.
+        previous (Optional[dict], optional): inventory as of the previous record.
+            Defaults to None, to record every value.
+
+    Returns:
+        Optional[str]: shard whose log is due to be compacted
+    """
+    time = (time or datetime.now()).astimezone(timezone.utc)
+    path = os.path.join(HISTORY_DIR, f"{time:%Y-%m}.json")
+    log_path = history_log_path(path)
+
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+
+    with lock_file(path):
+        values = flatten_inventory(inventory)
+
+        if previous is None or not (os.path.exists(path) or os.path.exists(log_path)):
+            changes = values
+        else:
+            previous_values = flatten_inventory(previous)
+            changes = {
+                key: value
+                for key, value in values.items()
+                if previous_values.get(key, MISSING) != value
+            }
+            changes.update((key, None) for key in previous_values if key not in values)
+
+        if len(changes) == 0:
+            return None
+
+        with open(log_path, "a") as file_pointer:
+            file_pointer.write(
+                json.dumps(
+                    [
+                        int(time.timestamp()),
+                        [[list(key), value] for key, value in changes.items()],
+                    ]
+                )
+                + "\n"
+            )
+
+        with open(log_path, "r") as file_pointer:
+            num_records = sum(1 for _ in file_pointer)
+
+    return path if num_records >= HISTORY_LOG_SIZE else None
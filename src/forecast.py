@@ -0,0 +1,324 @@
+"""This module defines functions for forecasting when milestones are reachable"""
+
+
+from datetime import datetime
+import math
+from typing import Dict, List, Optional, Tuple
+
+
+import click
+
+
+from .analyze import MILESTONES, LazyAnalysis
+from .backup import list_snapshots, restore_snapshot
+from .file import load_inventory, load_metadata
+from .reset import create_inventory_schema, update_inventory
+from .utils import bold, color, italic
+
+
+def learn_rates(history: List[Tuple[datetime, dict]]) -> Dict[str, float]:
+    """Learns daily income of materials from inventories taken over time
+
+    Only increases between consecutive inventories count as income,
+    as decreases are materials spent on crafting.
+
+    Args:
+        history (List[Tuple[datetime, dict]]): pairs of times and inventories, oldest first
+
+    Returns:
+        Dict[str, float]: mapping of materials to daily income
+    """
+    if len(history) < 2:
+        return {}
+
+    days = (history[-1][0] - history[0][0]).total_seconds() / 86400
+    if days <= 0:
+        return {}
+
+    income = {}
+    for (_, previous), (_, current) in zip(history, history[1:]):
+        for m_name, amount in current["materials"].items():
+            if (gain := amount - previous["materials"].get(m_name, 0)) > 0:
+                income[m_name] = income.get(m_name, 0) + gain
+
+    return {m_name: gain / days for m_name, gain in income.items()}
+
+
+def days_until(
+    needs: List[Dict[str, int]], stock: Dict[str, int], rates: Dict[str, float]
+) -> List[Tuple[Optional[int], Optional[str]]]:
+    """Computes days until each of `needs` is met by `stock` and daily income
+
+    Resources accrue at a constant rate, and crafting along the way only spends
+    what the milestone already accounts for, so the day a milestone is met
+    is the day its slowest resource is.
+
+    Args:
+        needs (List[Dict[str, int]]): mappings of resources to amount, per milestone
+        stock (Dict[str, int]): mapping of resources to amount owned
+        rates (Dict[str, float]): mapping of resources to daily income
+
+    Returns:
+        List[Tuple[Optional[int], Optional[str]]]: pairs of days, or `None` if never met,
+            and the resource limiting each milestone
+    """
+    forecasts = []
+
+    for need in needs:
+        days, limit = 0, None
+
+        for name, amount in need.items():
+            if (deficit := amount - stock.get(name, 0)) <= 0:
+                continue
+
+            if rates.get(name, 0) <= 0:
+                days, limit = None, name
+                break
+
+            if (wait := math.ceil(deficit / rates[name])) > days:
+                days, limit = wait, name
+
+        forecasts.append((days, limit))
+
+    return forecasts
+
+
+def forecast_milestones(
+    metadata: dict,
+    profiles: Dict[str, dict],
+    rates: Dict[str, Dict[str, float]],
+    balances: Dict[str, Dict[str, int]],
+) -> Dict[str, dict]:
+    """Forecasts days until each milestone is reachable, for each of `profiles`
+
+    Args:
+        metadata (dict): housing metadata
+        profiles (Dict[str, dict]): mapping of profile names to inventories
+        rates (Dict[str, Dict[str, float]]): mapping of profile names to daily income of resources
+        balances (Dict[str, Dict[str, int]]): mapping of profile names to Realm Currency and mora owned
+
+    Returns:
+        Dict[str, dict]: mapping of profile names to materials and currency forecasts
+    """
+    forecasts = {}
+
+    for name, inventory in profiles.items():
+        analysis = LazyAnalysis(metadata, inventory)
+
+        forecasts[name] = dict(
+            materials=days_until(
+                analysis["materials"]["results"], inventory["materials"], rates[name]
+            ),
+            currency=days_until(
+                analysis["currency"]["results"], balances[name], rates[name]
+            ),
+        )
+
+    return forecasts
+
+
+def format_days(days: Optional[int]) -> str:
+    """Formats number of days until a milestone
+
+    Args:
+        days (Optional[int]): number of days, or `None` if never met
+
+    Returns:
+        str: colored description
+    """
+    if days is None:
+        return color("never", "red")
+
+    if days == 0:
+        return color("now", "green")
+
+    return f"in {days} day{'s' if days != 1 else ''}"
+
+
+def parse_rates(rate_options: Tuple[str], weekly: bool) -> Optional[Dict[str, float]]:
+    """Parses daily income from `<resource>=<n>` options
+
+    Args:
+        rate_options (Tuple[str]): rate options
+        weekly (bool): whether rates are given per week
+
+    Returns:
+        Optional[Dict[str, float]]: mapping of resources to daily income, or `None` if invalid
+    """
+    rates = {}
+
+    for option in rate_options:
+        name, _, amount = option.rpartition("=")
+
+        try:
+            rates[name] = float(amount) / (7 if weekly else 1)
+        except ValueError:
+            return None
+
+    return rates
+
+
+def parse_balances(
+    balance_options: Tuple[str], profile_names: List[str]
+) -> Optional[Dict[str, int]]:
+    """Parses amounts owned by each profile from `[<profile>=]<n>` options
+
+    An amount without a profile belongs to the only profile forecast.
+
+    Args:
+        balance_options (Tuple[str]): balance options
+        profile_names (List[str]): names of forecast profiles
+
+    Returns:
+        Optional[Dict[str, int]]: mapping of profile names to amount, or `None` if invalid
+    """
+    balances = {}
+
+    for option in balance_options:
+        name, _, amount = option.rpartition("=")
+
+        if len(name) == 0 and len(profile_names) == 1:
+            name = profile_names[0]
+
+        if name not in profile_names:
+            return None
+
+        try:
+            balances[name] = int(amount)
+        except ValueError:
+            return None
+
+    return balances
+
+
+@click.command(options_metavar="[options]")
+@click.option(
+    "-r",
+    "--rate",
+    "rate_options",
+    multiple=True,
+    metavar="<resource>=<n>",
+    help="Income of Realm Currency, mora or a material. Can be repeated",
+)
+@click.option("-w", "--weekly", is_flag=True, help="Rates are given per week")
+@click.option(
+    "-c",
+    "--currency",
+    "currency_options",
+    multiple=True,
+    metavar="[<profile>=]<n>",
+    help="Available Realm Currency, of <profile> if several are forecast",
+)
+@click.option(
+    "-m",
+    "--mora",
+    "mora_options",
+    multiple=True,
+    metavar="[<profile>=]<n>",
+    help="Available mora, of <profile> if several are forecast",
+)
+@click.option(
+    "-b",
+    "--repository",
+    type=click.Path(file_okay=False),
+    metavar="<path>",
+    help="Learn material income from snapshots in backup repository at <path>",
+)
+@click.option(
+    "-p",
+    "--profile",
+    "profile_names",
+    multiple=True,
+    metavar="<name>",
+    help="Forecast latest snapshot of <name> in the repository. Can be repeated",
+)
+def forecast(
+    rate_options: Tuple[str],
+    weekly: bool,
+    currency_options: Tuple[str],
+    mora_options: Tuple[str],
+    repository: Optional[str],
+    profile_names: Tuple[str],
+):
+    """Forecasts when milestones are reachable"""
+
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if (configured := parse_rates(rate_options, weekly)) is None:
+        print(bold(color("Invalid rate!", "red")))
+        exit(1)
+
+    resources = ["currency", "mora", *metadata["materials"]]
+    for name in configured:
+        if name not in resources:
+            print(bold(color(f"Could not find resource '{name}'", "red")))
+            exit(1)
+
+    if len(profile_names) > 0 and repository is None:
+        print(bold(color("Profiles need a backup repository!", "red")))
+        exit(1)
+
+    names = list(profile_names) or ["default"]
+    currency = parse_balances(currency_options, names)
+    mora = parse_balances(mora_options, names)
+
+    if currency is None or mora is None:
+        print(bold(color("Invalid balance!", "red")))
+        exit(1)
+
+    profiles = {}
+    rates = {}
+
+    for name in names:
+        history = [
+            (
+                datetime.fromisoformat(snapshot["time"]),
+                restore_snapshot(repository, snapshot),
+            )
+            for snapshot in (
+                list_snapshots(repository, name) if repository is not None else []
+            )
+        ]
+
+        if len(profile_names) > 0:
+            if len(history) == 0:
+                print(bold(color(f"Could not find snapshots of '{name}'", "red")))
+                exit(1)
+
+            inventory = history[-1][1]
+        elif (inventory := load_inventory()) is None:
+            inventory = create_inventory_schema()
+
+        update_inventory(metadata, inventory, persist=len(profile_names) == 0)
+
+        profiles[name] = inventory
+        rates[name] = {**learn_rates(history), **configured}
+
+    forecasts = forecast_milestones(
+        metadata,
+        profiles,
+        rates,
+        {
+            name: dict(currency=currency.get(name, 0), mora=mora.get(name, 0))
+            for name in names
+        },
+    )
+
+    for name, profile_forecast in forecasts.items():
+        if len(profile_names) > 0:
+            print(bold(f"{name}:") + "\n")
+
+        for table in ["materials", "currency"]:
+            print(f"  {table.capitalize()}:\n")
+
+            for milestone, (days, limit) in zip(
+                MILESTONES[table]["milestones"], profile_forecast[table]
+            ):
+                print(
+                    f"    {milestone}  {format_days(days)}"
+                    + (italic(f"  ({limit})") if limit is not None else "")
+                )
+
+            print()
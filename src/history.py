@@ -0,0 +1,394 @@
+"""This module defines functions for querying inventory history"""
+
+from bisect import bisect_right
+import csv
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional, Set, TextIO, Tuple
+
+
+import click
+
+
+from .backup import list_snapshots, restore_snapshot
+from .engine import compile_catalog
+from .file import (
+    HISTORY_DIR,
+    compact_history,
+    load_history_shard,
+    load_metadata,
+    record_history,
+)
+from .utils import bold, color, italic
+
+
+class History:
+    """Inventory history, whose monthly shards are loaded at most once"""
+
+    def __init__(self):
+        """Lists the shards of the inventory history"""
+        self.months: List[str] = (
+            sorted(
+                set(
+                    os.path.splitext(name)[0]
+                    for name in os.listdir(HISTORY_DIR)
+                    if name.endswith((".json", ".log"))
+                )
+            )
+            if os.path.isdir(HISTORY_DIR)
+            else []
+        )
+        self.shards: Dict[str, dict] = {}
+
+    def shard(self, month: str) -> dict:
+        """Loads shard of `month`
+
+        Args:
+            month (str): month as `YYYY-MM`
+
+        Returns:
+            dict: times and mapping of paths to columns of record indices and values
+        """
+        if month not in self.shards:
+            self.shards[month] = load_history_shard(
+                os.path.join(HISTORY_DIR, f"{month}.json")
+            )
+
+        return self.shards[month]
+
+    def state_at(self, timestamp: int) -> Dict[Tuple[str, ...], Any]:
+        """Returns the recorded values of the inventory at `timestamp`
+
+        Only the latest shard recorded at or before `timestamp` is read,
+        as each shard starts with every value.
+
+        Args:
+            timestamp (int): seconds since epoch
+
+        Returns:
+            Dict[Tuple[str, ...], Any]: mapping of paths to values
+        """
+        latest = f"{datetime.fromtimestamp(timestamp, timezone.utc):%Y-%m}"
+
+        for month in reversed(self.months[: bisect_right(self.months, latest)]):
+            times = self.shard(month)["times"]
+
+            if (index := bisect_right(times, timestamp) - 1) >= 0:
+                return {
+                    key: value
+                    for key, (indices, values) in self.shard(month)["series"].items()
+                    if indices[0] <= index
+                    and (value := values[bisect_right(indices, index) - 1]) is not None
+                }
+
+        return {}
+
+    def changes(
+        self, start: int, end: int, section: Optional[str] = None
+    ) -> Tuple[Dict[Tuple[str, ...], Any], List[Tuple[int, Tuple[str, ...], Any]]]:
+        """Returns the values at `start` and their changes until `end`
+
+        Args:
+            start (int): seconds since epoch
+            end (int): seconds since epoch
+            section (Optional[str], optional): only values of inventory section. Defaults to None.
+
+        Returns:
+            Tuple[Dict[Tuple[str, ...], Any], List[Tuple[int, Tuple[str, ...], Any]]]:
+                mapping of paths to values, and changes as times, paths and values
+        """
+        initial = {
+            key: value
+            for key, value in self.state_at(start).items()
+            if section is None or key[0] == section
+        }
+
+        first = f"{datetime.fromtimestamp(start, timezone.utc):%Y-%m}"
+        last = f"{datetime.fromtimestamp(end, timezone.utc):%Y-%m}"
+
+        records = []
+        for month in self.months:
+            if not first <= month <= last:
+                continue
+
+            shard = self.shard(month)
+            times = shard["times"]
+
+            for key, (indices, values) in shard["series"].items():
+                if section is None or key[0] == section:
+                    records.extend(
+                        (times[index], key, value)
+                        for index, value in zip(indices, values)
+                        if start < times[index] <= end
+                    )
+
+        records.sort(key=lambda record: record[0])
+
+        current = dict(initial)
+        changes = []
+
+        for timestamp, key, value in records:
+            if current.get(key) != value:
+                current[key] = value
+                changes.append((timestamp, key, value))
+
+        return initial, changes
+
+
+def completed_sets(metadata: dict, state: Dict[Tuple[str, ...], Any]) -> Set[str]:
+    """Returns sets owned with all their furnishings in recorded `state`
+
+    Args:
+        metadata (dict): housing metadata
+        state (Dict[Tuple[str, ...], Any]): mapping of paths to values
+
+    Returns:
+        Set[str]: set names
+    """
+    catalog = compile_catalog(metadata)
+
+    return set(
+        s_name
+        for s_id, s_name in enumerate(catalog.sets)
+        if state.get(("sets", s_name, "owned"))
+        and all(
+            state.get(("furnishings", catalog.furnishings[f_id], "owned"), 0)
+            >= num_required
+            for f_id, num_required in catalog.requirements[s_id]
+        )
+    )
+
+
+def sets_completed_per_week(
+    metadata: dict, history: History, weeks: int, end: Optional[datetime] = None
+) -> List[Tuple[datetime, List[str]]]:
+    """Returns sets completed in each of the last `weeks` weeks
+
+    Args:
+        metadata (dict): housing metadata
+        history (History): inventory history
+        weeks (int): number of weeks
+        end (Optional[datetime], optional): end of the last week. Defaults to now.
+
+    Returns:
+        List[Tuple[datetime, List[str]]]: pairs of week starts and completed sets
+    """
+    end = end or datetime.now().astimezone()
+    boundaries = [end - timedelta(weeks=weeks - i) for i in range(weeks + 1)]
+
+    completed = [
+        completed_sets(metadata, history.state_at(int(boundary.timestamp())))
+        for boundary in boundaries
+    ]
+
+    return [
+        (boundaries[i], sorted(completed[i + 1] - completed[i])) for i in range(weeks)
+    ]
+
+
+def write_rows(
+    rows: Iterable[dict], fields: List[str], output_format: str, file_pointer: TextIO
+):
+    """Writes `rows` to `file_pointer` as they come
+
+    Args:
+        rows (Iterable[dict]): mappings of `fields` to values
+        fields (List[str]): field names
+        output_format (str): one of `json`, `csv` or `ndjson`
+        file_pointer (TextIO): output file
+    """
+    if output_format == "csv":
+        writer = csv.DictWriter(file_pointer, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    elif output_format == "json":
+        file_pointer.write("[")
+        for i, row in enumerate(rows):
+            if i > 0:
+                file_pointer.write(",")
+            json.dump(row, file_pointer, ensure_ascii=False)
+        file_pointer.write("]\n")
+    else:
+        for row in rows:
+            file_pointer.write(f"{json.dumps(row, ensure_ascii=False)}\n")
+
+
+def rebuild_history(repository: str, profile: str) -> int:
+    """Replaces inventory history with the snapshots of `profile` in `repository`
+
+    Args:
+        repository (str): repository folder
+        profile (str): inventory profile
+
+    Returns:
+        int: number of snapshots recorded
+    """
+    snapshots = list_snapshots(repository, profile)
+
+    if len(snapshots) > 0 and os.path.isdir(HISTORY_DIR):
+        shutil.rmtree(HISTORY_DIR)
+
+    previous = None
+
+    for snapshot in snapshots:
+        inventory = restore_snapshot(repository, snapshot)
+
+        if (
+            shard_path := record_history(
+                inventory, datetime.fromisoformat(snapshot["time"]), previous
+            )
+        ) is not None:
+            compact_history(shard_path)
+
+        previous = inventory
+
+    for month in History().months:
+        compact_history(os.path.join(HISTORY_DIR, f"{month}.json"))
+
+    return len(snapshots)
+
+
+def format_time(timestamp: int) -> str:
+    """Formats `timestamp` in local time
+
+    Args:
+        timestamp (int): seconds since epoch
+
+    Returns:
+        str: ISO 8601 time
+    """
+    return datetime.fromtimestamp(timestamp).astimezone().isoformat(timespec="seconds")
+
+
+@click.command(options_metavar="[options]")
+@click.argument(
+    "query", type=click.Choice(["materials", "sets"]), metavar="<materials|sets>"
+)
+@click.option(
+    "-d",
+    "--days",
+    type=click.IntRange(min=1),
+    default=30,
+    metavar="<n>",
+    help="Show materials over the last <n> days",
+)
+@click.option(
+    "-w",
+    "--weeks",
+    type=click.IntRange(min=1),
+    default=8,
+    metavar="<n>",
+    help="Show sets completed per week over the last <n> weeks",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(["json", "csv", "ndjson"]),
+    help="Write history in <format> instead of showing it",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    metavar="<path>",
+    help="Write history to <path>. Defaults to standard output",
+)
+@click.option(
+    "--rebuild",
+    type=click.Path(file_okay=False, exists=True),
+    metavar="<path>",
+    help="Replace history with snapshots in backup repository at <path>",
+)
+@click.option(
+    "-p",
+    "--profile",
+    default="default",
+    metavar="<name>",
+    help="Profile of snapshots to rebuild history from",
+)
+def history(
+    query: str,
+    days: int,
+    weeks: int,
+    output_format: Optional[str],
+    output: TextIO,
+    rebuild: Optional[str],
+    profile: str,
+):
+    """Shows inventory history"""
+
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if rebuild is not None:
+        count = rebuild_history(rebuild, profile)
+        print(bold(color(f"Rebuilt history from {count} snapshots!", "green")))
+
+    inventory_history = History()
+
+    if len(inventory_history.months) == 0:
+        print(bold(color("No history recorded yet!", "red")))
+        exit(1)
+
+    if query == "materials":
+        end = int(datetime.now().timestamp())
+        initial, changes = inventory_history.changes(
+            end - days * 86400, end, "materials"
+        )
+
+        if output_format is not None:
+            write_rows(
+                (
+                    dict(time=format_time(timestamp), name=key[1], amount=value)
+                    for timestamp, key, value in changes
+                ),
+                ["time", "name", "amount"],
+                output_format,
+                output,
+            )
+            return
+
+        final = dict(initial)
+        counts = {}
+        for _, key, value in changes:
+            final[key] = value
+            counts[key] = counts.get(key, 0) + 1
+
+        print(bold(f"Materials over the last {days} days:") + "\n")
+
+        if len(counts) == 0:
+            print(italic("  No changes"))
+
+        for key in sorted(counts, key=lambda key: key[1]):
+            change = (final[key] or 0) - initial.get(key, 0)
+            print(
+                f"  {initial.get(key, 0):6d} → {final[key] or 0:6d}  "
+                f"{color(f'{change:+7d}', 'green' if change >= 0 else 'red')}  {key[1]}"
+            )
+    else:
+        weekly = sets_completed_per_week(metadata, inventory_history, weeks)
+
+        if output_format is not None:
+            write_rows(
+                (
+                    dict(week=start.date().isoformat(), name=s_name)
+                    for start, s_names in weekly
+                    for s_name in s_names
+                ),
+                ["week", "name"],
+                output_format,
+                output,
+            )
+            return
+
+        print(bold(f"Sets completed per week over the last {weeks} weeks:") + "\n")
+
+        for start, s_names in weekly:
+            print(f"  {start.date().isoformat()}  {len(s_names):3d}")
+            for s_name in s_names:
+                print(italic(f"                 {s_name}"))
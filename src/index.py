@@ -0,0 +1,203 @@
+"""This module defines the reverse indexes over housing metadata.
+
+Names are interned as integer ids (their position in metadata),
+and relations between furnishings, materials, companions and sets are stored
+as lists of ids in both directions.
+The index is built once per metadata fingerprint and persisted with the configuration.
+"""
+
+import json
+import os
+from typing import List, Optional
+
+
+from .file import CONFIG_DIR, Metadata, write_json
+from .models import Housing, load_housing
+
+INDEX_FILE: str = os.path.join(CONFIG_DIR, "index.json")
+"""File for metadata index"""
+
+
+class MetadataIndex:
+    """Reverse indexes and sort keys over housing metadata"""
+
+    def __init__(self, data: dict, housing: Housing):
+        """Creates index from its serialized `data`
+
+        Args:
+            data (dict): serialized index
+            housing (Housing): housing models, for ids of names
+        """
+        self.data = data
+        self.housing = housing
+        self.fingerprint: Optional[str] = data["fingerprint"]
+
+        self.materials: List[str] = data["materials"]
+        self.companions: List[str] = data["companions"]
+        self.furnishings: List[str] = data["furnishings"]
+        self.sets: List[str] = data["sets"]
+
+        self.furnishing_sets: List[List[int]] = data["furnishing_sets"]
+        self.material_furnishings: List[List[int]] = data["material_furnishings"]
+        self.companion_sets: List[List[int]] = data["companion_sets"]
+
+        self.craftable: List[bool] = data["craftable"]
+        self.purchasable: List[bool] = data["purchasable"]
+        self.gift_sets: List[bool] = data["gift_sets"]
+        self.material_ranks: List[int] = data["material_ranks"]
+
+    def sets_using(self, f_name: str) -> List[str]:
+        """Returns sets which require `f_name` furnishing
+
+        Args:
+            f_name (str): furnishing name
+
+        Returns:
+            List[str]: set names
+        """
+        return [
+            self.sets[s_id]
+            for s_id in self.furnishing_sets[self.housing.furnishing_ids[f_name]]
+        ]
+
+    def sets_of_companion(self, c_name: str) -> List[str]:
+        """Returns gift sets which `c_name` companion gifts for
+
+        Args:
+            c_name (str): companion name
+
+        Returns:
+            List[str]: set names
+        """
+        return [
+            self.sets[s_id]
+            for s_id in self.companion_sets[self.housing.companion_ids[c_name]]
+        ]
+
+    def is_gift_set(self, s_name: str) -> bool:
+        """Checks whether `s_name` set is a gift set
+
+        Args:
+            s_name (str): set name
+
+        Returns:
+            bool: whether set has gifting companions
+        """
+        return self.gift_sets[self.housing.set_ids[s_name]]
+
+    def material_rank(self, m_name: str) -> int:
+        """Returns position of `m_name` material in display order
+
+        Args:
+            m_name (str): material name
+
+        Returns:
+            int: sort key
+        """
+        return self.material_ranks[self.housing.material_ids[m_name]]
+
+
+def order_materials(materials: List[str]) -> List[str]:
+    """Returns `materials` in display order, grouped by their kind
+
+    Args:
+        materials (List[str]): material names
+
+    Returns:
+        List[str]: ordered material names
+    """
+    return sorted(materials, key=lambda m_name: m_name.split()[-1])
+
+
+def build_index(metadata: dict, housing: Housing) -> MetadataIndex:
+    """Builds index over `metadata`
+
+    Args:
+        metadata (dict): housing metadata
+        housing (Housing): housing models of `metadata`
+
+    Returns:
+        MetadataIndex: metadata index
+    """
+    materials = list(metadata["materials"])
+    companions = list(metadata["companions"].keys())
+    furnishings = list(metadata["furnishings"].keys())
+    sets = list(metadata["sets"].keys())
+
+    furnishing_sets = [[] for _ in furnishings]
+    material_furnishings = [[] for _ in materials]
+    companion_sets = [[] for _ in companions]
+
+    for f_id, f_md in enumerate(metadata["furnishings"].values()):
+        for m_name in f_md.get("materials") or {}:
+            material_furnishings[housing.material_ids[m_name]].append(f_id)
+
+    for s_id, s_md in enumerate(metadata["sets"].values()):
+        for f_name in s_md["furnishings"]:
+            furnishing_sets[housing.furnishing_ids[f_name]].append(s_id)
+
+        for c_name in s_md.get("companions") or []:
+            companion_sets[housing.companion_ids[c_name]].append(s_id)
+
+    material_ranks = [0] * len(materials)
+    for rank, m_name in enumerate(order_materials(materials)):
+        material_ranks[housing.material_ids[m_name]] = rank
+
+    return MetadataIndex(
+        dict(
+            fingerprint=metadata.get("fingerprint"),
+            materials=materials,
+            companions=companions,
+            furnishings=furnishings,
+            sets=sets,
+            furnishing_sets=furnishing_sets,
+            material_furnishings=material_furnishings,
+            companion_sets=companion_sets,
+            craftable=[
+                f_md.get("materials") is not None
+                for f_md in metadata["furnishings"].values()
+            ],
+            purchasable=[
+                any(k in ["currency", "mora"] for k in f_md)
+                for f_md in metadata["furnishings"].values()
+            ],
+            gift_sets=[
+                s_md.get("companions") is not None for s_md in metadata["sets"].values()
+            ],
+            material_ranks=material_ranks,
+        ),
+        housing,
+    )
+
+
+def load_index(metadata: dict) -> MetadataIndex:
+    """Loads index over `metadata`, building and saving it if outdated
+
+    The index is kept with the housing models of the same fingerprint,
+    which are only built from metadata when the saved index is outdated.
+    It is only saved for metadata loaded from file,
+    as the saved index is that of the metadata in the configuration.
+
+    Args:
+        metadata (dict): housing metadata
+
+    Returns:
+        MetadataIndex: metadata index
+    """
+    if (housing := load_housing(metadata)).index is not None:
+        return housing.index
+
+    if (fingerprint := metadata.get("fingerprint")) is not None and os.path.exists(
+        INDEX_FILE
+    ):
+        with open(INDEX_FILE, "r") as file_pointer:
+            if (data := json.load(file_pointer))["fingerprint"] == fingerprint:
+                housing.index = MetadataIndex(data, housing)
+
+    if housing.index is None:
+        housing.index = build_index(metadata, housing)
+
+        if fingerprint is not None and isinstance(metadata, Metadata):
+            write_json(INDEX_FILE, housing.index.data)
+
+    return housing.index
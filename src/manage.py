@@ -1,16 +1,29 @@
 """This module defines functions for managing inventory"""
 
 
+from typing import List
+
+
 import click
 
 
 from .file import load_inventory, load_metadata, save_inventory
+from .index import load_index, order_materials
+from .models import Housing, load_housing
 from .query import (
     get_crafting_recipe,
     get_materials_for_furnishings,
     get_placing_recipe,
 )
 from .reset import create_inventory_schema, update_inventory
+from .rules import (
+    check_blueprint,
+    check_crafted,
+    check_set_owned,
+    consume_materials,
+    gifting_companions,
+    set_companion,
+)
 from .utils import (
     bold,
     clear_screen,
@@ -22,6 +35,22 @@ from .utils import (
     prompt_confirm,
     terminal_menu,
 )
+from .view import inventory_stamp, load_view, refresh_menu
+
+
+def format_companions(inventory: dict, names: List[str]) -> List[str]:
+    """Formats menu entries of `names` companions
+
+    Args:
+        inventory (dict): user inventory
+        names (List[str]): companion names
+
+    Returns:
+        List[str]: menu entries
+    """
+    companions = inventory["companions"]
+
+    return [f"{emoji_boolean(companions[name])} {name}" for name in names]
 
 
 def manage_companions(metadata: dict, inventory: dict):
@@ -31,28 +60,24 @@ def manage_companions(metadata: dict, inventory: dict):
         metadata (dict): housing metadata
         inventory (dict): user inventory
     """
+    index = load_index(metadata)
     names = sorted(metadata["companions"].keys())
     companions = inventory["companions"]
 
-    choice = 0
+    menu = terminal_menu(
+        format_companions(inventory, names),
+        title="Companions\n\n  Track whether or not the following are owned:\n",
+    )
+
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            [f"{emoji_boolean(companions[name])} {name}" for name in names],
-            title="Companions\n\n  Track whether or not the following are owned:\n",
-            cursor_index=choice,
-        )
-
         if (choice := menu.show()) is not None:
             c_name = names[choice]
-            companions[c_name] = not companions[c_name]
-
-            if not companions[c_name]:
-                for s_name in metadata["companions"][c_name]["sets"]:
-                    inventory["sets"][s_name][c_name] = False
+            set_companion(index, inventory, c_name, not companions[c_name])
 
             save_inventory(inventory)
+            menu.update(choice, format_companions(inventory, [c_name])[0])
         else:
             break
 
@@ -64,19 +89,17 @@ def manage_materials(metadata: dict, inventory: dict):
         metadata (dict): housing metadata
         inventory (dict): user inventory
     """
-    names = sorted(metadata["materials"], key=lambda m: m.split()[-1])
+    names = order_materials(metadata["materials"])
     materials = inventory["materials"]
 
-    choice = 0
+    menu = terminal_menu(
+        get_crafting_recipe({name: materials[name] for name in names}),
+        title="Materials\n\n  Track how many of the following are owned:\n",
+    )
+
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            get_crafting_recipe({name: materials[name] for name in names}),
-            title="Materials\n\n  Track how many of the following are owned:\n",
-            cursor_index=choice,
-        )
-
         if (choice := menu.show()) is not None:
             clear_screen()
 
@@ -89,10 +112,51 @@ def manage_materials(metadata: dict, inventory: dict):
 
             materials[name] = new_amount
             save_inventory(inventory)
+            menu.update(choice, get_crafting_recipe({name: new_amount})[0])
         else:
             break
 
 
+def furnishing_order(housing: Housing, inventory: dict, f_name: str) -> tuple:
+    """Returns sort key of `f_name` furnishing in menu order
+
+    Args:
+        housing (Housing): housing models
+        inventory (dict): user inventory
+        f_name (str): furnishing name
+
+    Returns:
+        tuple: sort key, ending with the furnishing name
+    """
+    f = housing.furnishing(f_name)
+    entry = inventory["furnishings"][f_name]
+
+    return (
+        not f.craftable,
+        entry.get("crafted", False),
+        not entry.get("blueprint", False),
+        not f.purchasable,
+        f_name,
+    )
+
+
+def format_furnishing(housing: Housing, inventory: dict, f_name: str) -> str:
+    """Formats menu entry of `f_name` furnishing
+
+    Args:
+        housing (Housing): housing models
+        inventory (dict): user inventory
+        f_name (str): furnishing name
+
+    Returns:
+        str: menu entry
+    """
+    f = housing.furnishing(f_name)
+    entry = inventory["furnishings"][f_name]
+
+    return f"""{"💰" if f.purchasable else "🫖"} {f"📘{emoji_boolean(entry['blueprint'])}🔨{emoji_boolean(entry['crafted'])}" if f.craftable else " " * 8}  {entry["owned"]:4d}×  {f_name}"""
+
+
 def manage_furnishings(metadata: dict, inventory: dict):
     """Manages furnishings
 
@@ -100,35 +164,27 @@ def manage_furnishings(metadata: dict, inventory: dict):
         metadata (dict): housing metadata
         inventory (dict): user inventory
     """
-    furnishings_md = metadata["furnishings"]
-    furnishings = inventory["furnishings"]
-
-    names = sorted(
-        furnishings_md.keys(),
-        key=lambda name: (
-            furnishings_md[name].get("materials") is None,
-            furnishings[name].get("crafted", False),
-            not furnishings[name].get("blueprint", False),
-            not any(map(lambda k: k in ["currency", "mora"], furnishings_md[name])),
-            name,
-        ),
+    housing = load_housing(metadata)
+
+    view = load_view(
+        "manage-furnishings",
+        inventory_stamp(metadata, inventory),
+        metadata["furnishings"],
+        lambda f_name: furnishing_order(housing, inventory, f_name),
+        lambda f_name: format_furnishing(housing, inventory, f_name),
+    )
+
+    menu = terminal_menu(
+        view.rows,
+        title="Furnishings\n\n  Legend:\n\n    🫖 = rewarded for trust rank / adeptal mirror quests / events\n    💰 = can be bought from realm depot / traveling salesman\n    📘 = blueprint owned\n    🔨 = crafted at least once\n\n  Track the following:\n",
     )
 
-    choice = 0
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            [
-                f"""{"💰" if any(map(lambda k: k in ["currency", "mora"], furnishings_md[name])) else "🫖"} {f"📘{emoji_boolean(furnishings[name]['blueprint'])}🔨{emoji_boolean(furnishings[name]['crafted'])}" if furnishings_md[name].get("materials") is not None else " " * 8}  {furnishings[name]["owned"]:4d}×  {name}"""
-                for name in names
-            ],
-            title="Furnishings\n\n  Legend:\n\n    🫖 = rewarded for trust rank / adeptal mirror quests / events\n    💰 = can be bought from realm depot / traveling salesman\n    📘 = blueprint owned\n    🔨 = crafted at least once\n\n  Track the following:\n",
-            cursor_index=choice,
-        )
-
         if (choice := menu.show()) is not None:
-            manage_furnishing(metadata, inventory, names[choice])
+            manage_furnishing(metadata, inventory, (f_name := view.names[choice]))
+            refresh_menu(menu, view, inventory_stamp(metadata, inventory), f_name)
         else:
             break
 
@@ -152,65 +208,53 @@ def manage_furnishing(metadata: dict, inventory: dict, f_name: str):
 
     title = f"{f_name}:\n"
 
+    menu = None
     choice = 0
     while True:
         clear_screen()
 
         if (blueprint := furnishing.get("blueprint")) is not None:
             options = ["blueprint", "crafted"][: 2 if blueprint else 1]
+            rows = [
+                f"""{furnishing["owned"]:4d}× owned""",
+                *[f"{emoji_boolean(furnishing[o])} {o}" for o in options],
+            ]
 
-            menu = terminal_menu(
-                [
-                    f"""{furnishing["owned"]:4d}× owned""",
-                    *[f"{emoji_boolean(furnishing[o])} {o}" for o in options],
-                ],
-                title=f"{title}\n Materials:\n\n{recipe}\n",
-                cursor_index=choice,
-                show_search_hint=False,
-            )
+            if menu is None:
+                menu = terminal_menu(
+                    rows,
+                    title=f"{title}\n Materials:\n\n{recipe}\n",
+                    show_search_hint=False,
+                )
+            else:
+                menu.replace(rows)
 
-            choice = menu.show()
+            choice = menu.show(choice)
 
             if choice in [1, 2]:
-                if (crafted := furnishing["crafted"]) and choice == 1:
-                    input(
-                        bold(
-                            color(
-                                "\nCannot set blueprint as not owned if already crafted!",
-                                "red",
-                            )
-                        )
-                    )
+                option = options[choice - 1]
+                check = check_blueprint if option == "blueprint" else check_crafted
+
+                if message := check(inventory, f_name, not furnishing[option]):
+                    input(bold(color(f"\n{message}!", "red")))
                 else:
-                    if choice == 2 and not crafted:
+                    if choice == 2 and not furnishing["crafted"]:
                         if prompt_confirm(
                             "\nConsume materials from inventory to craft furnishing?"
-                        ):
-                            if all(
-                                inventory["materials"][m_name] >= amount
-                                for m_name, amount in materials.items()
-                            ):
-                                for m_name, amount in materials.items():
-                                    inventory["materials"][m_name] -= amount
-                            else:
-                                input(
-                                    bold(
-                                        color(
-                                            "\nNot enough materials for crafting!",
-                                            "red",
-                                        )
-                                    )
+                        ) and not consume_materials(metadata, inventory, f_name, 1):
+                            input(
+                                bold(
+                                    color("\nNot enough materials for crafting!", "red")
                                 )
-                                continue
+                            )
+                            continue
 
                         if prompt_confirm(
                             "Add crafted furnishing to inventory amount?"
                         ):
                             furnishing["owned"] += 1
 
-                    furnishing[options[choice - 1]] = not furnishing[
-                        options[choice - 1]
-                    ]
+                    furnishing[option] = not furnishing[option]
                     save_inventory(inventory)
         else:
             choice = None
@@ -242,21 +286,11 @@ def manage_furnishing(metadata: dict, inventory: dict, f_name: str):
                 if prompt_confirm(
                     f"Consume materials from inventory to craft {num_crafted:4d} furnishings?"
                 ):
-                    if all(
-                        inventory["materials"][m_name] >= amount
-                        for m_name, amount in crafting_materials.items()
-                    ):
-                        for m_name, amount in crafting_materials.items():
-                            inventory["materials"][m_name] -= amount
+                    if consume_materials(metadata, inventory, f_name, num_crafted):
                         furnishing["crafted"] = True
                     else:
                         input(
-                            bold(
-                                color(
-                                    "\nNot enough materials for crafting!",
-                                    "red",
-                                )
-                            )
+                            bold(color("\nNot enough materials for crafting!", "red"))
                         )
                         continue
 
@@ -267,6 +301,38 @@ def manage_furnishing(metadata: dict, inventory: dict, f_name: str):
             break
 
 
+def set_order(housing: Housing, inventory: dict, s_name: str) -> tuple:
+    """Returns sort key of `s_name` set in menu order
+
+    Args:
+        housing (Housing): housing models
+        inventory (dict): user inventory
+        s_name (str): set name
+
+    Returns:
+        tuple: sort key, ending with the set name
+    """
+    return (
+        housing.set(s_name).companions is None,
+        inventory["sets"][s_name]["owned"],
+        s_name,
+    )
+
+
+def format_set(housing: Housing, inventory: dict, s_name: str) -> str:
+    """Formats menu entry of `s_name` set
+
+    Args:
+        housing (Housing): housing models
+        inventory (dict): user inventory
+        s_name (str): set name
+
+    Returns:
+        str: menu entry
+    """
+    return f"""{"🎁" if housing.set(s_name).companions is not None else "🏡"}{emoji_boolean(inventory["sets"][s_name]["owned"])}  {s_name}"""
+
+
 def manage_sets(metadata: dict, inventory: dict):
     """Manages sets
 
@@ -274,32 +340,27 @@ def manage_sets(metadata: dict, inventory: dict):
         metadata (dict): housing metadata
         inventory (dict): user inventory
     """
-    sets_md = metadata["sets"]
-    sets = inventory["sets"]
-    names = sorted(
-        sets_md.keys(),
-        key=lambda name: (
-            sets_md[name].get("companions") is None,
-            sets[name]["owned"],
-            name,
-        ),
+    housing = load_housing(metadata)
+
+    view = load_view(
+        "manage-sets",
+        inventory_stamp(metadata, inventory),
+        metadata["sets"],
+        lambda s_name: set_order(housing, inventory, s_name),
+        lambda s_name: format_set(housing, inventory, s_name),
+    )
+
+    menu = terminal_menu(
+        view.rows,
+        title="Sets\n\n  Legend:\n\n    🎁 = gift set\n    🏡 = furniture set\n\n  Track the following:\n",
     )
 
-    choice = 0
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            [
-                f"""{"🎁" if sets_md[name].get("companions") is not None else "🏡"}{emoji_boolean(sets[name]["owned"])}  {name}"""
-                for name in names
-            ],
-            title="Sets\n\n  Legend:\n\n    🎁 = gift set\n    🏡 = furniture set\n\n  Track the following:\n",
-            cursor_index=choice,
-        )
-
         if (choice := menu.show()) is not None:
-            manage_set(metadata, inventory, names[choice])
+            manage_set(metadata, inventory, (s_name := view.names[choice]))
+            refresh_menu(menu, view, inventory_stamp(metadata, inventory), s_name)
         else:
             break
 
@@ -312,6 +373,7 @@ def manage_set(metadata: dict, inventory: dict, s_name: str):
         inventory (dict): user inventory
         s_name (str): set name
     """
+    index = load_index(metadata)
     hset = inventory["sets"][s_name]
     furnishings = metadata["sets"][s_name].get("furnishings")
 
@@ -331,7 +393,7 @@ def manage_set(metadata: dict, inventory: dict, s_name: str):
                             get_materials_for_furnishings(
                                 metadata, furnishings
                             ).items(),
-                            key=lambda item: item[0].split()[-1],
+                            key=lambda item: index.material_rank(item[0]),
                         )
                     )
                 )
@@ -346,51 +408,36 @@ def manage_set(metadata: dict, inventory: dict, s_name: str):
 
     companions = hset.get("companions")
 
+    menu = None
     choice = 0
     while True:
         clear_screen()
 
         owned = hset["owned"]
 
-        companion_names = (
-            [
-                c_name
-                for c_name in sorted(companions.keys())
-                if inventory["companions"][c_name]
-            ]
-            if companions is not None
-            and owned
-            and all(
-                amount <= inventory["furnishings"][f_name]["owned"]
-                for f_name, amount in furnishings.items()
-            )
-            else []
-        )
+        companion_names = gifting_companions(metadata, inventory, s_name)
 
-        menu = terminal_menu(
-            [
-                f"""{emoji_boolean(owned)} blueprint""",
-                *[
-                    f"""{emoji_boolean(companions[c_name])} 🎁 {c_name}"""
-                    for c_name in companion_names
-                ],
+        rows = [
+            f"""{emoji_boolean(owned)} blueprint""",
+            *[
+                f"""{emoji_boolean(companions[c_name])} 🎁 {c_name}"""
+                for c_name in companion_names
             ],
-            title=f"{s_name}:\n{placing_recipe}{crafting_recipe}",
-            cursor_index=choice,
-            show_search_hint=False,
-        )
+        ]
 
-        if (choice := menu.show()) is not None:
+        if menu is None:
+            menu = terminal_menu(
+                rows,
+                title=f"{s_name}:\n{placing_recipe}{crafting_recipe}",
+                show_search_hint=False,
+            )
+        else:
+            menu.replace(rows)
+
+        if (choice := menu.show(choice)) is not None:
             if choice == 0:
-                if any(companions[c_name] for c_name in companion_names) and owned:
-                    input(
-                        bold(
-                            color(
-                                "Cannot set blueprint as not owned if gifts already received!",
-                                "red",
-                            )
-                        )
-                    )
+                if message := check_set_owned(inventory, s_name, not owned):
+                    input(bold(color(f"{message}!", "red")))
                     continue
                 hset["owned"] = not hset["owned"]
             elif owned:
@@ -417,19 +464,17 @@ def manage():
 
     update_inventory(metadata, inventory)
 
-    options = list(inventory.keys())
+    options = [k for k, v in inventory.items() if isinstance(v, dict)]
+
+    menu = terminal_menu(
+        [f"{emoji(o)} {o}" for o in options],
+        title="Manage inventory of:\n",
+        show_search_hint=False,
+    )
 
-    choice = 0
     while True:
         clear_screen()
 
-        menu = terminal_menu(
-            [f"{emoji(o)} {o}" for o in options],
-            title="Manage inventory of:\n",
-            cursor_index=choice,
-            show_search_hint=False,
-        )
-
         if (choice := menu.show()) is not None:
             dict(
                 companions=manage_companions,
@@ -0,0 +1,394 @@
+"""This module defines compact models of housing metadata and inventory.
+
+Entities are slotted classes with interned names and integer ids
+(their position in metadata), and relations between them are tuples of ids.
+Furnishing inventory values are stored in typed arrays aligned with the same ids,
+with entries as light views over them.
+Both are loaded from the JSON shape of the configuration.
+"""
+
+from array import array
+from functools import cached_property
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+class Material:
+    """Crafting material"""
+
+    __slots__ = ("id", "name")
+
+    def __init__(self, m_id: int, name: str):
+        """Creates material
+
+        Args:
+            m_id (int): material id
+            name (str): material name
+        """
+        self.id = m_id
+        self.name = sys.intern(name)
+
+
+class Companion:
+    """Companion gifting for sets"""
+
+    __slots__ = ("id", "name", "sets")
+
+    def __init__(self, c_id: int, name: str, sets: Tuple[str, ...]):
+        """Creates companion
+
+        Args:
+            c_id (int): companion id
+            name (str): companion name
+            sets (Tuple[str, ...]): names of sets gifted for
+        """
+        self.id = c_id
+        self.name = sys.intern(name)
+        self.sets = sets
+
+
+class Furnishing:
+    """Furnishing, crafted from materials and / or bought"""
+
+    __slots__ = (
+        "id",
+        "name",
+        "recipe",
+        "currency",
+        "mora",
+        "cost_type",
+        "cost",
+        "craftable",
+        "purchasable",
+    )
+
+    def __init__(
+        self,
+        f_id: int,
+        name: str,
+        recipe: Optional[Tuple[Tuple[int, int], ...]],
+        currency: Optional[int],
+        mora: Optional[int],
+    ):
+        """Creates furnishing
+
+        Args:
+            f_id (int): furnishing id
+            name (str): furnishing name
+            recipe (Optional[Tuple[Tuple[int, int], ...]]): pairs of material ids and amounts,
+                or `None` if not craftable
+            currency (Optional[int]): price in Realm Currency
+            mora (Optional[int]): price in thousands of mora
+        """
+        self.id = f_id
+        self.name = sys.intern(name)
+        self.recipe = recipe
+        self.currency = currency
+        self.mora = mora
+
+        self.cost_type = "currency" if currency is not None else "mora"
+        self.cost = currency if currency is not None else (mora or 0) * 1000
+        self.craftable = recipe is not None
+        self.purchasable = currency is not None or mora is not None
+
+
+class HousingSet:
+    """Set of furnishings, optionally gifted for by companions"""
+
+    __slots__ = (
+        "id",
+        "name",
+        "requirements",
+        "companions",
+        "currency",
+        "mora",
+        "cost_type",
+        "cost",
+    )
+
+    def __init__(
+        self,
+        s_id: int,
+        name: str,
+        requirements: Tuple[Tuple[int, int], ...],
+        companions: Optional[Tuple[int, ...]],
+        currency: Optional[int],
+        mora: Optional[int],
+    ):
+        """Creates set
+
+        Args:
+            s_id (int): set id
+            name (str): set name
+            requirements (Tuple[Tuple[int, int], ...]): pairs of furnishing ids and counts
+            companions (Optional[Tuple[int, ...]]): companion ids, or `None` if not a gift set
+            currency (Optional[int]): price in Realm Currency
+            mora (Optional[int]): price in thousands of mora
+        """
+        self.id = s_id
+        self.name = sys.intern(name)
+        self.requirements = requirements
+        self.companions = companions
+        self.currency = currency
+        self.mora = mora
+
+        self.cost_type = "currency" if currency is not None else "mora"
+        self.cost = currency if currency is not None else (mora or 0) * 1000
+
+
+class Housing:
+    """Housing metadata as models indexed by id and by name
+
+    Ids of names are read from metadata on first lookup,
+    and models are only built on first use.
+    """
+
+    def __init__(self, metadata: dict):
+        """Loads models from `metadata`
+
+        Args:
+            metadata (dict): housing metadata
+        """
+        self.metadata = metadata
+        self.fingerprint: Optional[str] = metadata.get("fingerprint")
+
+        # Index, catalog and cost model of the same metadata, compiled on first use
+        self.index = None
+        self.catalog = None
+        self.cost_model = None
+
+    @cached_property
+    def material_ids(self) -> Dict[str, int]:
+        """Ids of materials by name"""
+        return {m_name: m_id for m_id, m_name in enumerate(self.metadata["materials"])}
+
+    @cached_property
+    def companion_ids(self) -> Dict[str, int]:
+        """Ids of companions by name"""
+        return {c_name: c_id for c_id, c_name in enumerate(self.metadata["companions"])}
+
+    @cached_property
+    def furnishing_ids(self) -> Dict[str, int]:
+        """Ids of furnishings by name"""
+        return {
+            f_name: f_id for f_id, f_name in enumerate(self.metadata["furnishings"])
+        }
+
+    @cached_property
+    def set_ids(self) -> Dict[str, int]:
+        """Ids of sets by name"""
+        return {s_name: s_id for s_id, s_name in enumerate(self.metadata["sets"])}
+
+    @cached_property
+    def materials(self) -> List[Material]:
+        """Materials by id"""
+        return [
+            Material(m_id, m_name)
+            for m_id, m_name in enumerate(self.metadata["materials"])
+        ]
+
+    @cached_property
+    def companions(self) -> List[Companion]:
+        """Companions by id"""
+        return [
+            Companion(c_id, c_name, tuple(map(sys.intern, c_md.get("sets", []))))
+            for c_id, (c_name, c_md) in enumerate(self.metadata["companions"].items())
+        ]
+
+    @cached_property
+    def furnishings(self) -> List[Furnishing]:
+        """Furnishings by id"""
+        return [
+            Furnishing(
+                f_id,
+                f_name,
+                (
+                    tuple(
+                        (self.material_ids[m_name], amount)
+                        for m_name, amount in f_md["materials"].items()
+                    )
+                    if f_md.get("materials") is not None
+                    else None
+                ),
+                f_md.get("currency"),
+                f_md.get("mora"),
+            )
+            for f_id, (f_name, f_md) in enumerate(self.metadata["furnishings"].items())
+        ]
+
+    @cached_property
+    def sets(self) -> List[HousingSet]:
+        """Sets by id"""
+        return [
+            HousingSet(
+                s_id,
+                s_name,
+                tuple(
+                    (self.furnishing_ids[f_name], num_required)
+                    for f_name, num_required in s_md["furnishings"].items()
+                ),
+                (
+                    tuple(self.companion_ids[c_name] for c_name in s_md["companions"])
+                    if s_md.get("companions") is not None
+                    else None
+                ),
+                s_md.get("currency"),
+                s_md.get("mora"),
+            )
+            for s_id, (s_name, s_md) in enumerate(self.metadata["sets"].items())
+        ]
+
+    def furnishing(self, f_name: str) -> Furnishing:
+        """Returns furnishing named `f_name`
+
+        Args:
+            f_name (str): furnishing name
+
+        Returns:
+            Furnishing: furnishing
+        """
+        return self.furnishings[self.furnishing_ids[f_name]]
+
+    def set(self, s_name: str) -> HousingSet:
+        """Returns set named `s_name`
+
+        Args:
+            s_name (str): set name
+
+        Returns:
+            HousingSet: set
+        """
+        return self.sets[self.set_ids[s_name]]
+
+
+HOUSINGS: Dict[str, Housing] = {}
+"""Loaded housing models by metadata fingerprint,
+along with the index, catalog and cost model compiled from them"""
+
+
+UNFINGERPRINTED: Optional[Housing] = None
+"""Housing models of the latest metadata loaded without a fingerprint"""
+
+
+def load_housing(metadata: dict) -> Housing:
+    """Returns housing models of `metadata`, reusing them for the same fingerprint
+
+    Metadata without a fingerprint, which is never saved,
+    reuses the models of the latest such metadata if it is the same object,
+    so it must not be changed in place between calls.
+
+    Args:
+        metadata (dict): housing metadata
+
+    Returns:
+        Housing: housing models
+    """
+    global UNFINGERPRINTED
+
+    if (fingerprint := metadata.get("fingerprint")) is None:
+        if UNFINGERPRINTED is None or UNFINGERPRINTED.metadata is not metadata:
+            UNFINGERPRINTED = Housing(metadata)
+
+        return UNFINGERPRINTED
+
+    if (housing := HOUSINGS.get(fingerprint)) is None:
+        housing = HOUSINGS[fingerprint] = Housing(metadata)
+
+    return housing
+
+
+ABSENT: int = -1
+"""Array code of a flag missing from an inventory entry"""
+
+
+def encode_flag(value: Optional[bool]) -> int:
+    """Encodes optional flag as an array code
+
+    Args:
+        value (Optional[bool]): flag
+
+    Returns:
+        int: `ABSENT`, 0 or 1
+    """
+    return ABSENT if value is None else int(value)
+
+
+def decode_flag(code: int) -> Optional[bool]:
+    """Decodes array code as an optional flag
+
+    Args:
+        code (int): `ABSENT`, 0 or 1
+
+    Returns:
+        Optional[bool]: flag
+    """
+    return None if code == ABSENT else code == 1
+
+
+class InventoryEntry:
+    """View of the inventory of a furnishing"""
+
+    __slots__ = ("inventory", "id")
+
+    def __init__(self, inventory: "Inventory", f_id: int):
+        """Creates view of `f_id` furnishing in `inventory`
+
+        Args:
+            inventory (Inventory): inventory model
+            f_id (int): furnishing id
+        """
+        self.inventory = inventory
+        self.id = f_id
+
+    @property
+    def name(self) -> str:
+        """Furnishing name"""
+        return self.inventory.housing.furnishings[self.id].name
+
+    @property
+    def owned(self) -> int:
+        """Number of furnishings owned"""
+        return self.inventory.owned[self.id]
+
+    @property
+    def blueprint(self) -> Optional[bool]:
+        """Whether blueprint is owned, or `None` if not craftable"""
+        return decode_flag(self.inventory.blueprint[self.id])
+
+    @property
+    def crafted(self) -> Optional[bool]:
+        """Whether furnishing was crafted, or `None` if not craftable"""
+        return decode_flag(self.inventory.crafted[self.id])
+
+
+class Inventory:
+    """Furnishing inventory as typed arrays aligned with housing ids"""
+
+    __slots__ = ("housing", "owned", "blueprint", "crafted")
+
+    def __init__(self, housing: Housing, inventory: dict):
+        """Loads arrays from `inventory`
+
+        Args:
+            housing (Housing): housing models
+            inventory (dict): user inventory, up to date with housing metadata
+        """
+        self.housing = housing
+
+        furnishings = inventory["furnishings"]
+        entries = [furnishings[f.name] for f in housing.furnishings]
+
+        self.owned = array("q", (f["owned"] for f in entries))
+        self.blueprint = array("b", (encode_flag(f.get("blueprint")) for f in entries))
+        self.crafted = array("b", (encode_flag(f.get("crafted")) for f in entries))
+
+    def entry(self, f_name: str) -> InventoryEntry:
+        """Returns inventory entry of `f_name` furnishing
+
+        Args:
+            f_name (str): furnishing name
+
+        Returns:
+            InventoryEntry: inventory entry
+        """
+        return InventoryEntry(self, self.housing.furnishing_ids[f_name])
@@ -0,0 +1,522 @@
+"""This module defines functions for planning what to complete with owned resources"""
+
+
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+
+import click
+
+
+from .engine import compile_catalog, compile_inventory
+from .file import load_inventory, load_metadata
+from .index import load_index
+from .reset import create_inventory_schema, update_inventory
+from .utils import bold, color, emoji, italic
+
+
+def plan_completions(
+    metadata: dict,
+    inventory: dict,
+    currency: int = 0,
+    mora: int = 0,
+    weights: Optional[Dict[str, float]] = None,
+    max_nodes: int = 1000,
+) -> dict:
+    """Plans which sets to complete with owned materials, currency and mora
+
+    Each candidate set needs its blueprint and its missing furnishings,
+    which are crafted (buying the blueprint if needed) or bought.
+    Furnishings are shared between sets, as sets are placed one at a time,
+    so a selection of sets needs the largest missing count of each furnishing.
+    Only resources whose budget cannot cover every candidate at once limit a plan.
+    A greedy plan is built first, adding the set with most weight per share
+    of the remaining budget, with furnishings still needed by other sets discounted.
+    It is then improved with a branch and bound search in the same order,
+    which skips states already reached with a higher score
+    and is bounded by a fractional knapsack over the remaining budget.
+    The search is proven optimal only if it ends within `max_nodes` nodes,
+    which is usually the case for the downloaded catalog,
+    while catalogs ten times larger settle for the best plan found.
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        currency (int, optional): available Realm Currency. Defaults to 0.
+        mora (int, optional): available mora. Defaults to 0.
+        weights (Optional[Dict[str, float]], optional): mapping of set names to weight. Defaults to 1 for each gift set with gifting companions.
+        max_nodes (int, optional): number of search nodes before settling for the best plan found. Defaults to 1000.
+
+    Returns:
+        dict: plan
+    """
+    catalog = compile_catalog(metadata)
+    columns = compile_inventory(catalog, inventory)
+
+    num_materials = len(catalog.materials)
+    currency_id, mora_id = num_materials, num_materials + 1
+    budget = [inventory["materials"].get(m_name, 0) for m_name in catalog.materials]
+    budget += [currency, mora]
+
+    costs = catalog.costs
+
+    def price(cost_type: int, cost: Tuple[int, int]) -> List[Tuple[int, int]]:
+        return [(currency_id if cost_type == 0 else mora_id, sum(cost))]
+
+    # Cost of each additional unit of a furnishing, and of its blueprint
+    unit_costs: List[Optional[List[Tuple[int, int]]]] = []
+    blueprint_costs: List[List[Tuple[int, int]]] = []
+
+    for f_id in range(len(catalog.furnishings)):
+        purchasable = catalog.index.purchasable[f_id]
+        blueprint = columns["blueprint"][f_id]
+
+        if catalog.craftable[f_id] and (blueprint or purchasable):
+            unit_costs.append(catalog.recipes[f_id])
+            blueprint_costs.append(
+                price(costs.types[f_id], costs.blueprints[f_id])
+                if not blueprint
+                else []
+            )
+        elif not catalog.craftable[f_id] and purchasable:
+            unit_costs.append(price(costs.types[f_id], costs.items[f_id]))
+            blueprint_costs.append([])
+        else:
+            unit_costs.append(None)
+            blueprint_costs.append([])
+
+    if weights is None:
+        weights = {
+            s_name: 1
+            for s_id, s_name in enumerate(catalog.sets)
+            if columns["gifting"][s_id]
+        }
+
+    candidates = []
+    for s_id, s_name in enumerate(catalog.sets):
+        s_md = metadata["sets"][s_name]
+        row = [
+            (f_id, num_required - columns["owned"][f_id])
+            for f_id, num_required in catalog.requirements[s_id]
+            if columns["owned"][f_id] < num_required
+        ]
+
+        if (
+            weights.get(s_name, 0) > 0
+            and all(unit_costs[f_id] is not None for f_id, _ in row)
+            and (columns["set_owned"][s_id] or "currency" in s_md or "mora" in s_md)
+        ):
+            candidates.append(
+                (
+                    s_id,
+                    row,
+                    price(costs.set_types[s_id], costs.sets[s_id])
+                    if not columns["set_owned"][s_id]
+                    else [],
+                )
+            )
+
+    def total_cost(s_ids: Set[int]) -> Tuple[List[int], List[int]]:
+        """Returns furnishing counts and resources needed to complete `s_ids`"""
+        acquired = [0] * len(catalog.furnishings)
+        usage = [0] * len(budget)
+
+        for s_id, row, set_cost in candidates:
+            if s_id in s_ids:
+                for res_id, amount in set_cost:
+                    usage[res_id] += amount
+                for f_id, num_missing in row:
+                    acquired[f_id] = max(acquired[f_id], num_missing)
+
+        for f_id, num_acquired in enumerate(acquired):
+            if num_acquired == 0:
+                continue
+
+            for res_id, amount in unit_costs[f_id]:
+                usage[res_id] += amount * num_acquired
+            for res_id, amount in blueprint_costs[f_id]:
+                usage[res_id] += amount
+
+        return acquired, usage
+
+    # Resources are renumbered to those which all candidates together exceed
+    _, demand = total_cost(set(s_id for s_id, _, _ in candidates))
+    limited = {
+        res_id: k
+        for k, res_id in enumerate(
+            res_id for res_id in range(len(budget)) if demand[res_id] > budget[res_id]
+        )
+    }
+    capacity = [budget[res_id] for res_id in limited]
+
+    def restrict(cost: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        return [
+            (limited[res_id], amount) for res_id, amount in cost if res_id in limited
+        ]
+
+    needed = set(f_id for _, row, _ in candidates for f_id, _ in row)
+    units = {f_id: restrict(unit_costs[f_id]) for f_id in needed}
+    blueprints = {f_id: restrict(blueprint_costs[f_id]) for f_id in needed}
+    items = [
+        (weights[catalog.sets[s_id]], s_id, row, restrict(set_cost))
+        for s_id, row, set_cost in candidates
+    ]
+
+    acquired = dict.fromkeys(needed, 0)
+    usage = [0] * len(capacity)
+
+    def extend(item) -> Optional[Dict[int, int]]:
+        """Returns extra resources needed to add `item`, if within budget"""
+        _, _, row, set_cost = item
+        extra = {}
+
+        for k, amount in set_cost:
+            extra[k] = extra.get(k, 0) + amount
+
+        for f_id, num_missing in row:
+            if num_missing > (num_acquired := acquired[f_id]):
+                for k, amount in units[f_id]:
+                    extra[k] = extra.get(k, 0) + amount * (num_missing - num_acquired)
+
+                if num_acquired == 0:
+                    for k, amount in blueprints[f_id]:
+                        extra[k] = extra.get(k, 0) + amount
+
+        if any(usage[k] + amount > capacity[k] for k, amount in extra.items()):
+            return None
+
+        return extra
+
+    def count_users(remaining: List[tuple]) -> Dict[int, int]:
+        """Counts `remaining` items which still need more of each furnishing"""
+        users = {}
+
+        for _, _, row, _ in remaining:
+            for f_id, num_missing in row:
+                if num_missing > acquired[f_id]:
+                    users[f_id] = users.get(f_id, 0) + 1
+
+        return users
+
+    def add(item, extra: Dict[int, int]) -> List[Tuple[int, int]]:
+        """Adds `item` with its `extra` resources, returning previous furnishing counts"""
+        previous = [(f_id, acquired[f_id]) for f_id, _ in item[2]]
+
+        for f_id, num_missing in item[2]:
+            acquired[f_id] = max(acquired[f_id], num_missing)
+        for k, amount in extra.items():
+            usage[k] += amount
+
+        return previous
+
+    def remove(extra: Dict[int, int], previous: List[Tuple[int, int]]):
+        """Removes an item added with its `extra` resources and `previous` counts"""
+        for k, amount in extra.items():
+            usage[k] -= amount
+        for f_id, num_acquired in previous:
+            acquired[f_id] = num_acquired
+
+    order = []
+    remaining = list(items)
+
+    while True:
+        users = count_users(remaining)
+        best_item, best_ratio, best_extra = None, None, None
+
+        for item in remaining:
+            if (extra := extend(item)) is None:
+                continue
+
+            shares = dict(item[3])
+            for f_id, num_missing in item[2]:
+                if num_missing > (num_acquired := acquired[f_id]):
+                    discount = math.sqrt(users[f_id])
+
+                    for k, amount in units[f_id]:
+                        shares[k] = (
+                            shares.get(k, 0)
+                            + amount * (num_missing - num_acquired) / discount
+                        )
+
+                    if num_acquired == 0:
+                        for k, amount in blueprints[f_id]:
+                            shares[k] = shares.get(k, 0) + amount / discount
+
+            ratio = (
+                sum(
+                    amount / max(capacity[k] - usage[k], 1)
+                    for k, amount in shares.items()
+                )
+                / item[0]
+            )
+
+            if best_ratio is None or ratio < best_ratio:
+                best_item, best_ratio, best_extra = item, ratio, extra
+
+        if best_item is None:
+            break
+
+        add(best_item, best_extra)
+        order.append(best_item)
+        remaining.remove(best_item)
+
+    best = dict(score=sum(item[0] for item in order), sets=[item[1] for item in order])
+
+    for f_id in acquired:
+        acquired[f_id] = 0
+    usage = [0] * len(capacity)
+
+    items = order + remaining
+
+    relevant = [set() for _ in range(len(items) + 1)]
+    for i in reversed(range(len(items))):
+        relevant[i] = relevant[i + 1] | set(f_id for f_id, _ in items[i][2])
+    relevant = [sorted(furnishings) for furnishings in relevant]
+
+    suffix_weights = [0] * (len(items) + 1)
+    for i in reversed(range(len(items))):
+        suffix_weights[i] = suffix_weights[i + 1] + items[i][0]
+
+    def knapsack_bound(i: int) -> float:
+        """Bounds the weight of items from `i` onward that can still be added
+
+        The cost of each furnishing still needed by several items
+        is split evenly between them, which never exceeds what any selection pays.
+        Resources are combined in units of their remaining budget,
+        which any selection within budget fits in,
+        and the weight is bounded with a fractional knapsack over the combined cost.
+        """
+        scales = [
+            1 / (capacity[k] - usage[k]) if usage[k] < capacity[k] else math.inf
+            for k in range(len(capacity))
+        ]
+        users = count_users(items[i:])
+
+        unit_shares = {}
+        blueprint_shares = {}
+        for f_id, num_users in users.items():
+            unit_shares[f_id] = (
+                sum(amount * scales[k] for k, amount in units[f_id]) / num_users
+            )
+            blueprint_shares[f_id] = (
+                sum(amount * scales[k] for k, amount in blueprints[f_id]) / num_users
+                if acquired[f_id] == 0
+                else 0
+            )
+
+        shares = []
+        for weight, _, row, set_cost in items[i:]:
+            share = sum(amount * scales[k] for k, amount in set_cost)
+
+            for f_id, num_missing in row:
+                if num_missing > (num_acquired := acquired[f_id]):
+                    share += (num_missing - num_acquired) * unit_shares[
+                        f_id
+                    ] + blueprint_shares[f_id]
+
+            if share <= len(capacity):
+                shares.append((share / weight, weight, share))
+
+        shares.sort()
+
+        space = len(capacity)
+        value = 0
+
+        for _, weight, share in shares:
+            if share <= space:
+                space -= share
+                value += weight
+            else:
+                value += weight * space / share
+                break
+
+        return value
+
+    seen = {}
+    chosen = []
+    num_nodes = 0
+
+    def search(i: int, score: float):
+        nonlocal num_nodes
+
+        if score > best["score"]:
+            best.update(score=score, sets=list(chosen))
+
+        if (
+            i == len(items)
+            or num_nodes >= max_nodes
+            or score + suffix_weights[i] <= best["score"]
+        ):
+            return
+
+        num_nodes += 1
+
+        state = (i, tuple(usage), tuple(acquired[f_id] for f_id in relevant[i]))
+        if seen.get(state, -1) >= score:
+            return
+        seen[state] = score
+
+        if score + knapsack_bound(i) <= best["score"]:
+            return
+
+        if (extra := extend(items[i])) is not None:
+            previous = add(items[i], extra)
+            chosen.append(items[i][1])
+
+            search(i + 1, score + items[i][0])
+
+            chosen.pop()
+            remove(extra, previous)
+
+        search(i + 1, score)
+
+    search(0, 0)
+
+    best_acquired, best_usage = total_cost(set(best["sets"]))
+    resources = catalog.materials + ["currency", "mora"]
+
+    return dict(
+        score=best["score"],
+        optimal=num_nodes < max_nodes,
+        sets=[catalog.sets[s_id] for s_id in best["sets"]],
+        set_blueprints=[
+            catalog.sets[s_id]
+            for s_id in best["sets"]
+            if not columns["set_owned"][s_id]
+        ],
+        blueprints=[
+            catalog.furnishings[f_id]
+            for f_id, num_acquired in enumerate(best_acquired)
+            if num_acquired > 0 and len(blueprint_costs[f_id]) > 0
+        ],
+        craft={
+            catalog.furnishings[f_id]: num_acquired
+            for f_id, num_acquired in enumerate(best_acquired)
+            if num_acquired > 0 and catalog.craftable[f_id]
+        },
+        buy={
+            catalog.furnishings[f_id]: num_acquired
+            for f_id, num_acquired in enumerate(best_acquired)
+            if num_acquired > 0 and not catalog.craftable[f_id]
+        },
+        spent={
+            resources[res_id]: amount
+            for res_id, amount in enumerate(best_usage)
+            if amount > 0
+        },
+    )
+
+
+def parse_weights(
+    ctx: click.Context, param: click.Parameter, value: Tuple[str]
+) -> Optional[Dict[str, float]]:
+    """Parses `<set>=<n>` weight options
+
+    Args:
+        ctx (click.Context): command context
+        param (click.Parameter): weight option
+        value (Tuple[str]): option values
+
+    Raises:
+        click.BadParameter: if a value is not a set name and a finite number
+
+    Returns:
+        Optional[Dict[str, float]]: mapping of set names to weight, if any given
+    """
+    if len(value) == 0:
+        return None
+
+    weights = {}
+    for option in value:
+        s_name, _, weight = option.rpartition("=")
+
+        try:
+            weight = float(weight)
+        except ValueError:
+            weight = None
+
+        if len(s_name) == 0 or weight is None or not math.isfinite(weight):
+            raise click.BadParameter(f"'{option}' is not of the form <set>=<n>")
+
+        weights[s_name] = weight
+
+    return weights
+
+
+@click.command(options_metavar="[options]")
+@click.option(
+    "-c",
+    "--currency",
+    type=click.INT,
+    default=0,
+    metavar="<n>",
+    help="Available Realm Currency",
+)
+@click.option(
+    "-m", "--mora", type=click.INT, default=0, metavar="<n>", help="Available mora"
+)
+@click.option(
+    "-w",
+    "--weight",
+    "weights",
+    multiple=True,
+    callback=parse_weights,
+    metavar="<set>=<n>",
+    help="Weight of completing <set>. Can be repeated. Defaults to 1 for each gift set with gifting companions",
+)
+def plan(currency: int, mora: int, weights: Optional[Dict[str, float]]):
+    """Plans sets to complete with owned resources"""
+
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if (inventory := load_inventory()) is None:
+        inventory = create_inventory_schema()
+
+    update_inventory(metadata, inventory)
+
+    for s_name in weights or {}:
+        if s_name not in metadata["sets"]:
+            print(bold(color(f"Could not find set '{s_name}'", "red")))
+            exit(1)
+
+    result = plan_completions(metadata, inventory, currency, mora, weights)
+
+    if len(result["sets"]) == 0:
+        print(bold(color("Cannot complete any set with owned resources!", "red")))
+        return
+
+    print(f"Complete ({result['score']:g}):\n")
+    index = load_index(metadata)
+    print(
+        "\n".join(
+            f"  {'🎁' if index.is_gift_set(s_name) else '🏡'} {s_name}"
+            for s_name in result["sets"]
+        )
+    )
+
+    if len(result["set_blueprints"]) + len(result["blueprints"]) > 0:
+        print("\nBuy blueprints:\n")
+        print(
+            "\n".join(
+                f"  📘 {name}"
+                for name in result["set_blueprints"] + result["blueprints"]
+            )
+        )
+
+    for title, items in [("Craft", result["craft"]), ("Buy", result["buy"])]:
+        if len(items) > 0:
+            print(f"\n{title}:\n")
+            print("\n".join(f"  {n:4d}×  {name}" for name, n in items.items()))
+
+    print("\nSpend:\n")
+    print(
+        "\n".join(
+            f"  {emoji(name)} {amount:6d}×  {name}"
+            for name, amount in result["spent"].items()
+        )
+    )
+
+    if not result["optimal"]:
+        print(italic("\nSearch stopped early; this is the best plan found."))
@@ -1,11 +1,12 @@
 """This module defines functions for querying metadata and inventory"""
 
 
-from functools import reduce
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 
-from .utils import emoji, multiply_values
+from .cost import COST_TYPES, accumulate_costs, furnishing_cost, load_cost_model
+from .models import load_housing
+from .utils import emoji
 
 
 def get_crafting_recipe(materials: dict) -> Optional[List[str]]:
@@ -36,6 +37,36 @@ def get_placing_recipe(furnishings: dict) -> [List[str]]:
     return [f"{amount:4d}×  {name}" for name, amount in furnishings.items()]
 
 
+def get_materials_for_many(metadata: dict, furnishings_maps: List[dict]) -> List[dict]:
+    """Returns materials required to craft each of `furnishings_maps`
+
+    Recipes are read from the housing models,
+    and each map is accumulated into its own counter in a single pass.
+
+    Args:
+        metadata (dict): housing metadata
+        furnishings_maps (List[dict]): mappings of furnishings to count
+
+    Returns:
+        List[dict]: mappings of materials to amount
+    """
+    housing = load_housing(metadata)
+    m_names = [m.name for m in housing.materials]
+    results = []
+
+    for furnishings in furnishings_maps:
+        materials = {}
+
+        for f_name, num_crafted in furnishings.items():
+            for m_id, amount in housing.furnishing(f_name).recipe or ():
+                m_name = m_names[m_id]
+                materials[m_name] = materials.get(m_name, 0) + amount * num_crafted
+
+        results.append(materials)
+
+    return results
+
+
 def get_materials_for_furnishings(metadata: dict, furnishings: dict) -> dict:
     """Returns materials required to craft `furnishings`
 
@@ -46,22 +77,74 @@ def get_materials_for_furnishings(metadata: dict, furnishings: dict) -> dict:
     Returns:
         dict: mapping of materials to amount
     """
-    return reduce(
-        lambda materials, result: {
-            **result,
-            **{
-                m_name: (0 if m_name not in result else result[m_name]) + amount
-                for m_name, amount in materials.items()
-            },
-        },
-        (
-            multiply_values(
-                metadata["furnishings"][f_name].get("materials"), num_crafted
-            )
-            for f_name, num_crafted in furnishings.items()
-        ),
-        {},
-    )
+    return get_materials_for_many(metadata, [furnishings])[0]
+
+
+def get_unit_cost(metadata: dict, inventory: dict, name: str) -> Tuple[str, int, bool]:
+    """Returns type and amount of cost of `name` furnishing or set
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        name (str): furnishing or set name
+
+    Returns:
+        Tuple[str, int, bool]: type of cost, amount and whether it is paid per item required
+    """
+    housing = load_housing(metadata)
+    model = load_cost_model(metadata)
+
+    if (f_id := housing.furnishing_ids.get(name)) is not None:
+        cost_type = COST_TYPES[model.types[f_id]]
+
+        if housing.furnishings[f_id].craftable:
+            blueprint = inventory["furnishings"][name]["blueprint"]
+            return cost_type, sum(furnishing_cost(model, f_id, 0, blueprint)), False
+
+        return cost_type, sum(model.items[f_id]), True
+
+    s_id = housing.set_ids[name]
+
+    return COST_TYPES[model.set_types[s_id]], sum(model.sets[s_id]), False
+
+
+def get_cost_of_many(metadata: dict, inventory: dict, items_maps: List[dict]) -> List[dict]:
+    """Returns cost of each of `items_maps`
+
+    Items are resolved to ids of the cost model,
+    and blueprint ownership is read once per furnishing across all maps.
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        items_maps (List[dict]): mappings of furnishings / sets names to amount required
+
+    Returns:
+        List[dict]: mappings of types of cost to total
+    """
+    housing = load_housing(metadata)
+    model = load_cost_model(metadata)
+    furnishings = inventory["furnishings"]
+
+    blueprint = {}
+    results = []
+
+    for items in items_maps:
+        counts = []
+        set_ids = []
+
+        for name, num_required in items.items():
+            if (f_id := housing.furnishing_ids.get(name)) is not None:
+                if f_id not in blueprint:
+                    blueprint[f_id] = furnishings[name].get("blueprint")
+
+                counts.append((f_id, num_required))
+            else:
+                set_ids.append(housing.set_ids[name])
+
+        results.append(accumulate_costs(model, counts, set_ids, blueprint))
+
+    return results
 
 
 def get_cost_of_items(metadata: dict, inventory: dict, items: dict) -> dict:
@@ -75,34 +158,4 @@ def get_cost_of_items(metadata: dict, inventory: dict, items: dict) -> dict:
     Returns:
         dict: mapping of types of cost to total
     """
-    return reduce(
-        lambda costs, result: {
-            **result,
-            **{
-                cost_type: (0 if cost_type not in result else result[cost_type])
-                + amount
-                for cost_type, amount in costs.items()
-            },
-        },
-        (
-            (
-                {
-                    (
-                        key := "currency" if "currency" in furnishing else "mora"
-                    ): furnishing.get(key, 0)
-                    * (1 if key == "currency" else 1000)
-                    * (
-                        (1 if not inventory["furnishings"][name]["blueprint"] else 0)
-                        if furnishing.get("materials") is not None
-                        else num_required
-                    )
-                }
-            )
-            if (furnishing := metadata["furnishings"].get(name)) is not None
-            else {"currency": hset["currency"]}
-            if "currency" in (hset := metadata["sets"][name])
-            else {"mora": hset.get("mora", 0) * 1000}
-            for name, num_required in items.items()
-        ),
-        {},
-    )
+    return get_cost_of_many(metadata, inventory, [items])[0]
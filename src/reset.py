@@ -4,7 +4,13 @@
 import click
 
 
-from .file import delete_inventory, load_metadata, save_inventory
+from .file import (
+    METADATA_SECTIONS,
+    compute_fingerprint,
+    delete_inventory,
+    load_metadata,
+    save_inventory,
+)
 
 
 def create_metadata_schema():
@@ -39,61 +45,111 @@ def create_inventory_schema():
     return inventory
 
 
-def update_inventory(metadata: dict, inventory: dict):
-    """Updates inventory to match metadata
+def diff_metadata(previous: dict, metadata: dict) -> dict:
+    """Returns names of entries added or changed in `metadata` since `previous`
+
+    Args:
+        previous (dict): earlier housing metadata
+        metadata (dict): current housing metadata
+
+    Returns:
+        dict: mapping of sections to changed names
+    """
+    return {
+        section: [
+            name
+            for name in metadata[section]
+            if (
+                name not in previous[section]
+                if isinstance(metadata[section], list)
+                else previous[section].get(name) != metadata[section][name]
+            )
+        ]
+        for section in METADATA_SECTIONS
+    }
+
+
+def reconcile_inventory(metadata: dict, inventory: dict, names: dict):
+    """Adds entries for `names` from metadata missing in inventory
 
     Args:
         metadata (dict): housing metadata
         inventory (dict): user inventory
+        names (dict): mapping of sections to names to reconcile
     """
-    save = False
-
-    for c_name in metadata["companions"]:
-        if (save := c_name not in (companions := inventory["companions"])) :
+    companions = inventory["companions"]
+    for c_name in names["companions"]:
+        if c_name not in companions:
             companions[c_name] = False
 
-    for m_name in metadata["materials"]:
-        if (save := m_name not in (materials := inventory["materials"])) :
+    materials = inventory["materials"]
+    for m_name in names["materials"]:
+        if m_name not in materials:
             materials[m_name] = 0
 
-    for f_name, f_md in metadata["furnishings"].items():
-        furnishings = inventory["furnishings"]
-        if (
-            save := (
-                f_name not in furnishings
-                or (
-                    furnishings[f_name].get("blueprint") is None
-                    and f_md.get("materials") is not None
-                )
-            )
-        ) :
+    furnishings = inventory["furnishings"]
+    for f_name in names["furnishings"]:
+        f_md = metadata["furnishings"][f_name]
+        if f_name not in furnishings or (
+            furnishings[f_name].get("blueprint") is None
+            and f_md.get("materials") is not None
+        ):
             furnishings.setdefault(f_name, {})
             furnishings[f_name].setdefault("owned", 0)
 
             if f_md.get("materials") is not None:
                 furnishings[f_name].update(dict(blueprint=False, crafted=False))
 
-    for s_name, s_md in metadata["sets"].items():
-        sets = inventory["sets"]
-        if (
-            save := (
-                s_name not in sets
-                or (
-                    sets[s_name].get("companions") is None
-                    and s_md.get("companions") is not None
-                )
-            )
-        ) :
+    sets = inventory["sets"]
+    for s_name in names["sets"]:
+        s_md = metadata["sets"][s_name]
+        if s_name not in sets or (
+            sets[s_name].get("companions") is None
+            and s_md.get("companions") is not None
+        ):
             sets.setdefault(s_name, {})
             sets[s_name].setdefault("owned", False)
 
-            if (set_companions := s_md.get("companions")) is not None:
-                sets[s_name].setdefault("companions", {})
+        if (set_companions := s_md.get("companions")) is not None:
+            set_inventory = sets[s_name].setdefault("companions", {})
+
+            for c_name in set_companions:
+                if c_name not in set_inventory:
+                    set_inventory[c_name] = False
+
+
+def update_inventory(metadata: dict, inventory: dict, persist: bool = True):
+    """Updates inventory to match metadata
+
+    Reconciliation is skipped if the inventory was last updated
+    for the same metadata fingerprint,
+    and limited to the entries changed by the latest download
+    if it was updated for the metadata before that download.
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        persist (bool, optional): save inventory if updated. Defaults to True.
+    """
+    if (fingerprint := metadata.get("fingerprint")) is None:
+        fingerprint = compute_fingerprint(metadata)
+
+    if inventory.get("fingerprint") == fingerprint:
+        return
+
+    if (
+        (changes := metadata.get("changes")) is not None
+        and changes["base"] is not None
+        and inventory.get("fingerprint") == changes["base"]
+    ):
+        names = changes
+    else:
+        names = metadata
 
-                for c_name in set_companions:
-                    sets[s_name]["companions"].setdefault(c_name, False)
+    reconcile_inventory(metadata, inventory, names)
+    inventory["fingerprint"] = fingerprint
 
-    if save:
+    if persist:
         save_inventory(inventory)
 
 
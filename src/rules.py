@@ -0,0 +1,150 @@
+"""This module defines the rules of inventory changes, shared by managing and updating inventory"""
+
+
+from typing import List, Optional
+
+
+from .index import MetadataIndex
+
+
+def set_companion(index: MetadataIndex, inventory: dict, c_name: str, owned: bool):
+    """Sets whether `c_name` companion is owned, clearing its gifts if not
+
+    Args:
+        index (MetadataIndex): metadata index
+        inventory (dict): user inventory
+        c_name (str): companion name
+        owned (bool): whether companion is owned
+    """
+    inventory["companions"][c_name] = owned
+
+    if not owned:
+        for s_name in index.sets_of_companion(c_name):
+            inventory["sets"][s_name]["companions"][c_name] = False
+
+
+def consume_materials(
+    metadata: dict, inventory: dict, f_name: str, num_crafted: int
+) -> bool:
+    """Consumes materials from `inventory` to craft `num_crafted` of `f_name` furnishing
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        f_name (str): furnishing name
+        num_crafted (int): number of furnishings crafted
+
+    Returns:
+        bool: whether there were enough materials
+    """
+    materials = inventory["materials"]
+    recipe = metadata["furnishings"][f_name].get("materials") or {}
+
+    if not all(
+        materials[m_name] >= amount * num_crafted for m_name, amount in recipe.items()
+    ):
+        return False
+
+    for m_name, amount in recipe.items():
+        materials[m_name] -= amount * num_crafted
+
+    return True
+
+
+def check_blueprint(inventory: dict, f_name: str, value: bool) -> Optional[str]:
+    """Checks whether blueprint of `f_name` furnishing can be set to `value`
+
+    Args:
+        inventory (dict): user inventory
+        f_name (str): furnishing name
+        value (bool): whether blueprint is owned
+
+    Returns:
+        Optional[str]: error message, if any
+    """
+    if not value and inventory["furnishings"][f_name]["crafted"]:
+        return f"Cannot unset blueprint of '{f_name}' if already crafted"
+
+    return None
+
+
+def check_crafted(inventory: dict, f_name: str, value: bool) -> Optional[str]:
+    """Checks whether `f_name` furnishing can be set as crafted to `value`
+
+    Args:
+        inventory (dict): user inventory
+        f_name (str): furnishing name
+        value (bool): whether furnishing was crafted
+
+    Returns:
+        Optional[str]: error message, if any
+    """
+    if value and not inventory["furnishings"][f_name]["blueprint"]:
+        return f"Cannot set '{f_name}' as crafted without its blueprint"
+
+    return None
+
+
+def check_set_owned(inventory: dict, s_name: str, value: bool) -> Optional[str]:
+    """Checks whether blueprint of `s_name` set can be set to `value`
+
+    Args:
+        inventory (dict): user inventory
+        s_name (str): set name
+        value (bool): whether blueprint is owned
+
+    Returns:
+        Optional[str]: error message, if any
+    """
+    if not value and any(
+        gifted and inventory["companions"][c_name]
+        for c_name, gifted in inventory["sets"][s_name].get("companions", {}).items()
+    ):
+        return f"Cannot unset blueprint of '{s_name}' if gifts already received"
+
+    return None
+
+
+def check_gift(
+    metadata: dict, inventory: dict, s_name: str, c_name: str, value: bool
+) -> Optional[str]:
+    """Checks whether gift of `c_name` companion for `s_name` set can be set to `value`
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        s_name (str): set name
+        c_name (str): companion name
+        value (bool): whether gift was received
+
+    Returns:
+        Optional[str]: error message, if any
+    """
+    if not inventory["sets"][s_name]["owned"] or not inventory["companions"][c_name]:
+        return f"Set '{s_name}' and companion '{c_name}' must be owned for gifts"
+
+    if value and not all(
+        num_required <= inventory["furnishings"][f_name]["owned"]
+        for f_name, num_required in metadata["sets"][s_name]["furnishings"].items()
+    ):
+        return f"Set '{s_name}' must have all its furnishings for gifts"
+
+    return None
+
+
+def gifting_companions(metadata: dict, inventory: dict, s_name: str) -> List[str]:
+    """Returns companions able to gift for `s_name` set
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        s_name (str): set name
+
+    Returns:
+        List[str]: companion names
+    """
+    return [
+        c_name
+        for c_name in sorted(inventory["sets"][s_name].get("companions", {}))
+        if check_gift(metadata, inventory, s_name, c_name, True) is None
+    ]
@@ -0,0 +1,357 @@
+"""This module defines functions for scheduling the placement of gift sets"""
+
+
+from typing import Dict, List, Tuple
+
+
+import click
+
+
+from .engine import compile_catalog, compile_inventory
+from .file import load_inventory, load_metadata
+from .reset import create_inventory_schema, update_inventory
+from .utils import bold, color, italic
+
+
+def order_gift_sets(
+    rows: Dict[int, List[Tuple[int, int]]], set_ids: List[int], gifts: Dict[int, list]
+) -> List[Tuple[int, Dict[int, int]]]:
+    """Orders `set_ids` so that each step needs the fewest additional furnishings
+
+    Args:
+        rows (Dict[int, List[Tuple[int, int]]]): mapping of set ids to missing furnishings
+        set_ids (List[int]): sets to place
+        gifts (Dict[int, list]): mapping of set ids to companions gifting
+
+    Returns:
+        List[Tuple[int, Dict[int, int]]]: pairs of set ids and shortfall of furnishings
+    """
+    acquired = {}
+    remaining = list(set_ids)
+    steps = []
+
+    def shortfall(s_id):
+        return {
+            f_id: num_missing - acquired.get(f_id, 0)
+            for f_id, num_missing in rows[s_id]
+            if num_missing > acquired.get(f_id, 0)
+        }
+
+    while len(remaining) > 0:
+        s_id = min(
+            remaining,
+            key=lambda s: (sum(shortfall(s).values()), -len(gifts[s]), s),
+        )
+        remaining.remove(s_id)
+
+        steps.append((s_id, (missing := shortfall(s_id))))
+
+        for f_id, num_extra in missing.items():
+            acquired[f_id] = acquired.get(f_id, 0) + num_extra
+
+    return steps
+
+
+def schedule_gift_sets(
+    metadata: dict, inventory: dict, every_set: bool = False, max_nodes: int = 2000
+) -> dict:
+    """Schedules gift sets to place for every owned companion to gift
+
+    Sets are placed one at a time, so furnishings are reused between them
+    and a selection of sets needs the largest missing count of each furnishing.
+    The selection with the fewest furnishings to craft or buy,
+    which still includes a gift set of every companion yet to gift,
+    is found with a depth first search that branches on the companion with the fewest sets,
+    separately for each group of sets sharing companions or missing furnishings.
+    Each search starts from a greedy selection, and branches are pruned
+    by a lower bound on what the uncovered companions add.
+    Each node costs time proportional to the size of its group,
+    so a search settles for the best selection found after `max_nodes` nodes,
+    which keeps schedules of catalogs with up to hundreds of gift sets under a second.
+    The selected sets are then ordered so that each step needs the fewest additional furnishings.
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        every_set (bool, optional): place every gift set with gifting companions. Defaults to False.
+        max_nodes (int, optional): number of search nodes per group before settling for the best selection found. Defaults to 2000.
+
+    Returns:
+        dict: schedule
+    """
+    catalog = compile_catalog(metadata)
+    columns = compile_inventory(catalog, inventory)
+    owned = columns["owned"]
+
+    gifts = {}
+    for s_id, s_name in enumerate(catalog.sets):
+        if columns["gifting"][s_id]:
+            gifts[s_id] = sorted(
+                c_name
+                for c_name, gifted in inventory["sets"][s_name]["companions"].items()
+                if inventory["companions"][c_name] and not gifted
+            )
+
+    rows = {
+        s_id: [
+            (f_id, num_required - owned[f_id])
+            for f_id, num_required in catalog.requirements[s_id]
+            if owned[f_id] < num_required
+        ]
+        for s_id in gifts
+    }
+
+    needs = {}
+    for s_id, c_names in gifts.items():
+        for c_name in c_names:
+            needs.setdefault(c_name, []).append(s_id)
+
+    # Sets sharing a companion or a missing furnishing are scheduled together
+    parents = {s_id: s_id for s_id in gifts}
+
+    def find(s_id: int) -> int:
+        while parents[s_id] != s_id:
+            parents[s_id] = parents[parents[s_id]]
+            s_id = parents[s_id]
+        return s_id
+
+    users = {}
+    for s_id in gifts:
+        for f_id, _ in rows[s_id]:
+            users.setdefault(f_id, []).append(s_id)
+
+    for s_ids in list(needs.values()) + list(users.values()):
+        for s_id in s_ids[1:]:
+            parents[find(s_id)] = find(s_ids[0])
+
+    components = {}
+    for c_name, s_ids in needs.items():
+        components.setdefault(find(s_ids[0]), []).append(c_name)
+
+    acquired = [0] * len(catalog.furnishings)
+
+    def increment(s_id: int) -> int:
+        return sum(
+            num_missing - acquired[f_id]
+            for f_id, num_missing in rows[s_id]
+            if num_missing > acquired[f_id]
+        )
+
+    def lower_bound(uncovered: frozenset) -> float:
+        """Bounds what covering `uncovered` companions adds to the current cost
+
+        Each missing furnishing is split evenly between the candidate sets using it,
+        and each set between the uncovered companions it gifts for,
+        so no selection covers them for less than the cheapest shares.
+        Companions whose sets share no missing furnishing add at least their cheapest set,
+        and the larger of both bounds is returned.
+        """
+        candidates = set(s_id for c_name in uncovered for s_id in needs[c_name])
+
+        num_users = {}
+        for s_id in candidates:
+            for f_id, num_missing in rows[s_id]:
+                if num_missing > acquired[f_id]:
+                    num_users[f_id] = num_users.get(f_id, 0) + 1
+
+        shares = {
+            s_id: sum(
+                (num_missing - acquired[f_id]) / num_users[f_id]
+                for f_id, num_missing in rows[s_id]
+                if num_missing > acquired[f_id]
+            )
+            / len(uncovered.intersection(gifts[s_id]))
+            for s_id in candidates
+        }
+
+        fractional = sum(
+            min(shares[s_id] for s_id in needs[c_name]) for c_name in uncovered
+        )
+
+        disjoint = 0
+        taken = set()
+
+        for cheapest, c_name in sorted(
+            (
+                (min(increment(s_id) for s_id in needs[c_name]), c_name)
+                for c_name in uncovered
+            ),
+            reverse=True,
+        ):
+            furnishings = set(
+                f_id
+                for s_id in needs[c_name]
+                for f_id, num_missing in rows[s_id]
+                if num_missing > acquired[f_id]
+            )
+
+            if taken.isdisjoint(furnishings):
+                disjoint += cheapest
+                taken |= furnishings
+
+        return max(fractional, disjoint)
+
+    def greedy_cover(c_names: List[str]) -> Tuple[int, List[int]]:
+        """Covers `c_names` companions by adding the set with fewest furnishings per companion"""
+        uncovered = set(c_names)
+        previous = list(acquired)
+        cost = 0
+        s_ids = []
+
+        while len(uncovered) > 0:
+            s_id = min(
+                set(s_id for c_name in uncovered for s_id in needs[c_name]),
+                key=lambda s: (increment(s) / len(uncovered.intersection(gifts[s])), s),
+            )
+
+            cost += increment(s_id)
+            for f_id, num_missing in rows[s_id]:
+                acquired[f_id] = max(acquired[f_id], num_missing)
+            uncovered.difference_update(gifts[s_id])
+            s_ids.append(s_id)
+
+        acquired[:] = previous
+
+        return cost, s_ids
+
+    best = dict(cost=None, sets=[])
+    chosen = []
+    seen = set()
+    relevant = []
+    num_nodes = 0
+    optimal = True
+
+    def search(uncovered: frozenset, cost: int):
+        nonlocal num_nodes
+
+        if best["cost"] is not None and cost >= best["cost"]:
+            return
+
+        if len(uncovered) == 0:
+            best.update(cost=cost, sets=list(chosen))
+            return
+
+        # Sets adding no furnishings are always placed
+        free = [
+            s_id
+            for c_name in uncovered
+            for s_id in needs[c_name]
+            if increment(s_id) == 0
+        ]
+        if len(free) > 0:
+            chosen.extend(free := list(dict.fromkeys(free)))
+            search(uncovered.difference(*(gifts[s_id] for s_id in free)), cost)
+            del chosen[-len(free) :]
+            return
+
+        key = (uncovered, tuple(acquired[f_id] for f_id in relevant))
+        if num_nodes >= max_nodes or key in seen:
+            return
+
+        num_nodes += 1
+        seen.add(key)
+
+        if best["cost"] is not None and cost + lower_bound(uncovered) >= best["cost"]:
+            return
+
+        c_name = min(uncovered, key=lambda c: (len(needs[c]), c))
+
+        for s_id in sorted(needs[c_name], key=increment):
+            num_extra = increment(s_id)
+            previous = [(f_id, acquired[f_id]) for f_id, _ in rows[s_id]]
+
+            for f_id, num_missing in rows[s_id]:
+                acquired[f_id] = max(acquired[f_id], num_missing)
+            chosen.append(s_id)
+
+            search(uncovered - frozenset(gifts[s_id]), cost + num_extra)
+
+            chosen.pop()
+            for f_id, num_acquired in previous:
+                acquired[f_id] = num_acquired
+
+    selection = []
+
+    if every_set:
+        selection = list(gifts)
+    else:
+        for c_names in components.values():
+            cost, s_ids = greedy_cover(c_names)
+            best.update(cost=cost, sets=s_ids)
+            seen.clear()
+            relevant = sorted(
+                set(
+                    f_id
+                    for c_name in c_names
+                    for s_id in needs[c_name]
+                    for f_id, _ in rows[s_id]
+                )
+            )
+            num_nodes = 0
+
+            search(frozenset(c_names), 0)
+
+            selection += best["sets"]
+            optimal = optimal and num_nodes < max_nodes
+
+    steps = order_gift_sets(rows, selection, gifts)
+
+    return dict(
+        optimal=optimal,
+        total=sum(sum(missing.values()) for _, missing in steps),
+        steps=[
+            dict(
+                set=catalog.sets[s_id],
+                blueprint=columns["set_owned"][s_id],
+                companions=gifts[s_id],
+                shortfall={
+                    catalog.furnishings[f_id]: num_extra
+                    for f_id, num_extra in missing.items()
+                },
+            )
+            for s_id, missing in steps
+        ],
+    )
+
+
+@click.command(options_metavar="[options]")
+@click.option(
+    "-a",
+    "--all",
+    "every_set",
+    is_flag=True,
+    help="Place every gift set with gifting companions",
+)
+def schedule(every_set: bool):
+    """Schedules gift sets to place for gifts"""
+
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if (inventory := load_inventory()) is None:
+        inventory = create_inventory_schema()
+
+    update_inventory(metadata, inventory)
+
+    result = schedule_gift_sets(metadata, inventory, every_set)
+
+    if len(result["steps"]) == 0:
+        print(bold(color("No companions left to gift!", "green")))
+        return
+
+    for i, step in enumerate(result["steps"]):
+        shortfall = "\n".join(
+            f"     {n:4d}×  {f_name}" for f_name, n in step["shortfall"].items()
+        )
+        shortfall = f"\n{shortfall}" if len(shortfall) > 0 else ""
+
+        print(
+            f"{i + 1:3d}. 🎁{'🟢' if step['blueprint'] else '🔴'}  {step['set']}"
+            f"  ({', '.join(step['companions'])}){shortfall}\n"
+        )
+
+    print(bold(f"{result['total']} furnishings to craft or buy"))
+
+    if not result["optimal"]:
+        print(italic("Search stopped early; this is the best schedule found."))
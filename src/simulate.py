@@ -0,0 +1,346 @@
+"""This module defines functions for simulating hypothetical inventories"""
+
+
+import copy
+import json
+import multiprocessing
+from typing import Iterable, Iterator, Optional, TextIO
+
+
+import click
+
+
+from .analyze import MILESTONES
+from .engine import IncrementalAnalysis, compile_catalog
+from .file import load_inventory, load_metadata
+from .reset import create_inventory_schema, update_inventory
+from .utils import bold, color
+from .validate import is_count, is_flag
+
+
+def invert_delta(inventory: dict, delta: dict) -> dict:
+    """Creates the delta which restores `inventory` after applying `delta`
+
+    Args:
+        inventory (dict): user inventory, before `delta` is applied
+        delta (dict): partial inventory of changed values
+
+    Returns:
+        dict: partial inventory of previous values
+    """
+    inverse = {}
+
+    for section in ["companions", "materials"]:
+        if section in delta:
+            inverse[section] = {
+                name: inventory[section][name] for name in delta[section]
+            }
+
+    if "furnishings" in delta:
+        inverse["furnishings"] = {
+            f_name: {key: inventory["furnishings"][f_name].get(key) for key in fields}
+            for f_name, fields in delta["furnishings"].items()
+        }
+
+    if "sets" in delta:
+        inverse["sets"] = {}
+
+        for s_name, fields in delta["sets"].items():
+            hset = inventory["sets"][s_name]
+            inverse["sets"][s_name] = {
+                key: (
+                    {c_name: hset["companions"][c_name] for c_name in value}
+                    if key == "companions"
+                    else hset.get(key)
+                )
+                for key, value in fields.items()
+            }
+
+    return inverse
+
+
+def check_fields(fields, checks: dict, subject: str) -> Optional[str]:
+    """Checks that `fields` of `subject` are among `checks` and pass them
+
+    Args:
+        fields: partial inventory entry of changed values
+        checks (dict): mapping of field names to value checks and their descriptions
+        subject (str): entry description
+
+    Returns:
+        Optional[str]: error message, if any
+    """
+    if not isinstance(fields, dict):
+        return f"Changes to {subject} must be an object"
+
+    for key, value in fields.items():
+        if key not in checks:
+            return f"Unknown field '{key}' for {subject}"
+
+        check, description = checks[key]
+        if not check(value):
+            return f"Field '{key}' of {subject} must be {description}"
+
+    return None
+
+
+def check_delta(inventory: dict, delta: dict) -> Optional[str]:
+    """Checks that `delta` only changes entries of `inventory` with values of their type
+
+    Args:
+        inventory (dict): user inventory
+        delta (dict): partial inventory of changed values
+
+    Returns:
+        Optional[str]: error message, if any
+    """
+    if not isinstance(delta, dict):
+        return "Delta must be an object"
+
+    for section, entries in delta.items():
+        if section not in ["companions", "materials", "furnishings", "sets"]:
+            return f"Unknown section '{section}'"
+
+        if not isinstance(entries, dict):
+            return f"Section '{section}' must be an object"
+
+        for name, value in entries.items():
+            if name not in inventory[section]:
+                return f"Could not find {section[:-1]} '{name}'"
+
+            subject = f"{section[:-1]} '{name}'"
+
+            if section == "companions" and not is_flag(value):
+                return f"Value of {subject} must be true or false"
+
+            if section == "materials" and not is_count(value):
+                return f"Value of {subject} must be a count"
+
+            if section == "furnishings":
+                checks = dict(owned=(is_count, "a count"))
+
+                if "blueprint" in inventory["furnishings"][name]:
+                    checks.update(
+                        blueprint=(is_flag, "true or false"),
+                        crafted=(is_flag, "true or false"),
+                    )
+
+                if (message := check_fields(value, checks, subject)) is not None:
+                    return message
+
+            if section == "sets":
+                set_companions = inventory["sets"][name].get("companions", {})
+                checks = dict(
+                    owned=(is_flag, "true or false"),
+                    companions=(
+                        lambda x: isinstance(x, dict)
+                        and all(
+                            c_name in set_companions and is_flag(gifted)
+                            for c_name, gifted in x.items()
+                        ),
+                        "an object of its companions to true or false",
+                    ),
+                )
+
+                if (message := check_fields(value, checks, subject)) is not None:
+                    return message
+
+    return None
+
+
+def evaluate_scenario(simulation: IncrementalAnalysis, scenario: dict) -> dict:
+    """Evaluates milestones of `scenario` and restores the simulated inventory
+
+    Args:
+        simulation (IncrementalAnalysis): analysis of the base inventory
+        scenario (dict): name, inventory delta and optional currency and mora budget
+
+    Returns:
+        dict: milestones met by the scenario
+    """
+    if "error" in scenario:
+        return dict(name=scenario.get("name"), error=scenario["error"])
+
+    inventory = simulation.inventory
+    delta = scenario.get("delta", {})
+
+    if (message := check_delta(inventory, delta)) is not None:
+        return dict(name=scenario.get("name"), error=message)
+
+    if not all(is_count(scenario.get(key, 0)) for key in ["currency", "mora"]):
+        return dict(name=scenario.get("name"), error="Budget must be counts")
+
+    inverse = invert_delta(inventory, delta)
+    simulation.apply(delta)
+
+    results = simulation.results()
+    materials = inventory["materials"]
+    budget = dict(currency=scenario.get("currency", 0), mora=scenario.get("mora", 0))
+
+    result = dict(
+        name=scenario.get("name"),
+        materials=[
+            dict(
+                milestone=milestone.strip(),
+                met=all(
+                    amount <= materials[m_name] for m_name, amount in needed.items()
+                ),
+                shortfall={
+                    m_name: amount - materials[m_name]
+                    for m_name, amount in needed.items()
+                    if amount > materials[m_name]
+                },
+            )
+            for milestone, needed in zip(
+                MILESTONES["materials"]["milestones"], results["materials"]
+            )
+        ],
+        currency=[
+            dict(
+                milestone=milestone.strip(),
+                met=all(amount <= budget[key] for key, amount in cost.items()),
+                cost=cost,
+            )
+            for milestone, cost in zip(
+                MILESTONES["currency"]["milestones"], results["currency"]
+            )
+        ],
+        sets=[
+            s_name for s_name in inventory["sets"] if s_name not in results["sets"]
+        ],
+    )
+
+    simulation.apply(inverse)
+
+    return result
+
+
+SIMULATION: Optional[IncrementalAnalysis] = None
+"""Analysis of the base inventory of a worker process"""
+
+
+def start_worker(metadata: dict, inventory: dict):
+    """Analyses the base inventory in a worker process
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): base inventory
+    """
+    global SIMULATION
+
+    SIMULATION = IncrementalAnalysis(compile_catalog(metadata), inventory)
+
+
+def evaluate_in_worker(scenario: dict) -> dict:
+    """Evaluates `scenario` against the base inventory of the worker process
+
+    Args:
+        scenario (dict): name, inventory delta and optional currency and mora budget
+
+    Returns:
+        dict: milestones met by the scenario
+    """
+    return evaluate_scenario(SIMULATION, scenario)
+
+
+def simulate_scenarios(
+    metadata: dict, inventory: dict, scenarios: Iterable[dict], processes: int = 1
+) -> Iterator[dict]:
+    """Yields milestones met by each of `scenarios` applied to `inventory`
+
+    Every scenario is a delta applied to the same analysis of `inventory`,
+    which is updated incrementally and then restored,
+    so `inventory` is never modified.
+    With several `processes`, each worker keeps its own analysis
+    and results are yielded in the order of `scenarios`.
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): base inventory
+        scenarios (Iterable[dict]): names, inventory deltas and optional currency and mora budgets
+        processes (int, optional): number of worker processes. Defaults to 1.
+
+    Yields:
+        Iterator[dict]: milestones met by each scenario
+    """
+    if processes <= 1:
+        simulation = IncrementalAnalysis(
+            compile_catalog(metadata), copy.deepcopy(inventory)
+        )
+
+        for scenario in scenarios:
+            yield evaluate_scenario(simulation, scenario)
+
+        return
+
+    with multiprocessing.Pool(
+        processes, initializer=start_worker, initargs=(dict(metadata), inventory)
+    ) as pool:
+        yield from pool.imap(evaluate_in_worker, scenarios, chunksize=16)
+
+
+def read_scenarios(file_pointer: TextIO) -> Iterator[dict]:
+    """Yields scenarios from lines of JSON one at a time
+
+    Scenarios without a name are named after their line number.
+    Lines that are not JSON objects are yielded as scenarios with an error,
+    so that the scenarios after them are still evaluated.
+
+    Args:
+        file_pointer (TextIO): scenarios file
+
+    Yields:
+        Iterator[dict]: scenarios
+    """
+    for i, line in enumerate(file_pointer):
+        if len(line.strip()) > 0:
+            try:
+                scenario = json.loads(line)
+            except json.JSONDecodeError as error:
+                yield dict(name=str(i + 1), error=f"Invalid scenario: {error}")
+                continue
+
+            if not isinstance(scenario, dict):
+                yield dict(name=str(i + 1), error="Scenario must be an object")
+                continue
+
+            scenario.setdefault("name", str(i + 1))
+
+            yield scenario
+
+
+@click.command(options_metavar="[options]")
+@click.argument("scenarios", type=click.File("r"), metavar="<scenarios>")
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    metavar="<path>",
+    help="Write results to <path>. Defaults to standard output",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    metavar="<n>",
+    help="Evaluate scenarios in <n> processes",
+)
+def simulate(scenarios: TextIO, output: TextIO, jobs: int):
+    """Simulates milestones met by inventory changes"""
+
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if (inventory := load_inventory()) is None:
+        inventory = create_inventory_schema()
+
+    update_inventory(metadata, inventory)
+
+    for result in simulate_scenarios(
+        metadata, inventory, read_scenarios(scenarios), jobs
+    ):
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
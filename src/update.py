@@ -0,0 +1,347 @@
+"""This module defines functions for updating inventory from a file of changes"""
+
+
+import copy
+import csv
+import json
+import os
+from typing import Any, Iterator, List, Optional, TextIO, Tuple, Union
+
+
+import click
+
+
+from .file import flatten_inventory, load_inventory, load_metadata, save_inventory
+from .index import MetadataIndex, load_index
+from .reset import create_inventory_schema, update_inventory
+from .rules import (
+    check_blueprint,
+    check_crafted,
+    check_gift,
+    check_set_owned,
+    consume_materials,
+    set_companion,
+)
+from .utils import bold, color, italic
+from .validate import is_count, is_flag
+
+
+CHANGE_FIELDS: List[str] = ["section", "name", "field", "value"]
+"""Fields of changes"""
+
+
+def parse_value(text: str) -> Union[int, bool, str]:
+    """Parses value of a change read from text
+
+    Args:
+        text (str): subject text
+
+    Returns:
+        Union[int, bool, str]: flag, count, or signed text for a relative count
+    """
+    text = text.strip()
+
+    if text.lower() in ["true", "false"]:
+        return text.lower() == "true"
+
+    if text.isdigit():
+        return int(text)
+
+    return text
+
+
+def read_changes(file_pointer: TextIO, input_format: str) -> Iterator[dict]:
+    """Yields changes read from `file_pointer`
+
+    Args:
+        file_pointer (TextIO): changes file
+        input_format (str): one of `json`, `csv` or `ndjson`
+
+    Yields:
+        Iterator[dict]: mappings of change fields to values
+    """
+    if input_format == "csv":
+        for row in csv.DictReader(file_pointer):
+            yield {
+                key: parse_value(value) if key == "value" else value
+                for key, value in row.items()
+                if key in CHANGE_FIELDS and value is not None
+            }
+    elif input_format == "json":
+        yield from json.load(file_pointer)
+    else:
+        for line in file_pointer:
+            if len(line.strip()) > 0:
+                yield json.loads(line)
+
+
+def resolve_count(old: int, value: Any) -> Optional[int]:
+    """Resolves `value` of a change to a count
+
+    Args:
+        old (int): current count
+        value (Any): new count, or signed text such as `+12` or `-3` to add to it
+
+    Returns:
+        Optional[int]: new count, or `None` if invalid
+    """
+    if isinstance(value, str) and value[:1] in ["+", "-"] and value[1:].isdigit():
+        value = old + int(value)
+
+    return value if is_count(value) else None
+
+
+def apply_change(
+    metadata: dict,
+    index: MetadataIndex,
+    inventory: dict,
+    change: dict,
+    consume: bool = False,
+) -> Optional[str]:
+    """Applies `change` to `inventory`, following the same rules as managing it
+
+    Args:
+        metadata (dict): housing metadata
+        index (MetadataIndex): metadata index
+        inventory (dict): user inventory
+        change (dict): section, name, optional field and value
+        consume (bool, optional): consume materials for crafted furnishings. Defaults to False.
+
+    Returns:
+        Optional[str]: error message, if any
+    """
+    section = change.get("section")
+    name = change.get("name")
+    field = change.get("field") or None
+    value = change.get("value")
+
+    if section not in ["companions", "materials", "furnishings", "sets", "gifts"]:
+        return f"Unknown section '{section}'"
+
+    entries = inventory["sets" if section == "gifts" else section]
+    kind = "set" if section == "gifts" else section[:-1]
+
+    if not isinstance(name, str) or name not in entries:
+        return f"Could not find {kind} '{name}'"
+
+    if section == "companions":
+        if not is_flag(value):
+            return f"Invalid value for companion '{name}'"
+
+        set_companion(index, inventory, name, value)
+
+    elif section == "materials":
+        if (amount := resolve_count(entries[name], value)) is None:
+            return f"Invalid amount for material '{name}'"
+
+        entries[name] = amount
+
+    elif section == "furnishings":
+        furnishing = entries[name]
+        blueprint = furnishing.get("blueprint")
+
+        if field in [None, "owned"]:
+            if (amount := resolve_count(furnishing["owned"], value)) is None:
+                return f"Invalid amount for furnishing '{name}'"
+
+            num_crafted = amount - furnishing["owned"]
+
+            if consume and blueprint and num_crafted > 0:
+                if not consume_materials(metadata, inventory, name, num_crafted):
+                    return f"Not enough materials to craft {num_crafted} '{name}'"
+
+                furnishing["crafted"] = True
+
+            furnishing["owned"] = amount
+
+        elif field in ["blueprint", "crafted"]:
+            if blueprint is None:
+                return f"Furnishing '{name}' has no blueprint"
+
+            if not is_flag(value):
+                return f"Invalid {field} for furnishing '{name}'"
+
+            if field == "blueprint" and (
+                message := check_blueprint(inventory, name, value)
+            ):
+                return message
+
+            if field == "crafted" and value and not furnishing["crafted"]:
+                if message := check_crafted(inventory, name, value):
+                    return message
+
+                if consume and not consume_materials(metadata, inventory, name, 1):
+                    return f"Not enough materials to craft '{name}'"
+
+            furnishing[field] = value
+
+        else:
+            return f"Unknown field '{field}' for furnishing '{name}'"
+
+    elif section == "sets":
+        hset = entries[name]
+
+        if field not in [None, "owned"]:
+            return f"Unknown field '{field}' for set '{name}'"
+
+        if not is_flag(value):
+            return f"Invalid value for set '{name}'"
+
+        if message := check_set_owned(inventory, name, value):
+            return message
+
+        hset["owned"] = value
+
+    else:
+        hset = entries[name]
+
+        if not isinstance(field, str) or field not in hset.get("companions", {}):
+            return f"Companion '{field}' does not gift for set '{name}'"
+
+        if not is_flag(value):
+            return f"Invalid gift for set '{name}'"
+
+        if message := check_gift(metadata, inventory, name, field, value):
+            return message
+
+        hset["companions"][field] = value
+
+    return None
+
+
+def apply_changes(
+    metadata: dict, inventory: dict, changes: List[dict], consume: bool = False
+) -> List[Tuple[int, str]]:
+    """Applies `changes` to `inventory` in order
+
+    Every change is checked, so that all errors are reported at once.
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+        changes (List[dict]): sections, names, optional fields and values
+        consume (bool, optional): consume materials for crafted furnishings. Defaults to False.
+
+    Returns:
+        List[Tuple[int, str]]: pairs of change numbers and error messages
+    """
+    index = load_index(metadata)
+    errors = []
+
+    for i, change in enumerate(changes):
+        message = (
+            apply_change(metadata, index, inventory, change, consume)
+            if isinstance(change, dict)
+            else "Invalid change"
+        )
+
+        if message is not None:
+            errors.append((i + 1, message))
+
+    return errors
+
+
+def diff_inventories(
+    before: dict, after: dict
+) -> List[Tuple[Tuple[str, ...], Any, Any]]:
+    """Returns values changed between `before` and `after`
+
+    Args:
+        before (dict): user inventory
+        after (dict): updated user inventory
+
+    Returns:
+        List[Tuple[Tuple[str, ...], Any, Any]]: paths, old and new values
+    """
+    old = flatten_inventory(before)
+    new = flatten_inventory(after)
+
+    return [
+        (path, old.get(path), value)
+        for path, value in new.items()
+        if old.get(path) != value
+    ]
+
+
+def guess_format(path: str) -> str:
+    """Guesses format of changes file from its extension
+
+    Args:
+        path (str): changes file
+
+    Returns:
+        str: one of `json`, `csv` or `ndjson`
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        return "csv"
+
+    if extension in [".ndjson", ".jsonl"]:
+        return "ndjson"
+
+    return "json"
+
+
+@click.command(options_metavar="[options]")
+@click.argument("changes", type=click.File("r"), metavar="<changes>")
+@click.option(
+    "-f",
+    "--format",
+    "input_format",
+    type=click.Choice(["json", "csv", "ndjson"]),
+    help="Read changes in <format>. Defaults to the file extension",
+)
+@click.option(
+    "-c",
+    "--consume",
+    is_flag=True,
+    help="Consume materials for furnishings crafted with owned blueprints",
+)
+@click.option(
+    "-n", "--dry-run", is_flag=True, help="Show changes without saving them"
+)
+def update(changes: TextIO, input_format: Optional[str], consume: bool, dry_run: bool):
+    """Updates inventory from a file of changes"""
+
+    if (metadata := load_metadata()) is None:
+        print(bold(color("Housing data not found!", "red")))
+        exit(1)
+
+    if (inventory := load_inventory()) is None:
+        inventory = create_inventory_schema()
+
+    update_inventory(metadata, inventory, persist=not dry_run)
+
+    try:
+        change_list = list(
+            read_changes(changes, input_format or guess_format(changes.name))
+        )
+    except (ValueError, csv.Error) as error:
+        print(bold(color(f"Invalid changes: {error}", "red")))
+        exit(1)
+
+    before = copy.deepcopy(inventory)
+
+    if len(errors := apply_changes(metadata, inventory, change_list, consume)) > 0:
+        for number, message in errors:
+            print(color(f"  {number:4d}: {message}", "red"))
+
+        print(bold(color("\nNo changes saved!", "red")))
+        exit(1)
+
+    differences = diff_inventories(before, inventory)
+
+    if len(differences) == 0:
+        print(italic("No changes"))
+        return
+
+    for path, old, new in differences:
+        print(f"  {' / '.join(path)}:  {old} → {new}")
+
+    if dry_run:
+        print(italic(f"\nDry run, {len(differences)} values not saved"))
+        return
+
+    save_inventory(inventory)
+    print(bold(color(f"\nUpdated {len(differences)} values!", "green")))
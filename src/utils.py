@@ -4,19 +4,22 @@
 import asyncio
 import locale
 import os
+import shutil
+import sys
 from typing import List, Optional
 
 
-from simple_term_menu import TerminalMenu
+from simple_term_menu import MIN_VISIBLE_MENU_ENTRIES_COUNT, TerminalMenu
 from sty import fg, ef, rs
 
 
 def clear_screen():
-    """Clears terminal screen"""
+    """Clears terminal screen with escape codes, without running `clear`"""
     if os.name == "nt":
         _ = os.system("cls")
     else:
-        _ = os.system("clear")
+        sys.stdout.write("\033[H\033[2J\033[3J")
+        sys.stdout.flush()
 
 
 def prompt_confirm(prompt: str) -> bool:
@@ -70,9 +73,125 @@ async def gather_dict(tasks: dict) -> dict:
     }
 
 
+class Menu(TerminalMenu):
+    """Terminal menu that is kept alive between selections
+
+    Options are replaced in place as they change, instead of formatting all of them
+    again in a new menu, and the size of the terminal is read without running `tput`
+    every time the menu or its viewport is drawn.
+    The screen is still cleared and the whole menu drawn again on each selection.
+    This relies on private attributes of simple-term-menu, whose version is pinned.
+    """
+
+    class Viewport(TerminalMenu.Viewport):
+        """Viewport of menu options that reads the size of the terminal like its menu"""
+
+        def _calculate_num_lines(self) -> int:
+            return (
+                Menu._num_lines()
+                - self.title_lines_count
+                - self.status_bar_lines_count
+                - self.preview_lines_count
+                - self.search_lines_count
+            )
+
+        @TerminalMenu.Viewport.preview_lines_count.setter
+        def preview_lines_count(self, value: int):
+            self._preview_lines_count = min(
+                value if value >= 3 else 0,
+                Menu._num_lines()
+                - self.title_lines_count
+                - self.status_bar_lines_count
+                - MIN_VISIBLE_MENU_ENTRIES_COUNT,
+            )
+
+    @classmethod
+    def _num_lines(cls) -> int:
+        return shutil.get_terminal_size().lines
+
+    @classmethod
+    def _num_cols(cls) -> int:
+        return shutil.get_terminal_size().columns
+
+    def update(self, index: int, option: str):
+        """Replaces option at `index` with `option`, redrawn when next shown
+
+        Args:
+            index (int): option index
+            option (str): menu option, shown as is
+        """
+        self._menu_entries[index] = option
+        self._view._menu_entries[index] = option
+
+    def move(self, old: int, new: int, option: str):
+        """Moves option at `old` index to `new` index, replacing it with `option`
+
+        Args:
+            old (int): old option index
+            new (int): new option index
+            option (str): menu option, shown as is
+        """
+        for options in [
+            self._menu_entries,
+            self._view._menu_entries,
+            self._shortcut_keys,
+            self._preview_arguments,
+        ]:
+            options.insert(new, options.pop(old))
+
+        self.update(new, option)
+
+    def replace(self, options: List[str]):
+        """Replaces all options with `options`, shown as is
+
+        Args:
+            options (List[str]): menu options, shown as is
+        """
+        resized = len(options) != len(self._menu_entries)
+
+        self._menu_entries[:] = options
+        self._view._menu_entries[:] = options
+
+        if resized:
+            self._shortcut_keys[:] = [None] * len(options)
+            self._preview_arguments[:] = [None] * len(options)
+
+            self._viewport = self._view._viewport = self.Viewport(
+                len(options),
+                self._viewport.title_lines_count,
+                self._viewport.status_bar_lines_count,
+                0,
+                0,
+            )
+            self._view.update_view()
+
+    def show(self, cursor_index: Optional[int] = None) -> Optional[int]:
+        """Shows menu without the search of its last selection
+
+        Args:
+            cursor_index (Optional[int], optional): option under cursor. Defaults to the last selected.
+
+        Returns:
+            Optional[int]: selected option index, if any
+        """
+        if cursor_index is None:
+            cursor_index = self._view.active_menu_index
+
+        if cursor_index is not None and cursor_index >= len(self._menu_entries):
+            cursor_index = len(self._menu_entries) - 1
+
+        if self._search:
+            self._search.search_text = None
+
+        if cursor_index is not None:
+            self._view.active_menu_index = cursor_index
+
+        return super().show()
+
+
 def terminal_menu(
     options: List[str], show_search_hint: bool = True, **kwargs
-) -> TerminalMenu:
+) -> Menu:
     """Creates a terminal menu instance
 
     Args:
@@ -80,9 +199,9 @@ def terminal_menu(
         show_search_hint (bool, optional): show search hint. Defaults to True.
 
     Returns:
-        TerminalMenu: menu instance
+        Menu: menu instance
     """
-    return TerminalMenu(
+    return Menu(
         options,
         menu_cursor_style=("fg_cyan", "bold"),
         clear_menu_on_exit=False,
@@ -0,0 +1,187 @@
+"""This module defines functions for validating inventory against metadata"""
+
+
+from collections.abc import Callable
+from typing import List, Tuple
+
+
+from .reset import create_inventory_schema, update_inventory
+
+
+def is_count(value) -> bool:
+    """Checks whether `value` is a non-negative integer
+
+    Args:
+        value: subject value
+
+    Returns:
+        bool: whether value is a count
+    """
+    return type(value) is int and value >= 0
+
+
+def is_flag(value) -> bool:
+    """Checks whether `value` is a boolean
+
+    Args:
+        value: subject value
+
+    Returns:
+        bool: whether value is a flag
+    """
+    return type(value) is bool
+
+
+def compile_validator(metadata: dict) -> Callable[[dict], List[Tuple[str, str]]]:
+    """Compiles a validator of inventories for `metadata`
+
+    The names and expected fields of every entry are resolved once,
+    so that each inventory is checked in a single pass over its entries.
+
+    Args:
+        metadata (dict): housing metadata
+
+    Returns:
+        Callable[[dict], List[Tuple[str, str]]]: validator returning problems as (path, message) pairs
+    """
+    companions = frozenset(metadata["companions"])
+    materials = frozenset(metadata["materials"])
+    craftable = {
+        f_name: f_md.get("materials") is not None
+        for f_name, f_md in metadata["furnishings"].items()
+    }
+    gift_sets = {
+        s_name: frozenset(s_md["companions"]) if "companions" in s_md else None
+        for s_name, s_md in metadata["sets"].items()
+    }
+
+    def check_entries(problems, path, entries, known, check):
+        if not isinstance(entries, dict):
+            problems.append((path, "expected a mapping"))
+            return
+
+        for name, value in entries.items():
+            if name in known:
+                check(problems, f"{path}/{name}", name, value)
+            else:
+                problems.append((f"{path}/{name}", "unknown entry"))
+
+        problems.extend(
+            (f"{path}/{name}", "missing entry") for name in known if name not in entries
+        )
+
+    def check_companion(problems, path, name, value):
+        if not is_flag(value):
+            problems.append((path, "expected a boolean"))
+
+    def check_material(problems, path, name, value):
+        if not is_count(value):
+            problems.append((path, "expected a non-negative integer"))
+
+    def check_furnishing(problems, path, name, value):
+        if not isinstance(value, dict):
+            problems.append((path, "expected a mapping"))
+            return
+
+        if not is_count(value.get("owned")):
+            problems.append((f"{path}/owned", "expected a non-negative integer"))
+
+        if craftable[name]:
+            for field in ["blueprint", "crafted"]:
+                if not is_flag(value.get(field)):
+                    problems.append((f"{path}/{field}", "expected a boolean"))
+
+            if value.get("crafted") is True and value.get("blueprint") is False:
+                problems.append((f"{path}/crafted", "crafted without blueprint"))
+
+        for field in value:
+            if field not in ("owned", "blueprint", "crafted") or (
+                not craftable[name] and field != "owned"
+            ):
+                problems.append((f"{path}/{field}", "unknown field"))
+
+    def check_set(problems, path, name, value):
+        if not isinstance(value, dict):
+            problems.append((path, "expected a mapping"))
+            return
+
+        if not is_flag(value.get("owned")):
+            problems.append((f"{path}/owned", "expected a boolean"))
+
+        if (set_companions := gift_sets[name]) is not None:
+            check_entries(
+                problems,
+                f"{path}/companions",
+                value.get("companions"),
+                set_companions,
+                check_companion,
+            )
+
+        for field in value:
+            if field != "owned" and (field != "companions" or set_companions is None):
+                problems.append((f"{path}/{field}", "unknown field"))
+
+    sections = dict(
+        companions=(companions, check_companion),
+        materials=(materials, check_material),
+        furnishings=(craftable, check_furnishing),
+        sets=(gift_sets, check_set),
+    )
+
+    def validate(inventory: dict) -> List[Tuple[str, str]]:
+        problems = []
+
+        if not isinstance(inventory, dict):
+            return [("", "expected a mapping")]
+
+        for section, (known, check) in sections.items():
+            check_entries(problems, section, inventory.get(section), known, check)
+
+        return problems
+
+    return validate
+
+
+def repair_inventory(metadata: dict, inventory: dict) -> dict:
+    """Repairs `inventory` to match `metadata`
+
+    Valid values are kept, and everything else is reset to its default.
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+
+    Returns:
+        dict: repaired inventory
+    """
+    repaired = create_inventory_schema()
+    update_inventory(metadata, repaired, persist=False)
+
+    def overlay(default, value):
+        if isinstance(default, dict):
+            return (
+                {
+                    key: overlay(default_value, value.get(key, default_value))
+                    for key, default_value in default.items()
+                }
+                if isinstance(value, dict)
+                else default
+            )
+
+        return value if type(value) is type(default) else default
+
+    repaired = overlay(repaired, inventory)
+
+    for furnishing in repaired["furnishings"].values():
+        furnishing["owned"] = max(furnishing["owned"], 0)
+
+        if furnishing.get("crafted"):
+            furnishing["blueprint"] = True
+
+    for name, amount in repaired["materials"].items():
+        repaired["materials"][name] = max(amount, 0)
+
+    if isinstance(inventory.get("version"), int):
+        repaired["version"] = inventory["version"]
+
+    return repaired
@@ -0,0 +1,185 @@
+"""This module defines menu views, whose order and rows are kept between menus.
+
+A view computes the sort key and row of each entry once, and keeps entries sorted by key.
+When a single entry changes, only its key and row are computed again,
+and it is moved to its new position by bisection.
+Views are cached by name for the inventory version they were built for,
+so a menu entered again over the same inventory reuses them.
+"""
+
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+from .utils import Menu
+
+
+def inventory_stamp(metadata: dict, inventory: dict) -> Optional[Tuple[str, int]]:
+    """Returns stamp of the values of `inventory` under `metadata`
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+
+    Returns:
+        Optional[Tuple[str, int]]: metadata fingerprint and inventory version,
+            or `None` if either is unknown
+    """
+    fingerprint = metadata.get("fingerprint")
+    version = inventory.get("version")
+
+    return (fingerprint, version) if None not in [fingerprint, version] else None
+
+
+class MenuView:
+    """Menu entries sorted by key, with their formatted rows"""
+
+    __slots__ = ("sort_key", "format_row", "stamp", "keys", "names", "rows", "lookup")
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        sort_key: Callable[[str], tuple],
+        format_row: Callable[[str], str],
+        stamp: Optional[Tuple[str, int]],
+    ):
+        """Sorts and formats `names` entries
+
+        Args:
+            names (Iterable[str]): entry names
+            sort_key (Callable[[str], tuple]): sort key of an entry, ending with its name
+            format_row (Callable[[str], str]): menu row of an entry
+            stamp (Optional[Tuple[str, int]]): inventory stamp the view is built for
+        """
+        self.sort_key = sort_key
+        self.format_row = format_row
+        self.stamp = stamp
+
+        self.build(names)
+
+    def build(self, names: Iterable[str]):
+        """Sorts and formats every one of `names` entries
+
+        Args:
+            names (Iterable[str]): entry names
+        """
+        self.lookup: Dict[str, tuple] = {name: self.sort_key(name) for name in names}
+        self.keys: List[tuple] = sorted(self.lookup.values())
+        self.names: List[str] = [key[-1] for key in self.keys]
+        self.rows: List[str] = [self.format_row(name) for name in self.names]
+
+    def update(self, name: str) -> Tuple[int, int]:
+        """Sorts and formats `name` entry again
+
+        Args:
+            name (str): entry name
+
+        Returns:
+            Tuple[int, int]: old and new position of the entry
+        """
+        old = bisect_left(self.keys, self.lookup[name])
+
+        del self.keys[old]
+        del self.names[old]
+        del self.rows[old]
+
+        key = self.lookup[name] = self.sort_key(name)
+        new = bisect_left(self.keys, key)
+
+        self.keys.insert(new, key)
+        self.names.insert(new, name)
+        self.rows.insert(new, self.format_row(name))
+
+        return old, new
+
+    def refresh(
+        self, stamp: Optional[Tuple[str, int]], name: str
+    ) -> Optional[Tuple[int, int]]:
+        """Brings view up to `stamp`, after `name` entry was edited
+
+        If the inventory was saved exactly once since, only `name` entry changed,
+        so it alone is sorted and formatted again.
+        Otherwise, as other changes may have been merged, the view is built again.
+
+        Args:
+            stamp (Optional[Tuple[str, int]]): current inventory stamp
+            name (str): name of the edited entry
+
+        Returns:
+            Optional[Tuple[int, int]]: old and new position of the entry,
+                or `None` if the view was built again
+        """
+        if stamp is not None and stamp == self.stamp:
+            position = bisect_left(self.keys, self.lookup[name])
+            return position, position
+
+        edited = (
+            stamp is not None
+            and self.stamp is not None
+            and stamp == (self.stamp[0], self.stamp[1] + 1)
+        )
+        self.stamp = stamp
+
+        if edited:
+            return self.update(name)
+
+        self.build(self.names)
+        return None
+
+
+VIEWS: Dict[str, MenuView] = {}
+"""Menu views by name"""
+
+
+def load_view(
+    view_name: str,
+    stamp: Optional[Tuple[str, int]],
+    names: Iterable[str],
+    sort_key: Callable[[str], tuple],
+    format_row: Callable[[str], str],
+) -> MenuView:
+    """Returns `view_name` view, reusing its order and rows for the same inventory stamp
+
+    Args:
+        view_name (str): view name
+        stamp (Optional[Tuple[str, int]]): current inventory stamp
+        names (Iterable[str]): entry names
+        sort_key (Callable[[str], tuple]): sort key of an entry, ending with its name
+        format_row (Callable[[str], str]): menu row of an entry
+
+    Returns:
+        MenuView: menu view
+    """
+    if (
+        stamp is None
+        or (view := VIEWS.get(view_name)) is None
+        or view.stamp != stamp
+    ):
+        view = MenuView(names, sort_key, format_row, stamp)
+
+        if stamp is not None:
+            VIEWS[view_name] = view
+    else:
+        view.sort_key = sort_key
+        view.format_row = format_row
+
+    return view
+
+
+def refresh_menu(
+    menu: Menu, view: MenuView, stamp: Optional[Tuple[str, int]], name: str
+):
+    """Brings `menu` of `view` up to `stamp`, after `name` entry was edited
+
+    Args:
+        menu (Menu): menu showing the rows of `view`
+        view (MenuView): menu view
+        stamp (Optional[Tuple[str, int]]): current inventory stamp
+        name (str): name of the edited entry
+    """
+    if (positions := view.refresh(stamp, name)) is None:
+        menu.replace(view.rows)
+    else:
+        old, new = positions
+        menu.move(old, new, view.rows[new])
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import tubby.file
+import tubby.history
+import tubby.index
+import tubby.models
+
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path, monkeypatch):
+    """Points configuration files at a temporary folder"""
+    monkeypatch.setattr(tubby.file, "CONFIG_DIR", str(tmp_path))
+    monkeypatch.setattr(tubby.file, "METADATA_FILE", str(tmp_path / "metadata.json"))
+    monkeypatch.setattr(tubby.file, "METADATA_DIR", str(tmp_path / "metadata"))
+    monkeypatch.setattr(
+        tubby.file,
+        "METADATA_MANIFEST",
+        os.path.join(tmp_path, "metadata", "manifest.json"),
+    )
+    monkeypatch.setattr(tubby.file, "INVENTORY_FILE", str(tmp_path / "inventory.json"))
+    monkeypatch.setattr(tubby.file, "INVENTORY_BASES", {})
+    monkeypatch.setattr(
+        tubby.file, "ANALYSIS_CACHE_DIR", str(tmp_path / "cache" / "analysis")
+    )
+    monkeypatch.setattr(tubby.file, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(tubby.history, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(tubby.index, "INDEX_FILE", str(tmp_path / "index.json"))
+    monkeypatch.setattr(tubby.models, "HOUSINGS", {})
+    monkeypatch.setattr(tubby.models, "UNFINGERPRINTED", None)
+
+    return tmp_path
+
+
+@pytest.fixture
+def metadata():
+    """Small housing metadata"""
+    return {
+        "materials": ["Birch Wood", "Iron Chunk"],
+        "companions": {"Amber": {"sets": ["Camp"]}},
+        "furnishings": {
+            "Chair": {"materials": {"Birch Wood": 2}, "currency": 20},
+            "Lamp": {"materials": {"Iron Chunk": 1, "Birch Wood": 1}},
+            "Rug": {"mora": 5},
+        },
+        "sets": {
+            "Camp": {
+                "furnishings": {"Chair": 2, "Lamp": 1},
+                "currency": 300,
+                "companions": ["Amber"],
+            }
+        },
+    }
@@ -0,0 +1,50 @@
+import io
+import json
+import os
+
+from tubby.analyze import export_analyses, load_analysis
+from tubby.file import load_metadata, save_metadata
+import tubby.file
+from tubby.reset import create_inventory_schema, update_inventory
+
+
+def test_export_cached(metadata):
+    save_metadata(metadata)
+    metadata = load_metadata()
+
+    for _ in range(2):
+        output = io.StringIO()
+        export_analyses(
+            metadata,
+            ((name, create_inventory_schema()) for name in ["a", "b"]),
+            "json",
+            output,
+        )
+
+        rows = json.loads(output.getvalue())
+        assert [row["inventory"] for row in rows] == ["a", "b"]
+
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+    analysis = load_analysis(metadata, inventory)
+
+    assert dict(analysis) == rows[0]["analysis"]
+    assert analysis.milestones is None
+
+
+def test_sections_cached_as_computed(metadata):
+    save_metadata(metadata)
+    metadata = load_metadata()
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+
+    materials = load_analysis(metadata, inventory)["materials"]
+
+    assert [
+        name.split(".")[1] for name in os.listdir(tubby.file.ANALYSIS_CACHE_DIR)
+    ] == ["materials"]
+
+    analysis = load_analysis(metadata, inventory)
+
+    assert analysis["materials"] == materials
+    assert analysis.milestones is None
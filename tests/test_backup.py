@@ -0,0 +1,28 @@
+from click.testing import CliRunner
+
+from tubby.backup import backup, chunk_inventory
+
+
+def test_import_malformed(tmp_path):
+    path = tmp_path / "backup.json"
+    path.write_text("{")
+
+    result = CliRunner().invoke(backup, ["-i", str(path)], input="y\n")
+
+    assert result.exit_code == 1
+    assert "Could not read backup" in result.output
+
+
+def test_chunks_reused_after_insert():
+    inventory = dict(
+        version=1,
+        furnishings={f"Furnishing {i:04d}": dict(owned=i) for i in range(0, 2000, 2)},
+    )
+    before = chunk_inventory(inventory)
+
+    inventory["furnishings"]["Furnishing 0001"] = dict(owned=1)
+    after = chunk_inventory(inventory)
+
+    assert len(before) > 10
+    assert len(set(after) - set(before)) == 1
+    assert len(set(before) - set(after)) == 1
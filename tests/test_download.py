@@ -0,0 +1,96 @@
+import copy
+import json
+
+from tubby.analyze import ANALYSIS_SECTIONS, perform_analysis
+from tubby.engine import compile_catalog, compile_inventory
+from tubby.file import (
+    METADATA_SECTIONS,
+    compute_fingerprint,
+    load_inventory,
+    load_metadata,
+    save_metadata,
+)
+import tubby.file
+from tubby.reset import create_inventory_schema, diff_metadata, update_inventory
+
+
+def finish_download(metadata, previous):
+    """Records changes and fingerprint as `download` does once scraping completes"""
+    if (fingerprint := compute_fingerprint(metadata)) != previous.get("fingerprint"):
+        metadata["changes"] = dict(
+            base=previous.get("fingerprint"), **diff_metadata(previous, metadata)
+        )
+        metadata["fingerprint"] = fingerprint
+        save_metadata(metadata)
+
+
+def test_save_metadata_stores_fingerprint(metadata):
+    save_metadata(metadata)
+
+    with open(tubby.file.METADATA_MANIFEST, "r") as file_pointer:
+        manifest = json.load(file_pointer)
+
+    assert manifest["fields"]["fingerprint"] == compute_fingerprint(metadata)
+
+
+def test_interrupted_download(metadata):
+    metadata["fingerprint"] = compute_fingerprint(metadata)
+    save_metadata(metadata)
+    update_inventory(load_metadata(), create_inventory_schema())
+
+    metadata = load_metadata()
+    metadata["furnishings"]["Stool"] = {"materials": {"Birch Wood": 1}}
+    save_metadata(metadata)
+
+    metadata = load_metadata()
+    inventory = load_inventory()
+    update_inventory(metadata, inventory)
+
+    assert inventory["furnishings"]["Stool"] == dict(
+        owned=0, blueprint=False, crafted=False
+    )
+    assert inventory["fingerprint"] == compute_fingerprint(metadata)
+
+    columns = compile_inventory(compile_catalog(metadata), inventory)
+    assert len(columns["owned"]) == len(metadata["furnishings"])
+    assert set(perform_analysis(metadata, inventory)) == set(ANALYSIS_SECTIONS)
+
+
+def test_interrupted_download_after_download(metadata):
+    save_metadata(metadata)
+    update_inventory(load_metadata(), create_inventory_schema())
+
+    metadata = load_metadata()
+    previous = copy.deepcopy(dict(metadata))
+    metadata["furnishings"]["Stool"] = {"materials": {"Birch Wood": 1}}
+    finish_download(metadata, previous)
+
+    metadata = load_metadata()
+    metadata["furnishings"]["Bench"] = {"mora": 3}
+    save_metadata(metadata)
+
+    metadata = load_metadata()
+    inventory = load_inventory()
+    update_inventory(metadata, inventory)
+
+    assert "changes" not in metadata
+    assert {"Stool", "Bench"} <= set(inventory["furnishings"])
+    compile_inventory(compile_catalog(metadata), inventory)
+
+
+def test_finished_download_keeps_changes(metadata):
+    save_metadata(metadata)
+    update_inventory(load_metadata(), create_inventory_schema())
+
+    metadata = load_metadata()
+    previous = copy.deepcopy(dict(metadata))
+    metadata["furnishings"]["Stool"] = {"materials": {"Birch Wood": 1}}
+    save_metadata(metadata)
+    finish_download(metadata, previous)
+
+    metadata = load_metadata()
+    assert metadata["changes"]["base"] == previous["fingerprint"]
+    assert metadata["changes"]["furnishings"] == ["Stool"]
+    assert metadata["fingerprint"] == compute_fingerprint(
+        {section: metadata[section] for section in METADATA_SECTIONS}
+    )
@@ -0,0 +1,366 @@
+import copy
+import random
+
+import pytest
+
+from tubby.analyze import perform_analysis
+from tubby.cost import load_cost_model
+from tubby.engine import IncrementalAnalysis, compile_catalog
+from tubby.file import compute_fingerprint
+from tubby.index import load_index
+from tubby.models import load_housing
+from tubby.query import get_cost_of_items, get_materials_for_furnishings
+from tubby.reset import create_inventory_schema, update_inventory
+from tubby.utils import update_greater
+import tubby.models
+
+
+def test_catalog_kept_with_housing(metadata):
+    metadata["fingerprint"] = compute_fingerprint(metadata)
+
+    catalog = compile_catalog(metadata)
+    housing = load_housing(metadata)
+
+    assert housing.catalog is catalog
+    assert catalog.costs is load_cost_model(metadata)
+    assert catalog.index is load_index(metadata)
+    assert compile_catalog(dict(metadata)) is catalog
+
+
+def test_housing_kept_without_fingerprint(metadata, monkeypatch):
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+
+    model = load_cost_model(metadata)
+    monkeypatch.setattr(tubby.models, "Housing", None)
+
+    assert load_housing(metadata).cost_model is model
+    assert get_cost_of_items(metadata, inventory, {"Chair": 1, "Camp": 1}) == dict(
+        currency=320
+    )
+
+    with pytest.raises(TypeError):
+        load_housing(dict(metadata))
+
+
+def test_catalog_rows(metadata):
+    catalog = compile_catalog(metadata)
+
+    assert catalog.furnishings == ["Chair", "Lamp", "Rug"]
+    assert [list(recipe) for recipe in catalog.recipes] == [
+        [(0, 2)],
+        [(1, 1), (0, 1)],
+        [],
+    ]
+    assert [list(row) for row in catalog.requirements] == [[(0, 2), (1, 1)]]
+    assert catalog.usages == [[(0, 2)], [(0, 1)], []]
+
+
+def reference_analysis(metadata: dict, inventory: dict) -> dict:
+    """Analyses `inventory` as perform_analysis did before the catalog engine
+
+    Args:
+        metadata (dict): housing metadata
+        inventory (dict): user inventory
+
+    Returns:
+        dict: analysis
+    """
+    furnishings = inventory["furnishings"]
+    sets = inventory["sets"]
+
+    analysis = {
+        "materials": {
+            "milestones": [
+                "🪑📘🟢🔨🔴",
+                "🪑🔨🔴    ",
+                "🎁👤🟢📘🟢",
+                "🎁👤🟢    ",
+                "🏡📘🟢    ",
+                "🏡        ",
+                "🫖        ",
+            ],
+            "legend": [
+                "for one of each furnishing whose blueprint is owned and hasn't been crafted yet",
+                "for one of each furnishing that hasn't been crafted yet",
+                "for largest count of each missing furnishing for all gift sets with at least one gifting companion and whose blueprints are owned",
+                "for largest count of each missing furnishing for all gift sets with at least one gifting companion",
+                "for largest count of each missing furnishing for all sets whose blueprints are owned",
+                "for largest count of each missing furnishing for all sets",
+                "for larger of largest count of each missing furnishing for all sets and one of each furnishing that hasn't been crafted yet",
+            ],
+        },
+        "currency": {
+            "milestones": [
+                "🪑📘🔴        ",
+                "🎁👤🟢📘🔴    ",
+                "🎁👤🟢📘🟢🪑🔴",
+                "🎁👤🟢🪑🔴    ",
+                "🏡📘🔴        ",
+                "🏡🪑🔴        ",
+                "🫖            ",
+            ],
+            "legend": [
+                "all missing blueprints for furnishings",
+                "all missing blueprints for gift sets with at least one gifting companion",
+                "all missing furnishings (including blueprints) for  for all gift sets with at least one gifting companion and whose blueprints are owned",
+                "all missing furnishings (including blueprints) for  for all gift sets with at least one gifting companion",
+                "all missing blueprints for sets",
+                "all missing furnishings (including blueprints) for all sets",
+                "all missing blueprints for furnishings and sets, all missing furnishings for all sets and one of all other furnishings",
+            ],
+        },
+        "furnishings": {},
+        "sets": {},
+    }
+
+    materials_anal = analysis["materials"]
+    materials_anal["results"] = [{} for _ in materials_anal["legend"]]
+
+    currency_anal = analysis["currency"]
+    currency_anal["results"] = [{} for _ in currency_anal["legend"]]
+
+    furnishings_anal = analysis["furnishings"]
+    sets_anal = analysis["sets"]
+
+    for f_name, furnishing in furnishings.items():
+        if (
+            furnishing_blueprint := furnishing.get("blueprint")
+        ) is not None and not furnishing.get("crafted"):
+            materials_anal["results"][1][f_name] = 1
+            materials_anal["results"][6][f_name] = 1
+
+            if furnishing_blueprint:
+                materials_anal["results"][0][f_name] = 1
+            else:
+                currency_anal["results"][0][f_name] = 1
+                currency_anal["results"][6][f_name] = 1
+
+            furnishings_anal[f_name] = 1
+
+        elif furnishing_blueprint is None and furnishing["owned"] == 0:
+            currency_anal["results"][6][f_name] = 1
+            furnishings_anal[f_name] = 1
+
+    for s_name, hset in sets.items():
+        set_blueprint = hset["owned"]
+        has_gifting_companions = "companions" in hset and not all(
+            gifted
+            for c_name, gifted in hset["companions"].items()
+            if inventory["companions"][c_name]
+        )
+        missing_items = {}
+
+        if not set_blueprint:
+            currency_anal["results"][4][s_name] = 1
+            currency_anal["results"][6][s_name] = 1
+
+            missing_items[s_name] = 1
+
+            if has_gifting_companions:
+                currency_anal["results"][1][s_name] = 1
+
+        for f_name, num_required in metadata["sets"][s_name]["furnishings"].items():
+            if (num_owned := furnishings[f_name]["owned"]) < num_required:
+                num_missing = num_required - num_owned
+
+                update_greater(materials_anal["results"][5], f_name, num_missing)
+                update_greater(materials_anal["results"][6], f_name, num_missing)
+
+                update_greater(furnishings_anal, f_name, num_missing)
+
+                update_greater(missing_items, f_name, num_missing)
+
+                if (
+                    furnishing_blueprint := furnishings[f_name].get("blueprint")
+                ) is None:
+                    update_greater(currency_anal["results"][5], f_name, num_missing)
+                    update_greater(currency_anal["results"][6], f_name, num_missing)
+                elif not furnishing_blueprint:
+                    currency_anal["results"][5][f_name] = 1
+
+                if has_gifting_companions:
+                    update_greater(materials_anal["results"][3], f_name, num_missing)
+
+                    if set_blueprint:
+                        update_greater(
+                            materials_anal["results"][2], f_name, num_missing
+                        )
+
+                        if furnishing_blueprint is None:
+                            update_greater(
+                                currency_anal["results"][2], f_name, num_missing
+                            )
+                        elif not furnishing_blueprint:
+                            currency_anal["results"][2][f_name] = 1
+
+                    if furnishing_blueprint is None:
+                        update_greater(currency_anal["results"][3], f_name, num_missing)
+                    elif not furnishing_blueprint:
+                        currency_anal["results"][3][f_name] = 1
+
+                if set_blueprint:
+                    update_greater(materials_anal["results"][4], f_name, num_missing)
+
+        if len(missing_items) > 0:
+            sets_anal[s_name] = missing_items
+
+    materials_anal["results"] = list(
+        map(
+            lambda furnishings: get_materials_for_furnishings(metadata, furnishings),
+            materials_anal["results"],
+        )
+    )
+
+    currency_anal["results"] = list(
+        map(
+            lambda items: get_cost_of_items(metadata, inventory, items),
+            currency_anal["results"],
+        )
+    )
+
+    return analysis
+
+
+def random_inventory(metadata: dict, rng: random.Random) -> dict:
+    return dict(
+        companions={c_name: rng.random() < 0.5 for c_name in metadata["companions"]},
+        materials={m_name: rng.randrange(4) for m_name in metadata["materials"]},
+        furnishings={
+            f_name: (
+                dict(
+                    owned=rng.randrange(4),
+                    blueprint=rng.random() < 0.5,
+                    crafted=rng.random() < 0.5,
+                )
+                if f_md.get("materials") is not None
+                else dict(owned=rng.randrange(3))
+            )
+            for f_name, f_md in metadata["furnishings"].items()
+        },
+        sets={
+            s_name: dict(
+                owned=rng.random() < 0.5,
+                **(
+                    dict(
+                        companions={
+                            c_name: rng.random() < 0.5 for c_name in s_md["companions"]
+                        }
+                    )
+                    if s_md.get("companions") is not None
+                    else {}
+                ),
+            )
+            for s_name, s_md in metadata["sets"].items()
+        },
+    )
+
+
+def test_engine_matches_reference(metadata):
+    rng = random.Random(0)
+
+    for _ in range(200):
+        inventory = random_inventory(metadata, rng)
+
+        assert perform_analysis(metadata, inventory) == reference_analysis(
+            metadata, inventory
+        )
+
+
+def random_metadata(rng: random.Random) -> dict:
+    materials = [f"Material {i}" for i in range(5)]
+    companions = {f"Companion {i}": dict(sets=[]) for i in range(3)}
+    furnishings = {}
+    sets = {}
+
+    for i in range(10):
+        f_md = {}
+
+        if rng.random() < 0.7:
+            f_md["materials"] = {
+                m_name: rng.randrange(1, 4)
+                for m_name in rng.sample(materials, rng.randrange(1, 3))
+            }
+        if rng.random() < 0.5:
+            f_md["currency"] = rng.randrange(10, 100)
+        elif "materials" not in f_md:
+            f_md["mora"] = rng.randrange(1, 10)
+
+        furnishings[f"Furnishing {i}"] = f_md
+
+    for i in range(5):
+        s_name = f"Set {i}"
+        s_md = dict(
+            furnishings={
+                f_name: rng.randrange(1, 3)
+                for f_name in rng.sample(list(furnishings), rng.randrange(1, 4))
+            },
+            currency=rng.randrange(100, 500),
+        )
+
+        if rng.random() < 0.6:
+            s_md["companions"] = rng.sample(list(companions), rng.randrange(1, 3))
+
+            for c_name in s_md["companions"]:
+                companions[c_name]["sets"].append(s_name)
+
+        sets[s_name] = s_md
+
+    return dict(
+        materials=materials, companions=companions, furnishings=furnishings, sets=sets
+    )
+
+
+def random_delta(metadata: dict, rng: random.Random) -> dict:
+    delta = {}
+
+    for _ in range(rng.randrange(1, 4)):
+        section = rng.choice(["materials", "companions", "furnishings", "sets"])
+
+        if section == "materials":
+            delta.setdefault("materials", {})[rng.choice(metadata["materials"])] = (
+                rng.randrange(10)
+            )
+        elif section == "companions":
+            delta.setdefault("companions", {})[
+                rng.choice(list(metadata["companions"]))
+            ] = (rng.random() < 0.5)
+        elif section == "furnishings":
+            f_name = rng.choice(list(metadata["furnishings"]))
+            fields = dict(owned=rng.randrange(4))
+
+            if metadata["furnishings"][f_name].get("materials") is not None:
+                fields.update(blueprint=rng.random() < 0.5, crafted=rng.random() < 0.5)
+
+            delta.setdefault("furnishings", {})[f_name] = fields
+        else:
+            s_name = rng.choice(list(metadata["sets"]))
+            fields = dict(owned=rng.random() < 0.5)
+
+            if (s_companions := metadata["sets"][s_name].get("companions")) is not None:
+                fields["companions"] = {rng.choice(s_companions): rng.random() < 0.5}
+
+            delta.setdefault("sets", {})[s_name] = fields
+
+    return delta
+
+
+def test_incremental_analysis_matches_full():
+    rng = random.Random(0)
+
+    for _ in range(20):
+        metadata = random_metadata(rng)
+        inventory = random_inventory(metadata, rng)
+        analysis = IncrementalAnalysis(compile_catalog(metadata), inventory)
+
+        for _ in range(50):
+            analysis.apply(random_delta(metadata, rng))
+
+            full = perform_analysis(metadata, copy.deepcopy(inventory))
+
+            assert analysis.results() == dict(
+                materials=full["materials"]["results"],
+                currency=full["currency"]["results"],
+                furnishings=full["furnishings"],
+                sets=full["sets"],
+            )
@@ -0,0 +1,100 @@
+import json
+import multiprocessing
+import os
+
+from tubby.file import (
+    compute_fingerprint,
+    load_inventory,
+    load_metadata,
+    save_inventory,
+    save_metadata,
+)
+import tubby.file
+
+
+def test_legacy_metadata_migration(metadata):
+    with open(tubby.file.METADATA_FILE, "w") as file_pointer:
+        json.dump(metadata, file_pointer)
+
+    migrated = load_metadata()
+
+    assert not os.path.exists(tubby.file.METADATA_FILE)
+    assert migrated["fingerprint"] == compute_fingerprint(metadata)
+
+    loaded = load_metadata()
+
+    assert loaded["fingerprint"] == migrated["fingerprint"]
+    assert {section: loaded[section] for section in metadata} == metadata
+
+
+def test_save_metadata_writes_changed_shards(metadata, monkeypatch):
+    save_metadata(metadata)
+
+    written = []
+    write_json = tubby.file.write_json
+    monkeypatch.setattr(
+        tubby.file,
+        "write_json",
+        lambda path, data: written.append(os.path.basename(path))
+        or write_json(path, data),
+    )
+
+    loaded = load_metadata()
+    save_metadata(loaded)
+
+    assert written == ["manifest.json"]
+    assert loaded.sections == {}
+
+    loaded = load_metadata()
+    loaded["furnishings"]["Rug"]["mora"] = 6
+    written.clear()
+    save_metadata(loaded)
+
+    assert written == ["furnishings.json", "manifest.json"]
+    assert "sets" not in loaded.sections
+
+    metadata["furnishings"]["Rug"]["mora"] = 6
+    assert load_metadata()["fingerprint"] == compute_fingerprint(metadata)
+
+
+def test_save_inventory_merges_each_loaded_version():
+    save_inventory(dict(materials={"Birch Wood": 0, "Iron Chunk": 0}))
+
+    ours = load_inventory()
+    theirs = load_inventory()
+
+    ours["materials"]["Birch Wood"] = 5
+    save_inventory(ours)
+
+    theirs["materials"]["Iron Chunk"] = 7
+    save_inventory(theirs)
+
+    assert load_inventory()["materials"] == {"Birch Wood": 5, "Iron Chunk": 7}
+
+
+def increment_material(m_name: str, times: int):
+    for _ in range(times):
+        inventory = load_inventory()
+        inventory["materials"][m_name] += 1
+        save_inventory(inventory)
+
+
+def test_save_inventory_concurrent_processes():
+    m_names = [f"Material {i}" for i in range(4)]
+    save_inventory(dict(materials={m_name: 0 for m_name in m_names}))
+
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=increment_material, args=(m_name, 10))
+        for m_name in m_names
+    ]
+
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    inventory = load_inventory()
+
+    assert inventory["materials"] == {m_name: 10 for m_name in m_names}
+    assert inventory["version"] == 41
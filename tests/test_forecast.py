@@ -0,0 +1,59 @@
+from click.testing import CliRunner
+import pytest
+
+from tubby.backup import create_snapshot
+from tubby.file import save_metadata
+from tubby.forecast import forecast, parse_balances
+from tubby.reset import create_inventory_schema, update_inventory
+
+
+def test_unknown_resource(metadata):
+    save_metadata(metadata)
+
+    result = CliRunner().invoke(forecast, ["-r", "Oak Wood=5"])
+
+    assert result.exit_code == 1
+    assert "Could not find resource 'Oak Wood'" in result.output
+
+
+@pytest.mark.parametrize(
+    "options, balances",
+    [
+        (["2400"], dict(main=2400)),
+        (["main=2400"], dict(main=2400)),
+        (["pet=2400"], None),
+        (["main=lots"], None),
+    ],
+)
+def test_parse_balances_of_profile(options, balances):
+    assert parse_balances(tuple(options), ["main"]) == balances
+
+
+def test_parse_balances_of_profiles():
+    assert parse_balances(("main=2400", "alt=800"), ["main", "alt"]) == dict(
+        main=2400, alt=800
+    )
+    assert parse_balances(("2400",), ["main", "alt"]) is None
+
+
+def test_balances_by_profile(metadata, tmp_path):
+    save_metadata(metadata)
+
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+    inventory["furnishings"]["Lamp"]["blueprint"] = True
+    inventory["sets"]["Camp"]["owned"] = True
+
+    repository = str(tmp_path / "repository")
+    for profile in ["main", "alt"]:
+        create_snapshot(repository, profile, inventory)
+
+    result = CliRunner().invoke(
+        forecast,
+        ["-b", repository, "-p", "main", "-p", "alt", "-c", "main=1000"],
+    )
+
+    assert result.exit_code == 0
+    main, alt = result.output.split("alt:")
+    assert "(currency)" not in main
+    assert "(currency)" in alt
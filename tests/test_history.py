@@ -0,0 +1,53 @@
+from datetime import datetime
+import os
+
+from tubby.file import load_inventory, save_inventory
+from tubby.history import History
+import tubby.file
+
+
+def inventory(**materials):
+    return dict(materials=materials, furnishings={}, sets={}, companions={})
+
+
+def test_history_records_deletions():
+    saved = inventory(**{"Birch Wood": 1, "Iron Chunk": 2})
+    save_inventory(saved)
+
+    saved["materials"] = {"Birch Wood": 3}
+    save_inventory(saved)
+
+    state = History().state_at(int(datetime.now().timestamp()))
+
+    assert state == {("materials", "Birch Wood"): 3}
+
+
+def test_history_compacted(monkeypatch):
+    monkeypatch.setattr(tubby.file, "HISTORY_LOG_SIZE", 2)
+
+    saved = inventory()
+    for amount in range(3):
+        saved["materials"]["Birch Wood"] = amount
+        save_inventory(saved)
+
+    months = History().months
+    shard = tubby.file.load_history_shard(
+        os.path.join(tubby.file.HISTORY_DIR, f"{months[0]}.json")
+    )
+
+    assert len(shard["times"]) == 3
+    assert os.path.exists(os.path.join(tubby.file.HISTORY_DIR, f"{months[0]}.json"))
+    assert os.path.exists(os.path.join(tubby.file.HISTORY_DIR, f"{months[0]}.log"))
+    assert History().state_at(int(datetime.now().timestamp())) == {
+        ("materials", "Birch Wood"): 2
+    }
+
+
+def test_history_error_keeps_inventory(tmp_path, monkeypatch, capsys):
+    (tmp_path / "blocked").write_text("")
+    monkeypatch.setattr(tubby.file, "HISTORY_DIR", str(tmp_path / "blocked"))
+
+    save_inventory(inventory(**{"Birch Wood": 1}))
+
+    assert load_inventory()["materials"] == {"Birch Wood": 1}
+    assert "Could not record history" in capsys.readouterr().out
@@ -0,0 +1,37 @@
+import os
+
+from tubby.file import compute_fingerprint, load_metadata, save_metadata
+from tubby.index import load_index
+from tubby.models import load_housing
+import tubby.index
+import tubby.models
+
+
+def test_index_saved_for_loaded_metadata(metadata):
+    save_metadata(metadata)
+    load_index(load_metadata())
+
+    assert os.path.exists(tubby.index.INDEX_FILE)
+
+
+def test_index_not_saved_for_other_metadata(metadata):
+    metadata["fingerprint"] = compute_fingerprint(metadata)
+    load_index(metadata)
+
+    assert not os.path.exists(tubby.index.INDEX_FILE)
+    assert load_housing(metadata).index is not None
+
+
+def test_saved_index_loaded_without_models(metadata, monkeypatch):
+    save_metadata(metadata)
+    load_index(load_metadata())
+    tubby.models.HOUSINGS.clear()
+    monkeypatch.setattr(tubby.index, "build_index", None)
+
+    index = load_index(load_metadata())
+    housing = load_housing(load_metadata())
+
+    assert housing.index is index
+    assert "furnishings" not in vars(housing)
+    assert index.sets_using("Chair") == ["Camp"]
+    assert index.sets_of_companion("Amber") == ["Camp"]
@@ -0,0 +1,118 @@
+import itertools
+import random
+
+from click.testing import CliRunner
+import pytest
+
+from tubby.file import save_inventory, save_metadata
+from tubby.reset import create_inventory_schema, update_inventory
+from tubby.plan import plan, plan_completions
+from test_engine import random_inventory, random_metadata
+
+
+@pytest.mark.parametrize("weight", ["Camp=abc", "Camp", "=2", "Camp=nan"])
+def test_invalid_weight(metadata, weight):
+    save_metadata(metadata)
+
+    result = CliRunner().invoke(plan, ["-w", weight])
+
+    assert result.exit_code == 2
+    assert "Invalid value for '-w' / '--weight'" in result.output
+
+
+def test_weight(metadata):
+    save_metadata(metadata)
+
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+    inventory["companions"]["Amber"] = True
+    inventory["materials"].update({"Birch Wood": 10, "Iron Chunk": 10})
+    inventory["furnishings"]["Lamp"]["blueprint"] = True
+    save_inventory(inventory, merge=False)
+
+    result = CliRunner().invoke(plan, ["-c", "1000", "-m", "100", "-w", "Camp=2.5"])
+
+    assert result.exit_code == 0
+    assert "Complete (2.5)" in result.output
+
+
+def test_unknown_weight_set(metadata):
+    save_metadata(metadata)
+
+    result = CliRunner().invoke(plan, ["-w", "Cabin=1"])
+
+    assert result.exit_code == 1
+    assert "Could not find set 'Cabin'" in result.output
+
+
+def plan_cost(metadata: dict, inventory: dict, s_names: tuple) -> dict:
+    missing = {}
+    spent = {}
+
+    for s_name in s_names:
+        s_md = metadata["sets"][s_name]
+
+        if not inventory["sets"][s_name]["owned"]:
+            spent["currency"] = spent.get("currency", 0) + s_md["currency"]
+
+        for f_name, num_required in s_md["furnishings"].items():
+            num_missing = num_required - inventory["furnishings"][f_name]["owned"]
+            missing[f_name] = max(missing.get(f_name, 0), num_missing)
+
+    for f_name, num_missing in missing.items():
+        if num_missing <= 0:
+            continue
+
+        f_md = metadata["furnishings"][f_name]
+        f_inv = inventory["furnishings"][f_name]
+        cost_type = "currency" if "currency" in f_md else "mora"
+        cost = f_md.get("currency", f_md.get("mora", 0) * 1000)
+        purchasable = "currency" in f_md or "mora" in f_md
+
+        if f_md.get("materials") is not None:
+            if not f_inv["blueprint"] and not purchasable:
+                return None
+
+            for m_name, amount in f_md["materials"].items():
+                spent[m_name] = spent.get(m_name, 0) + amount * num_missing
+            if not f_inv["blueprint"]:
+                spent[cost_type] = spent.get(cost_type, 0) + cost
+        elif purchasable:
+            spent[cost_type] = spent.get(cost_type, 0) + cost * num_missing
+        else:
+            return None
+
+    return spent
+
+
+def test_plan_matches_exhaustive_search():
+    rng = random.Random(0)
+
+    for _ in range(50):
+        metadata = random_metadata(rng)
+        inventory = random_inventory(metadata, rng)
+        currency, mora = rng.randrange(1000), rng.randrange(20000)
+        weights = {s_name: rng.randrange(1, 4) for s_name in metadata["sets"]}
+        budget = dict(inventory["materials"], currency=currency, mora=mora)
+
+        best = 0
+        for n in range(len(weights) + 1):
+            for s_names in itertools.combinations(weights, n):
+                spent = plan_cost(metadata, inventory, s_names)
+
+                if spent is not None and all(
+                    amount <= budget[name] for name, amount in spent.items()
+                ):
+                    best = max(best, sum(weights[s_name] for s_name in s_names))
+
+        result = plan_completions(metadata, inventory, currency, mora, weights)
+
+        assert result["optimal"]
+        assert result["score"] == best
+        assert {
+            name: amount
+            for name, amount in plan_cost(
+                metadata, inventory, tuple(result["sets"])
+            ).items()
+            if amount > 0
+        } == result["spent"]
@@ -0,0 +1,33 @@
+import random
+
+from tubby.schedule import schedule_gift_sets
+from test_engine import random_inventory, random_metadata
+
+
+def uncovered_companions(inventory: dict, result: dict) -> set:
+    gifting = set(
+        c_name
+        for s_inv in inventory["sets"].values()
+        for c_name, gifted in s_inv.get("companions", {}).items()
+        if inventory["companions"][c_name] and not gifted
+    )
+
+    return gifting.difference(
+        c_name for step in result["steps"] for c_name in step["companions"]
+    )
+
+
+def test_capped_schedule_covers_companions():
+    rng = random.Random(0)
+
+    for _ in range(50):
+        metadata = random_metadata(rng)
+        inventory = random_inventory(metadata, rng)
+
+        capped = schedule_gift_sets(metadata, inventory, max_nodes=0)
+        result = schedule_gift_sets(metadata, inventory)
+
+        assert uncovered_companions(inventory, capped) == set()
+        assert uncovered_companions(inventory, result) == set()
+        assert result["optimal"]
+        assert result["total"] <= capped["total"]
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+from tubby.file import compute_fingerprint
+from tubby.reset import create_inventory_schema, update_inventory
+from tubby.simulate import read_scenarios, simulate_scenarios
+
+
+@pytest.fixture
+def inventory(metadata):
+    metadata["fingerprint"] = compute_fingerprint(metadata)
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+
+    return inventory
+
+
+@pytest.mark.parametrize(
+    "delta",
+    [
+        [],
+        {"furnishings": []},
+        {"furnishings": {"Chair": 3}},
+        {"furnishings": {"Chair": {"owned": "3"}}},
+        {"furnishings": {"Chair": {"owned": -1}}},
+        {"furnishings": {"Chair": {"color": "red"}}},
+        {"furnishings": {"Rug": {"blueprint": True}}},
+        {"materials": {"Birch Wood": True}},
+        {"companions": {"Amber": 1}},
+        {"sets": {"Camp": True}},
+        {"sets": {"Camp": {"owned": "yes"}}},
+        {"sets": {"Camp": {"companions": ["Amber"]}}},
+        {"sets": {"Camp": {"companions": {"Lisa": True}}}},
+        {"furnishings": {"Throne": {"owned": 1}}},
+        {"pets": {}},
+    ],
+)
+def test_invalid_delta(metadata, inventory, delta):
+    (result,) = simulate_scenarios(metadata, inventory, [dict(name="a", delta=delta)])
+
+    assert result["name"] == "a"
+    assert "error" in result
+
+
+def test_delta_restored(metadata, inventory):
+    delta = {
+        "furnishings": {"Chair": {"owned": 2, "blueprint": True}},
+        "sets": {"Camp": {"owned": True, "companions": {"Amber": True}}},
+        "companions": {"Amber": True},
+        "materials": {"Birch Wood": 4},
+    }
+    scenarios = [dict(name="a", delta=delta), dict(name="b")]
+
+    a, b = simulate_scenarios(metadata, inventory, scenarios)
+
+    assert "error" not in a
+    assert b == next(simulate_scenarios(metadata, inventory, [dict(name="b")]))
+
+
+def test_invalid_scenario_lines(metadata, inventory):
+    lines = io.StringIO('{"name": "a"}\n3\n{\n{"name": "d"}\n')
+
+    results = list(simulate_scenarios(metadata, inventory, read_scenarios(lines)))
+
+    assert [result["name"] for result in results] == ["a", "2", "3", "d"]
+    assert ["error" in result for result in results] == [False, True, True, False]
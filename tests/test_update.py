@@ -0,0 +1,95 @@
+import json
+
+from click.testing import CliRunner
+
+from tubby.file import load_inventory, save_inventory, save_metadata
+from tubby.reset import create_inventory_schema, update_inventory
+from tubby.update import update
+import tubby.update
+
+
+def write_changes(tmp_path, changes: list) -> str:
+    path = tmp_path / "changes.json"
+    path.write_text(json.dumps(changes))
+
+    return str(path)
+
+
+def save_crafted_chair(metadata: dict) -> dict:
+    save_metadata(metadata)
+
+    inventory = create_inventory_schema()
+    update_inventory(metadata, inventory, persist=False)
+    inventory["companions"]["Amber"] = True
+    inventory["materials"].update({"Birch Wood": 10, "Iron Chunk": 1})
+    inventory["furnishings"]["Chair"].update(owned=1, blueprint=True, crafted=True)
+    save_inventory(inventory, merge=False)
+
+    return load_inventory()
+
+
+def test_dry_run(metadata, tmp_path):
+    before = save_crafted_chair(metadata)
+    path = write_changes(
+        tmp_path, [dict(section="materials", name="Birch Wood", value="+5")]
+    )
+
+    result = CliRunner().invoke(update, [path, "--dry-run"])
+
+    assert result.exit_code == 0
+    assert "materials / Birch Wood:  10 → 15" in result.output
+    assert "Dry run, 1 values not saved" in result.output
+    assert load_inventory() == before
+
+
+def test_rejected_rules(metadata, tmp_path):
+    before = save_crafted_chair(metadata)
+    path = write_changes(
+        tmp_path,
+        [
+            dict(section="materials", name="Birch Wood", value=3),
+            dict(section="furnishings", name="Chair", field="blueprint", value=False),
+            dict(section="furnishings", name="Lamp", field="crafted", value=True),
+            dict(section="gifts", name="Camp", field="Amber", value=True),
+        ],
+    )
+
+    result = CliRunner().invoke(update, [path])
+
+    assert result.exit_code == 1
+    assert "2: Cannot unset blueprint of 'Chair' if already crafted" in result.output
+    assert "3: Cannot set 'Lamp' as crafted without its blueprint" in result.output
+    assert "4: Set 'Camp' and companion 'Amber' must be owned for gifts" in result.output
+    assert "No changes saved!" in result.output
+    assert load_inventory() == before
+
+
+def test_single_save(metadata, tmp_path, monkeypatch):
+    before = save_crafted_chair(metadata)
+    path = write_changes(
+        tmp_path,
+        [
+            dict(section="sets", name="Camp", value=True),
+            dict(section="furnishings", name="Chair", value=2),
+            dict(section="furnishings", name="Lamp", field="blueprint", value=True),
+            dict(section="furnishings", name="Lamp", value="+1"),
+            dict(section="gifts", name="Camp", field="Amber", value=True),
+        ],
+    )
+
+    saves = []
+    monkeypatch.setattr(
+        tubby.update,
+        "save_inventory",
+        lambda inventory: saves.append(save_inventory(inventory)),
+    )
+
+    result = CliRunner().invoke(update, [path, "--consume"])
+
+    assert result.exit_code == 0, result.output
+    assert len(saves) == 1
+
+    after = load_inventory()
+    assert after["version"] == before["version"] + 1
+    assert after["sets"]["Camp"] == dict(owned=True, companions=dict(Amber=True))
+    assert after["materials"] == {"Birch Wood": 7, "Iron Chunk": 0}